@@ -6,16 +6,27 @@ from .groups.routes import groups_blueprint
 from .virtual_circuits.routes import virtual_circuits_blueprint
 from .credentials.routes import credentials_blueprint
 from .backup.routes import backup_blueprint
+from .backup.scheduler import backup_scheduler
+from .network.monitor import network_monitor
 from .network.routes import network_blueprint
+from .events.routes import events_blueprint
 from .logger import get_logger
 from .database.database import initialize_db
+from .event_loop import background_loop
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = get_logger(__name__)
 
-app = Flask(__name__)
+class MaestroFlask(Flask):
+    """Flask app that runs async views on the shared background event loop."""
+
+    def async_to_sync(self, func):
+        return background_loop.wrap(func)
+
+app = MaestroFlask(__name__)
 app.config['SWAGGER'] = {
     'title': 'Matter Maestro API',
     'uiversion': 3,
@@ -42,6 +53,7 @@ app.register_blueprint(virtual_circuits_blueprint, url_prefix="/api/virtual-circ
 app.register_blueprint(credentials_blueprint, url_prefix="/api/credentials", name="credentials_api")
 app.register_blueprint(backup_blueprint, url_prefix="/api/backup", name="backup_api")
 app.register_blueprint(network_blueprint, url_prefix="/api/network")
+app.register_blueprint(events_blueprint, url_prefix="/api/events")
 
 @app.route('/')
 def index():
@@ -59,4 +71,9 @@ def server_error(error):
 
 if __name__ == "__main__":
     logger.info("Starting Matter Maestro application")
+    # The reloader parent only watches files; background services belong in the
+    # child that serves requests, or the parent would write its stale database
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        backup_scheduler.start()
+        network_monitor.start()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""ASGI entry point serving the whole API.
+
+Run it under any ASGI server from the ``src`` directory, for example::
+
+    uvicorn backend.asgi:application --host 0.0.0.0 --port 5000
+
+or simply ``python -m backend.asgi``. The server's event loop becomes the
+shared loop that async views and ``protocol_manager`` run on, and the
+synchronous Flask request handling runs on a thread pool sized by the
+MATTER_MAESTRO_WORKERS environment variable. The event stream is served on
+the event loop itself so open streams do not occupy that pool.
+"""
+import asyncio
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import async_to_sync, sync_to_async
+from .app import app
+from .backup.scheduler import backup_scheduler
+from .network.monitor import network_monitor
+from .database.database import close_db
+from .event_loop import background_loop
+from .events.routes import serve_asgi as serve_events
+from .logger import get_logger
+from .matter.protocol_manager import protocol_manager
+
+logger = get_logger(__name__)
+
+DEFAULT_WORKERS = 32
+# Long-lived event streams are served on the event loop, not by the worker threads
+EVENTS_PATH = '/api/events'
+# Request bodies larger than this are spooled to a temporary file
+MAX_MEMORY_BODY = 65536
+
+
+def _build_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope and its buffered request body."""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    headers = defaultdict(list)
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        headers[name].append(value.decode('latin1'))
+    environ.update((name, ','.join(values)) for name, values in headers.items())
+    return environ
+
+
+class _WsgiRequest:
+    """One HTTP request handed from the ASGI server to the WSGI app.
+
+    The body is buffered on the event loop, then the app runs on
+    ``executor`` and its response is sent back from that thread chunk by
+    chunk.
+    """
+
+    def __init__(self, wsgi_app, executor, scope, send):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+        self.scope = scope
+        self.send = async_to_sync(send)
+        self.response_start = None
+        self.response_started = False
+
+    async def __call__(self, receive):
+        with SpooledTemporaryFile(max_size=MAX_MEMORY_BODY) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await sync_to_async(self.run, thread_sensitive=False, executor=self.executor)(body)
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info is not None and self.response_started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.response_start = {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+        }
+
+    def _start(self):
+        if not self.response_started:
+            self.response_started = True
+            self.send(self.response_start)
+
+    def run(self, body):
+        result = self.wsgi_app(_build_environ(self.scope, body), self.start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    self._start()
+                    self.send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        self._start()
+        self.send({'type': 'http.response.body'})
+
+
+class MaestroASGI:
+    """ASGI application wrapping the Flask app.
+
+    Handles the lifespan protocol so that startup adopts the server loop and
+    shutdown drains the request threads and flushes storage.
+    """
+
+    def __init__(self, wsgi_app, workers=None):
+        self.wsgi_app = wsgi_app
+        self.workers = workers or int(os.environ.get('MATTER_MAESTRO_WORKERS', DEFAULT_WORKERS))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='asgi-worker')
+        self._connect_task = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        # Servers without lifespan support never call startup
+        background_loop.attach(asyncio.get_running_loop())
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+        if scope['method'] == 'GET' and scope['path'] == EVENTS_PATH:
+            await serve_events(scope, receive, send)
+            return
+        await _WsgiRequest(self.wsgi_app, self._executor, scope, send)(receive)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error(f"ASGI startup failed: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def startup(self):
+        background_loop.attach(asyncio.get_running_loop())
+        # Connect now so matter-server events reach their consumers before the first request
+        self._connect_task = asyncio.create_task(self._connect_matter_server())
+        backup_scheduler.start()
+        network_monitor.start()
+        logger.info(f"Matter Maestro ASGI application started with {self.workers} workers")
+
+    async def _connect_matter_server(self):
+        try:
+            await protocol_manager.initialize()
+        except Exception as e:
+            logger.warning(f"matter-server not reachable at startup, will keep retrying: {e}")
+
+    async def shutdown(self):
+        """Let in-flight requests finish, then persist everything."""
+        loop = asyncio.get_running_loop()
+        if self._connect_task is not None:
+            self._connect_task.cancel()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        await background_loop.run_shutdown_hooks()
+        await loop.run_in_executor(None, close_db)
+        background_loop.stop()
+        logger.info("Matter Maestro ASGI application stopped")
+
+
+application = MaestroASGI(app)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logger.info("Starting Matter Maestro ASGI server")
+    # Storage is owned by a single process, so scale with MATTER_MAESTRO_WORKERS threads
+    uvicorn.run(
+        application,
+        host=os.environ.get('MATTER_MAESTRO_HOST', '0.0.0.0'),
+        port=int(os.environ.get('MATTER_MAESTRO_PORT', 5000)),
+        timeout_graceful_shutdown=30,
+    )
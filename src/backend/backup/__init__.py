@@ -1,6 +1,7 @@
 """Backup management module for Matter Maestro."""
 
 from .manager import BackupManager, backup_manager
+from .scheduler import BackupScheduler, backup_scheduler
 from .routes import backup_blueprint
 
-__all__ = ['backup_manager', 'BackupManager', 'backup_blueprint']
+__all__ = ['backup_manager', 'BackupManager', 'backup_scheduler', 'BackupScheduler', 'backup_blueprint']
@@ -0,0 +1,110 @@
+"""Chunked, compressed and deduplicated backup archives."""
+import hashlib
+import json
+import zlib
+
+# Documents per chunk, by document ID range
+CHUNK_DOCS = 256
+COMPRESSION_LEVEL = 6
+
+
+def encode(value):
+    """Canonical JSON, so equal content always hashes the same."""
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+
+
+def object_key(digest):
+    return f'objects/{digest[:2]}/{digest}'
+
+
+def manifest_key(backup_id):
+    return f'manifests/{backup_id}.json'
+
+
+class BackupWriter:
+    """Streams tables into content-addressed chunks of a store.
+
+    A table is cut into chunks covering fixed ranges of ``CHUNK_DOCS``
+    document IDs. Updating a document only changes the chunk holding it
+    and new documents only touch the last chunk, so a backup taken after a
+    few changes mostly consists of chunks the store already holds. Chunks
+    are named by the SHA-256 of their content and only uploaded when
+    missing. Each table gets its own manifest listing its chunks; the
+    backup manifest ties the table manifests and any extra files together.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.tables = {}
+        self.files = {}
+        self.stats = {'objects': 0, 'uploaded': 0, 'bytes_uploaded': 0}
+
+    def _put_object(self, payload):
+        digest = hashlib.sha256(payload).hexdigest()
+        self.stats['objects'] += 1
+        key = object_key(digest)
+        if not self.store.exists(key):
+            compressed = zlib.compress(payload, COMPRESSION_LEVEL)
+            self.store.put(key, compressed)
+            self.stats['uploaded'] += 1
+            self.stats['bytes_uploaded'] += len(compressed)
+        return digest
+
+    def write_table(self, name, documents):
+        """Store ``(doc_id, document)`` pairs, which must come in ascending ID order."""
+        chunks = []
+        window, batch = None, []
+
+        def emit():
+            chunks.append({
+                'hash': self._put_object(encode(batch)),
+                'first_id': batch[0][0],
+                'last_id': batch[-1][0],
+                'documents': len(batch),
+            })
+
+        for doc_id, document in documents:
+            if batch and doc_id // CHUNK_DOCS != window:
+                emit()
+                batch = []
+            window = doc_id // CHUNK_DOCS
+            batch.append([doc_id, document])
+        if batch:
+            emit()
+
+        manifest = {'table': name, 'chunks': chunks}
+        self.tables[name] = {
+            'manifest': self._put_object(encode(manifest)),
+            'documents': sum(chunk['documents'] for chunk in chunks),
+            'chunks': len(chunks),
+        }
+
+    def write_file(self, name, content):
+        """Store a JSON document kept outside the database."""
+        self.files[name] = self._put_object(encode(content))
+
+    def finish(self, backup_id, **info):
+        """Write the backup manifest; returns it."""
+        manifest = {
+            'id': backup_id,
+            **info,
+            'tables': self.tables,
+            'files': self.files,
+            'stats': self.stats,
+        }
+        self.store.put(manifest_key(backup_id), encode(manifest))
+        return manifest
+
+
+def read_object(store, digest):
+    """Fetch, decompress and verify an object; returns its decoded content.
+
+    Raises ``ValueError`` if the content does not match its hash.
+    """
+    try:
+        payload = zlib.decompress(store.get(object_key(digest)))
+    except zlib.error:
+        raise ValueError(f"Backup object {digest} is corrupt") from None
+    if hashlib.sha256(payload).hexdigest() != digest:
+        raise ValueError(f"Backup object {digest} is corrupt")
+    return json.loads(payload)
@@ -1,13 +1,69 @@
 """Backup manager for handling cloud service integration and backup operations."""
-import os
+import asyncio
 import json
-from datetime import datetime
-from typing import Dict, Optional
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from tinydb.table import Document
+from ..credentials.credential_manager import credential_manager
 from ..logger import get_logger
 from ..database.database import initialize_db
+from ..scenes.scene_manager import scene_manager
+from .archive import BackupWriter, manifest_key, read_object
+from .snapshot import take_snapshot
+from .store import LocalDirectoryStore, MemoryStore
 
 logger = get_logger(__name__)
 
+DEFAULT_BACKUP_DIR = Path.home() / '.matter-maestro' / 'backups'
+
+# Runtime state that is rebuilt from the matter-server
+EXCLUDED_TABLES = ('device_liveness',)
+# Settings of this installation, which restoring a backup leaves alone
+RESTORE_SKIPPED_TABLES = ('backup_settings',)
+BACKUP_NICENESS = 10
+RESTORE_WORKERS = 8
+
+# Backup IDs are the UTC time the snapshot was taken, fixed width so they sort
+BACKUP_ID_FORMAT = '%Y%m%dT%H%M%S%fZ'
+BACKUP_ID_PATTERN = re.compile(r'\d{8}T\d{12}Z')
+
+
+def is_backup_id(value) -> bool:
+    """Whether ``value`` has the format of the IDs backups are stored under."""
+    return isinstance(value, str) and BACKUP_ID_PATTERN.fullmatch(value) is not None
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO 8601 point in time into naive UTC, as backup IDs use.
+
+    Times without an offset are taken as UTC. Raises ``ValueError`` for
+    anything else.
+    """
+    if not isinstance(value, str):
+        raise ValueError("Timestamp must be an ISO 8601 string")
+    try:
+        at = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid ISO 8601 timestamp: {value}") from None
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+
+def _lower_priority():
+    """Run the backup thread at a lower CPU priority where the OS allows it."""
+    try:
+        # On Linux this only affects the calling thread
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), BACKUP_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
 class BackupManager:
     """Manages cloud backup operations and configurations."""
     
@@ -15,16 +71,25 @@ class BackupManager:
         self.db = initialize_db()
         self.settings_table = self.db.table('backup_settings')
         self.current_config = self._load_config()
+        self.memory_store = MemoryStore()
+        # Backups run one at a time on their own low priority thread
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='backup', initializer=_lower_priority
+        )
+        self._backup_lock = threading.Lock()
+        self._restore_listeners = []
         
     def _load_config(self) -> Dict:
         """Load backup configuration from database."""
         config = self.settings_table.get(doc_id=1)
         if not config:
             default_config = {
-                'service': None,  # 'google_drive' or 'onedrive'
+                'service': None,  # 'local', 'memory', 'google_drive' or 'onedrive'
+                'local_path': None,  # Directory of the 'local' service
                 'auto_backup': False,
                 'interval': 'daily',  # 'realtime', 'hourly', 'daily', 'weekly'
                 'last_backup': None,
+                'last_backup_id': None,
                 'backup_enabled': False
             }
             self.settings_table.insert(default_config)
@@ -60,33 +125,37 @@ class BackupManager:
             logger.error(f"Authentication failed for {service}: {e}")
             return False
 
+    def _store(self):
+        """Object store of the configured service.
+
+        Without a service, backups go to ``~/.matter-maestro/backups``;
+        'memory' keeps them in process, which is meant for tests.
+        """
+        service = self.current_config.get('service')
+        if service in (None, 'local'):
+            return LocalDirectoryStore(self.current_config.get('local_path') or DEFAULT_BACKUP_DIR)
+        if service == 'memory':
+            return self.memory_store
+        # TODO: Implement Google Drive and OneDrive uploads
+        raise ValueError(f"Uploading to {service} is not implemented")
+
     async def perform_backup(self, manual: bool = False) -> Dict:
         """Perform backup operation."""
         try:
             if not self.current_config['backup_enabled']:
                 raise ValueError("Backup is not enabled")
 
-            backup_data = {
-                'timestamp': datetime.utcnow().isoformat(),
-                'database': self._backup_database(),
-                'fabric_info': self._backup_fabric_info(),
-                'device_configs': self._backup_device_configs()
-            }
-
-            # Upload to configured cloud service
-            if self.current_config['service'] == 'google_drive':
-                # TODO: Implement Google Drive upload
-                pass
-            elif self.current_config['service'] == 'onedrive':
-                # TODO: Implement OneDrive upload
-                pass
+            manifest = await asyncio.get_running_loop().run_in_executor(self.executor, self._write_backup)
+            self.update_config({'last_backup': manifest['timestamp'], 'last_backup_id': manifest['id']})
+            stats = manifest['stats']
+            logger.info(f"Backup {manifest['id']} completed, uploaded {stats['uploaded']}/{stats['objects']} "
+                        f"objects ({stats['bytes_uploaded']} bytes)")
 
-            self.update_config({'last_backup': backup_data['timestamp']})
-            logger.info(f"Backup completed successfully at {backup_data['timestamp']}")
-            
             return {
                 'success': True,
-                'timestamp': backup_data['timestamp'],
+                'backup_id': manifest['id'],
+                'timestamp': manifest['timestamp'],
+                'stats': stats,
                 'message': 'Backup completed successfully'
             }
         except Exception as e:
@@ -96,32 +165,93 @@ class BackupManager:
                 'error': str(e)
             }
 
-    def _backup_database(self) -> Dict:
-        """Backup TinyDB database."""
-        return {
-            'devices': self.db.table('devices').all(),
-            'virtual_circuits': self.db.table('virtual_circuits').all(),
-            'backup_settings': self.settings_table.all()
-        }
-
-    def _backup_fabric_info(self) -> Dict:
-        """Backup Matter fabric information."""
-        # TODO: Implement fabric info backup
-        return {}
-
-    def _backup_device_configs(self) -> Dict:
-        """Backup device configurations."""
-        # TODO: Implement device config backup
-        return {}
-
-    async def restore_backup(self, backup_id: str) -> Dict:
-        """Restore from a backup."""
+    def _write_backup(self) -> Dict:
+        """Stream a snapshot of the database and files into the store; returns the manifest.
+
+        Chunks the store already holds from earlier backups are not uploaded
+        again, so a backup costs roughly what changed since the last one.
+        """
+        with self._backup_lock, take_snapshot(self.db) as snapshot:
+            backup_id = snapshot.timestamp.strftime(BACKUP_ID_FORMAT)
+            writer = BackupWriter(self._store())
+            for name in snapshot.tables.tables():
+                if name not in EXCLUDED_TABLES:
+                    writer.write_table(name, snapshot.tables.documents(name))
+            writer.write_file('fabric_credentials', snapshot.credentials)
+            writer.write_file('scenes', snapshot.scenes)
+            return writer.finish(
+                backup_id,
+                timestamp=snapshot.timestamp.isoformat(),
+                parent=self.current_config.get('last_backup_id')
+            )
+
+    def list_backups(self) -> List[Dict]:
+        """Backups in the configured store, oldest first."""
+        store = self._store()
+        backups = []
+        for key in store.list('manifests'):
+            manifest = json.loads(store.get(key))
+            backups.append({
+                'id': manifest['id'],
+                'timestamp': manifest['timestamp'],
+                'parent': manifest.get('parent'),
+                'tables': {name: table['documents'] for name, table in manifest['tables'].items()},
+                'stats': manifest['stats'],
+            })
+        return backups
+
+    def find_backup(self, store, backup_id: Optional[str] = None, at: Optional[datetime] = None) -> Dict:
+        """Manifest of a backup, by ID or as the latest one taken at or before ``at``.
+
+        ``at`` is a naive UTC datetime, see ``parse_timestamp``. Without
+        either, or with the ID 'latest', the newest backup is returned.
+        Raises ``ValueError`` for a malformed ID and ``LookupError`` if
+        there is no such backup.
+        """
+        if backup_id and backup_id != 'latest':
+            # The ID becomes part of a store key, so nothing but the format is let through
+            if not is_backup_id(backup_id):
+                raise ValueError(f"Invalid backup ID: {backup_id}")
+            try:
+                return json.loads(store.get(manifest_key(backup_id)))
+            except FileNotFoundError:
+                raise LookupError(f"Backup {backup_id} not found") from None
+
+        backup_ids = [
+            key.rsplit('/', 1)[-1][:-len('.json')] for key in store.list('manifests')
+        ]
+        backup_ids = [candidate for candidate in backup_ids if is_backup_id(candidate)]
+        if at is not None:
+            limit = at.strftime(BACKUP_ID_FORMAT)
+            backup_ids = [candidate for candidate in backup_ids if candidate <= limit]
+        if not backup_ids:
+            raise LookupError("No matching backup found")
+        return json.loads(store.get(manifest_key(max(backup_ids))))
+
+    def add_restore_listener(self, callback):
+        """Register ``callback()`` to reload in-memory state after a restore."""
+        self._restore_listeners.append(callback)
+
+    async def restore_backup(self, backup_id: Optional[str] = None, at: Optional[datetime] = None) -> Dict:
+        """Restore from a backup, chosen by ID or point in time."""
         try:
-            # TODO: Implement backup restoration
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, self._restore, backup_id, at
+            )
+            for listener in self._restore_listeners:
+                listener()
+            logger.info(f"Restored backup {result['backup_id']} in {result['duration_ms']}ms")
             return {
                 'success': True,
+                **result,
                 'message': 'Backup restored successfully'
             }
+        except LookupError as e:
+            return {
+                'success': False,
+                'not_found': True,
+                'error': str(e)
+            }
         except Exception as e:
             logger.error(f"Restore failed: {e}")
             return {
@@ -129,5 +259,65 @@ class BackupManager:
                 'error': str(e)
             }
 
+    def _restore(self, backup_id, at) -> Dict:
+        """Fetch and verify the whole backup, then load it in one transaction.
+
+        Objects are downloaded, decompressed and checked in parallel. Nothing
+        is written unless every object matches its hash, and tables are
+        replaced wholesale with one bulk insert each.
+        """
+        with self._backup_lock:
+            started = time.monotonic()
+            store = self._store()
+            manifest = self.find_backup(store, backup_id, at)
+
+            tables = {
+                name: table for name, table in manifest['tables'].items()
+                if name not in RESTORE_SKIPPED_TABLES and name not in EXCLUDED_TABLES
+            }
+            with ThreadPoolExecutor(max_workers=RESTORE_WORKERS, thread_name_prefix='restore') as pool:
+                table_manifests = dict(zip(tables, pool.map(
+                    lambda name: read_object(store, tables[name]['manifest']), tables
+                )))
+                files = dict(zip(manifest['files'], pool.map(
+                    lambda digest: read_object(store, digest), manifest['files'].values()
+                )))
+                digests = list({
+                    chunk['hash'] for table in table_manifests.values() for chunk in table['chunks']
+                })
+                chunks = dict(zip(digests, pool.map(lambda digest: read_object(store, digest), digests)))
+
+            restored = {}
+            # The same barrier as snapshots, so none sees a half restored state
+            with self.db.transaction(), scene_manager.locked(), credential_manager.locked():
+                for name, table_manifest in table_manifests.items():
+                    documents = [
+                        Document(document, doc_id=doc_id)
+                        for chunk in table_manifest['chunks']
+                        for doc_id, document in chunks[chunk['hash']]
+                    ]
+                    table = self.db.table(name)
+                    table.truncate()
+                    table.insert_multiple(documents)
+                    restored[name] = len(documents)
+                # Tables created after the backup was taken did not exist at that point
+                for name in self.db.tables():
+                    if name not in restored and name not in RESTORE_SKIPPED_TABLES and name not in EXCLUDED_TABLES:
+                        self.db.table(name).truncate()
+
+                if 'fabric_credentials' in files:
+                    credential_manager.save_credentials(files['fabric_credentials'])
+                if 'scenes' in files:
+                    scene_manager.save_scenes(files['scenes'])
+            self.db.flush()
+            scene_manager.flush()
+
+            return {
+                'backup_id': manifest['id'],
+                'timestamp': manifest['timestamp'],
+                'tables': restored,
+                'duration_ms': round((time.monotonic() - started) * 1000, 1)
+            }
+
 # Create a singleton instance
 backup_manager = BackupManager()
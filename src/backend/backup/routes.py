@@ -1,7 +1,8 @@
 """Routes for backup management interface."""
 from flask import Blueprint, jsonify, request, render_template
 from ..logger import get_logger
-from .manager import backup_manager
+from .manager import backup_manager, is_backup_id, parse_timestamp
+from .scheduler import backup_scheduler
 
 backup_blueprint = Blueprint('backup', __name__)
 logger = get_logger(__name__)
@@ -22,6 +23,7 @@ def update_backup_config():
     try:
         config = request.get_json()
         updated_config = backup_manager.update_config(config)
+        backup_scheduler.wake()
         return jsonify(updated_config)
     except Exception as e:
         logger.error(f"Error updating backup config: {e}")
@@ -58,13 +60,41 @@ async def trigger_backup():
         logger.error(f"Error triggering backup: {e}")
         return jsonify({'error': str(e)}), 500
 
+@backup_blueprint.route('/backups', methods=['GET'])
+def list_backups():
+    """List the backups in the configured store."""
+    try:
+        return jsonify(backup_manager.list_backups())
+    except Exception as e:
+        logger.error(f"Error listing backups: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@backup_blueprint.route('/restore', methods=['POST'])
+async def restore_backup_at():
+    """Restore the latest backup taken at or before a point in time."""
+    data = request.get_json(silent=True) or {}
+    at = None
+    if data.get('timestamp'):
+        try:
+            at = parse_timestamp(data['timestamp'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return await _restore(at=at)
+
 @backup_blueprint.route('/restore/<backup_id>', methods=['POST'])
 async def restore_backup(backup_id):
-    """Restore from a specific backup."""
+    """Restore from a specific backup, or the newest one with 'latest'."""
+    if backup_id != 'latest' and not is_backup_id(backup_id):
+        return jsonify({'error': f'Invalid backup ID: {backup_id}'}), 400
+    return await _restore(backup_id=backup_id)
+
+async def _restore(backup_id=None, at=None):
     try:
-        result = await backup_manager.restore_backup(backup_id)
+        result = await backup_manager.restore_backup(backup_id, at)
         if result['success']:
             return jsonify(result)
+        if result.get('not_found'):
+            return jsonify(result), 404
         return jsonify(result), 500
     except Exception as e:
         logger.error(f"Error restoring backup: {e}")
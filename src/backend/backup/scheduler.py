@@ -0,0 +1,151 @@
+"""Background scheduling of backups according to the backup settings."""
+import asyncio
+import time
+from datetime import datetime
+from ..event_loop import background_loop
+from ..logger import get_logger
+from .manager import EXCLUDED_TABLES, backup_manager, parse_timestamp
+
+logger = get_logger(__name__)
+
+INTERVALS = {
+    'hourly': 3600,
+    'daily': 24 * 3600,
+    'weekly': 7 * 24 * 3600,
+}
+# A realtime backup runs once changes have paused for REALTIME_QUIET seconds,
+# or REALTIME_MAX_DELAY seconds after the first change if they keep coming
+REALTIME_QUIET = 5.0
+REALTIME_MAX_DELAY = 60.0
+RETRY_DELAY = 300
+
+# Tables whose changes do not call for a realtime backup
+IGNORED_TABLES = ('backup_settings', *EXCLUDED_TABLES)
+
+
+class BackupScheduler:
+    """Runs backups when ``auto_backup`` is on, as often as ``interval`` says.
+
+    Hourly, daily and weekly backups are due that long after
+    ``last_backup``. In 'realtime' mode the storage layer's change
+    notifications are debounced into incremental backups. The scheduler
+    lives on the shared event loop and only waits there; the backups
+    themselves run on the backup manager's low priority thread. Failed
+    backups are retried after ``RETRY_DELAY`` seconds.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._loop = None
+        self._task = None
+        self._wake = None
+        self._first_change = None
+        self._last_change = None
+        self._retry_at = None
+        self._remove_listener = None
+
+    def start(self):
+        """Start scheduling; safe to call from any thread."""
+        if not background_loop.in_loop_thread():
+            background_loop.loop.call_soon_threadsafe(self.start)
+            return
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._remove_listener = self.manager.db.versions.add_listener(self._on_storage_change)
+        self._task = asyncio.create_task(self._run())
+        background_loop.on_shutdown(self.stop)
+        logger.info("Started backup scheduler")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._remove_listener()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def wake(self):
+        """Re-read the settings now; safe to call from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _on_storage_change(self, table_name, doc_ids):
+        # Called on the writing thread
+        if table_name not in IGNORED_TABLES and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._changed)
+
+    def _changed(self):
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        self._last_change = now
+        if self.manager.get_config().get('interval') == 'realtime':
+            self._wake.set()
+
+    def _next_delay(self):
+        """Seconds until the next backup is due, or None if none is."""
+        config = self.manager.get_config()
+        if not (config.get('backup_enabled') and config.get('auto_backup')):
+            return None
+
+        now = time.monotonic()
+        if self._retry_at is not None and now < self._retry_at:
+            return self._retry_at - now
+
+        interval = config.get('interval')
+        if interval == 'realtime':
+            if self._first_change is None:
+                return None
+            due = min(self._last_change + REALTIME_QUIET, self._first_change + REALTIME_MAX_DELAY)
+            return max(0.0, due - now)
+
+        period = INTERVALS.get(interval)
+        if period is None:
+            return None
+        if not config.get('last_backup'):
+            return 0.0
+        try:
+            last_backup = parse_timestamp(config['last_backup'])
+        except ValueError:
+            # The settings accept any value; one we cannot read counts as never
+            logger.warning(f"Ignoring invalid last_backup {config['last_backup']!r}")
+            return 0.0
+        elapsed = (datetime.utcnow() - last_backup).total_seconds()
+        return max(0.0, period - elapsed)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                delay = self._next_delay()
+            except Exception as e:
+                logger.error(f"Failed to schedule the next backup: {e}")
+                delay = RETRY_DELAY
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._backup()
+            except Exception as e:
+                self._retry_at = time.monotonic() + RETRY_DELAY
+                logger.error(f"Scheduled backup failed, retrying in {RETRY_DELAY}s: {e}")
+
+    async def _backup(self):
+        # Changes made while the backup runs are left for the next one
+        self._first_change = self._last_change = None
+        result = await self.manager.perform_backup()
+        if result['success']:
+            self._retry_at = None
+        else:
+            self._retry_at = time.monotonic() + RETRY_DELAY
+            logger.warning(f"Scheduled backup failed, retrying in {RETRY_DELAY}s")
+
+
+# Create a singleton instance
+backup_scheduler = BackupScheduler(backup_manager)
@@ -0,0 +1,60 @@
+"""Consistent snapshots of the database, scenes and fabric credentials."""
+import copy
+import time
+from datetime import datetime
+from ..credentials.credential_manager import credential_manager
+from ..database.database import initialize_db
+from ..logger import get_logger
+from ..scenes.scene_manager import scene_manager
+
+logger = get_logger(__name__)
+
+
+class Snapshot:
+    """The three stores as they were at one instant.
+
+    ``tables`` is the database snapshot (``tables()``, ``documents(name)``);
+    ``scenes`` and ``credentials`` are private copies of the scene and
+    credential data. Close it once read so SQLite can release its view.
+    """
+
+    def __init__(self, tables, scenes, credentials, timestamp):
+        self.tables = tables
+        self.scenes = scenes
+        self.credentials = credentials
+        self.timestamp = timestamp
+
+    def close(self):
+        self.tables.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def take_snapshot(db=None):
+    """Capture the database, scenes and fabric credentials at one logical instant.
+
+    Writers to all three stores are held back by a short barrier: the
+    database's write transaction plus the scene and credential locks,
+    always taken in that order. Only the in-memory copy (TinyDB) or the
+    start of a read transaction (SQLite) happens inside it; reading the
+    snapshot afterwards does not block anyone.
+    """
+    if db is None:
+        db = initialize_db()
+    started = time.monotonic()
+    with db.transaction(), scene_manager.locked(), credential_manager.locked():
+        timestamp = datetime.utcnow()
+        tables = db.capture()
+        try:
+            scenes = copy.deepcopy(scene_manager.load_scenes())
+            credentials = credential_manager.load_credentials()
+        except Exception:
+            tables.close()
+            raise
+    logger.debug(f"Took snapshot in {(time.monotonic() - started) * 1000:.1f}ms")
+    return Snapshot(tables, scenes, credentials, timestamp)
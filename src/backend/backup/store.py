@@ -0,0 +1,71 @@
+"""Object stores that backups are written to."""
+import os
+import threading
+from pathlib import Path
+
+
+class LocalDirectoryStore:
+    """Objects kept as files below a local directory.
+
+    Keys are relative paths; every object is written to a temporary file and
+    renamed into place, so readers never see a partial object.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root).expanduser()
+
+    def _path(self, key):
+        return self.root / key
+
+    def exists(self, key):
+        return self._path(key).exists()
+
+    def put(self, key, data):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        with open(self._path(key), 'rb') as f:
+            return f.read()
+
+    def list(self, prefix):
+        """Keys below the ``prefix`` directory."""
+        directory = self._path(prefix)
+        if not directory.is_dir():
+            return []
+        return sorted(
+            str(path.relative_to(self.root)) for path in directory.rglob('*')
+            if path.is_file() and not path.name.endswith('.tmp')
+        )
+
+
+class MemoryStore:
+    """In-process object store with the interface of a remote bucket."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._objects = {}
+
+    def exists(self, key):
+        return key in self._objects
+
+    def put(self, key, data):
+        with self._lock:
+            self._objects[key] = bytes(data)
+
+    def get(self, key):
+        try:
+            return self._objects[key]
+        except KeyError:
+            raise FileNotFoundError(key) from None
+
+    def list(self, prefix):
+        prefix = prefix.rstrip('/') + '/'
+        with self._lock:
+            return sorted(key for key in self._objects if key.startswith(prefix))
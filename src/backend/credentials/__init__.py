@@ -1,3 +1,3 @@
-from .credential_manager import CredentialManager
+from .credential_manager import CredentialManager, credential_manager
 
-__all__ = ['CredentialManager']
+__all__ = ['CredentialManager', 'credential_manager']
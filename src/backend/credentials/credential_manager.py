@@ -1,16 +1,29 @@
+import copy
 import os
+import threading
 from pathlib import Path
 import json
 import uuid
+from ..database.storage import write_atomic
 from ..logger import get_logger
 
 logger = get_logger(__name__)
 
 class CredentialManager:
+    """Fabric credentials, cached in memory.
+
+    The file is parsed once and re-read only when its mtime, inode or size
+    changes. Saves replace it atomically so a crash never leaves a partial
+    fabric behind.
+    """
+
     def __init__(self):
         self.cred_dir = Path.home() / '.matter-maestro' / 'credentials'
         self.cred_dir.mkdir(parents=True, exist_ok=True)
         self.cred_file = self.cred_dir / 'fabric_credentials.json'
+        self._lock = threading.RLock()
+        self._cache = None
+        self._file_id = None
         logger.debug(f"Initializing CredentialManager with directory: {self.cred_dir}")
 
         if not self.cred_file.exists():
@@ -74,29 +87,54 @@ class CredentialManager:
             logger.error(f"Failed to delete credentials: {e}")
             return False
 
+    def locked(self):
+        """Context manager keeping the credentials from changing while held."""
+        return self._lock
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.cred_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
     def save_credentials(self, credentials):
         """Save credentials to file."""
         try:
             logger.debug(f"Saving credentials to {self.cred_file}")
-            with open(self.cred_file, 'w') as f:
-                json.dump(credentials, f, indent=2)
+            with self._lock:
+                write_atomic(self.cred_file, json.dumps(credentials, indent=2))
+                self._cache = copy.deepcopy(credentials)
+                self._file_id = self._stat()
             logger.info("Credentials saved successfully")
         except Exception as e:
             logger.error(f"Failed to save credentials: {e}")
             raise
 
-    def load_credentials(self):
-        """Load credentials from file."""
-        try:
-            logger.debug(f"Loading credentials from {self.cred_file}")
-            if not self.cred_file.exists():
+    def _load(self):
+        """Cached credentials, re-read if the file changed. Do not modify."""
+        with self._lock:
+            file_id = self._stat()
+            if file_id is None:
+                self._cache = self._file_id = None
                 logger.error("Credentials file not found")
                 raise FileNotFoundError("Credentials file does not exist")
+            if self._cache is not None and file_id == self._file_id:
+                return self._cache
 
+            logger.debug(f"Loading credentials from {self.cred_file}")
             with open(self.cred_file, 'r') as f:
                 creds = json.load(f)
+            creds.setdefault('devices', {})
+            self._cache = creds
+            self._file_id = file_id
             logger.debug(f"Loaded credentials with fabric ID: {creds.get('fabric_id', 'Not Set')}")
             return creds
+
+    def load_credentials(self):
+        """Load credentials from file."""
+        try:
+            return copy.deepcopy(self._load())
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse credentials file: {e}")
             raise
@@ -104,16 +142,55 @@ class CredentialManager:
             logger.error(f"Failed to load credentials: {e}")
             raise
 
+    def get_device_credentials(self, node_id):
+        """Credentials stored for one device, or None."""
+        try:
+            device = self._load()['devices'].get(str(node_id))
+            return copy.deepcopy(device)
+        except Exception as e:
+            logger.error(f"Failed to get credentials for device {node_id}: {e}")
+            return None
+
+    def set_device_credentials(self, node_id, device_credentials):
+        """Store the credentials of one device."""
+        try:
+            with self._lock:
+                creds = self._load()
+                self.save_credentials({
+                    **creds,
+                    'devices': {**creds['devices'], str(node_id): device_credentials}
+                })
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save credentials for device {node_id}: {e}")
+            return False
+
+    def remove_device_credentials(self, node_id):
+        """Forget the credentials of one device."""
+        try:
+            with self._lock:
+                creds = self._load()
+                if str(node_id) not in creds['devices']:
+                    return False
+                devices = dict(creds['devices'])
+                del devices[str(node_id)]
+                self.save_credentials({**creds, 'devices': devices})
+            return True
+        except Exception as e:
+            logger.error(f"Failed to remove credentials for device {node_id}: {e}")
+            return False
+
     def update_fabric_id(self, new_fabric_id):
         """Update the fabric ID."""
         try:
             logger.info(f"Updating fabric ID to: {new_fabric_id}")
-            creds = self.load_credentials()
-            old_id = creds.get('fabric_id')
-            creds['fabric_id'] = new_fabric_id
-            if creds.get('operational_credentials'):
-                creds['operational_credentials']['fabric_id'] = new_fabric_id
-            self.save_credentials(creds)
+            with self._lock:
+                creds = self.load_credentials()
+                old_id = creds.get('fabric_id')
+                creds['fabric_id'] = new_fabric_id
+                if creds.get('operational_credentials'):
+                    creds['operational_credentials']['fabric_id'] = new_fabric_id
+                self.save_credentials(creds)
             logger.info(f"Successfully updated fabric ID from {old_id} to {new_fabric_id}")
             return True
         except Exception as e:
@@ -123,7 +200,7 @@ class CredentialManager:
     def get_fabric_info(self):
         """Get current fabric information including operational status."""
         try:
-            creds = self.load_credentials()
+            creds = self._load()
             fabric_info = {
                 'fabric_id': creds.get('fabric_id'),
                 'vendor_id': creds.get('vendor_id'),
@@ -134,4 +211,7 @@ class CredentialManager:
             return fabric_info
         except Exception as e:
             logger.error(f"Failed to get fabric info: {e}")
-            return None
\ No newline at end of file
+            return None
+
+# Create a singleton instance
+credential_manager = CredentialManager()
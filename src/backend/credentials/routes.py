@@ -1,11 +1,10 @@
 import re
 from flask import Blueprint, jsonify, request, render_template
 from ..logger import get_logger
-from .credential_manager import CredentialManager
+from .credential_manager import credential_manager
 
 credentials_blueprint = Blueprint('credentials', __name__)
 logger = get_logger(__name__)
-credential_manager = CredentialManager()
 
 @credentials_blueprint.route('/ui', methods=['GET'])
 def credentials_ui():
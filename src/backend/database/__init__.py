@@ -1,3 +1,3 @@
-from .database import initialize_db, get_table
+from .database import initialize_db, close_db, get_table
 
-__all__ = ['initialize_db', 'get_table']
+__all__ = ['initialize_db', 'close_db', 'get_table']
@@ -0,0 +1,85 @@
+"""Batched create/update/delete of documents in a single storage transaction."""
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+MAX_BATCH_SIZE = 1000
+
+
+def parse_batch(body):
+    """Extract the operation list from a batch request body.
+
+    The body is either a list of operations or an object with an
+    ``operations`` list. Raises ``ValueError`` if it is neither.
+    """
+    operations = body.get('operations') if isinstance(body, dict) else body
+    if not isinstance(operations, list):
+        raise ValueError('Expected a list of operations')
+    if len(operations) > MAX_BATCH_SIZE:
+        raise ValueError(f'A batch holds at most {MAX_BATCH_SIZE} operations')
+    return operations
+
+
+def _apply(table, operation, validate):
+    if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+        return {'status': 400, 'error': f"'op' must be one of {', '.join(BATCH_OPERATIONS)}"}
+    op = operation['op']
+    data = operation.get('data') or {}
+    if not isinstance(data, dict):
+        return {'op': op, 'status': 400, 'error': "'data' must be an object"}
+
+    if op != 'create':
+        try:
+            doc_id = int(operation.get('id'))
+        except (TypeError, ValueError):
+            return {'op': op, 'status': 400, 'error': "'id' must be an integer"}
+        if not table.contains(doc_id=doc_id):
+            return {'op': op, 'id': doc_id, 'status': 404, 'error': 'Not found'}
+
+    if op != 'delete' and validate:
+        error = validate(op, data)
+        if error:
+            return {'op': op, 'status': 400, 'error': error}
+
+    if op == 'create':
+        return {'op': op, 'id': table.insert(data), 'status': 201, 'data': data}
+    if op == 'update':
+        table.update(data, doc_ids=[doc_id])
+        return {'op': op, 'id': doc_id, 'status': 200, 'data': data}
+    table.remove(doc_ids=[doc_id])
+    return {'op': op, 'id': doc_id, 'status': 200}
+
+
+def apply_batch(db, table, operations, validate=None):
+    """Apply create/update/delete operations to ``table`` in one transaction.
+
+    Each operation is ``{'op': ..., 'id': ..., 'data': {...}}``; ``id`` is
+    required for update and delete, ``data`` for create and update.
+    ``validate(op, data)`` may normalize ``data`` in place and returns an
+    error message to reject the item. Items succeed or fail on their own,
+    an item that raises leaves nothing behind, and the batch is persisted
+    with a single flush. Returns one result per operation with an HTTP-like
+    ``status``.
+    """
+    results = []
+    with db.transaction():
+        for index, operation in enumerate(operations):
+            try:
+                with db.savepoint(table.name):
+                    result = _apply(table, operation, validate)
+            except Exception as e:
+                logger.error(f"Error applying batch operation {index} to {table.name}: {e}")
+                result = {'status': 500, 'error': 'Failed to apply operation'}
+            results.append({'index': index, **result})
+    db.flush()
+
+    summary = batch_summary(results)
+    logger.info(f"Applied batch to {table.name}: {summary['succeeded']}/{len(results)} operations succeeded")
+    return results
+
+
+def batch_summary(results):
+    """Response body for a batch: counts plus the per-item results."""
+    succeeded = sum(1 for result in results if result['status'] < 400)
+    return {'succeeded': succeeded, 'failed': len(results) - succeeded, 'results': results}
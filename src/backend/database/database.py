@@ -1,15 +1,61 @@
-from tinydb import TinyDB
 from pathlib import Path
+import atexit
+import threading
 import appdirs
 import os
+from ..logger import get_logger
+from .journal import JournalStorage
+from .sqlite import SQLiteDatabase, migrate_from_json
+from .storage import BufferedJSONStorage, SharedTinyDB
 
-def initialize_db():
-    """Initialize TinyDB database in user data directory."""
-    data_dir = appdirs.user_data_dir("matter-maestro")
-    os.makedirs(data_dir, exist_ok=True)
-    
-    db_path = Path(data_dir) / "matter_maestro.json"
-    return TinyDB(db_path)
+logger = get_logger(__name__)
+
+# Storage backends selectable through the MATTER_MAESTRO_STORAGE environment variable.
+# The TinyDB ones share matter_maestro.json; 'sqlite' migrates from it on first use.
+STORAGE_BACKENDS = {
+    'json': BufferedJSONStorage,
+    'journal': JournalStorage,
+    'sqlite': SQLiteDatabase,
+}
+
+_db = None
+_db_lock = threading.Lock()
+
+def initialize_db(storage=None):
+    """Return the process-wide database, opening it in the user data directory on first use.
+
+    ``storage`` names one of ``STORAGE_BACKENDS`` and defaults to the
+    MATTER_MAESTRO_STORAGE environment variable, then to 'json'. It only
+    matters for the call that opens the database.
+    """
+    global _db
+    with _db_lock:
+        if _db is None:
+            backend = storage or os.environ.get('MATTER_MAESTRO_STORAGE', 'json')
+            if backend not in STORAGE_BACKENDS:
+                raise ValueError(f"Unknown storage backend: {backend}")
+
+            data_dir = appdirs.user_data_dir("matter-maestro")
+            os.makedirs(data_dir, exist_ok=True)
+
+            db_path = Path(data_dir) / "matter_maestro.json"
+            if backend == 'sqlite':
+                json_path, db_path = db_path, db_path.with_suffix('.sqlite3')
+                _db = SQLiteDatabase(db_path)
+                migrate_from_json(_db, json_path)
+            else:
+                _db = SharedTinyDB(db_path, storage=STORAGE_BACKENDS[backend])
+            atexit.register(close_db)
+            logger.info(f"Opened database {db_path} with '{backend}' storage")
+        return _db
+
+def close_db():
+    """Flush pending writes and close the shared database."""
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
 
 def get_table(db, table_name):
     """Get or create a table in the database."""
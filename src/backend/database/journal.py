@@ -0,0 +1,221 @@
+"""Append-only journal storage for the shared database."""
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from tinydb.storages import Storage
+from ..logger import get_logger
+from .storage import SnapshotEncoder, VersionCounters, load_snapshot, write_atomic
+
+logger = get_logger(__name__)
+
+
+class JournalStorage(Storage):
+    """Snapshot plus an append-only journal of document mutations.
+
+    Every mutation appends one line per touched document to the journal, so
+    a write costs the size of the documents it changed rather than the size
+    of the database. A writer thread fsyncs the journal in batches every
+    ``fsync_interval`` seconds and, once the journal grows past
+    ``compact_threshold`` bytes, folds it into a fresh snapshot.
+
+    The snapshot has the same format as the plain JSON storage, and closing
+    the storage compacts the journal away, so the two backends can be
+    switched freely. A handle that never wrote leaves the files alone when
+    closed: another process may have written since it opened, e.g. the
+    child of the development server's reloader.
+    """
+
+    def __init__(self, path, fsync_interval=0.05, compact_threshold=4 * 1024 * 1024):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix('.journal')
+        self.rotated_path = self.path.with_suffix('.journal.old')
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self.lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self.versions = VersionCounters()
+        self._encoder = SnapshotEncoder()
+
+        self._data = load_snapshot(self.path)
+        replayed = self._replay(self.rotated_path) + self._replay(self.journal_path)
+        if replayed:
+            logger.info(f"Replayed {replayed} journal entries into {self.path}")
+
+        self._journal = open(self.journal_path, 'ab')
+        self._journal_size = self.journal_path.stat().st_size
+        self._unsynced = threading.Event()
+        self._closed = threading.Event()
+        self._batch = None
+        # Whether this handle changed the files since it opened them
+        self._written = False
+
+        if self.rotated_path.exists():
+            # A compaction was interrupted before its snapshot landed
+            self._compact()
+
+        self._writer = threading.Thread(
+            target=self._writer_loop, name='journal-writer', daemon=True
+        )
+        self._writer.start()
+
+    def _replay(self, path):
+        """Apply the entries of a journal file to the in-memory data."""
+        if not path.exists():
+            return 0
+
+        count = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Only the tail can be torn, by a crash in the middle of an append
+                    logger.warning(f"Ignoring incomplete journal entry in {path}")
+                    break
+                self._apply(entry)
+                count += 1
+        return count
+
+    def _apply(self, entry):
+        table_name = entry['t']
+        if 'id' not in entry:
+            self._data[table_name] = {}
+            return
+
+        table = self._data.setdefault(table_name, {})
+        if 'doc' in entry:
+            table[entry['id']] = entry['doc']
+        else:
+            table.pop(entry['id'], None)
+
+    def read(self):
+        return self._data or None
+
+    def write(self, data):
+        # Persistence happens per document in record()
+        self._data = data
+
+    def record(self, table_name, doc_ids):
+        """Append the current state of the touched documents to the journal."""
+        self.versions.bump(table_name, doc_ids)
+        if doc_ids is None:
+            entries = [{'t': table_name}]
+        else:
+            table = (self._data or {}).get(table_name, {})
+            entries = []
+            for doc_id in doc_ids:
+                entry = {'t': table_name, 'id': str(doc_id)}
+                doc = table.get(str(doc_id))
+                if doc is not None:
+                    entry['doc'] = doc
+                entries.append(entry)
+
+        if not entries:
+            return
+
+        payload = ''.join(json.dumps(entry) + '\n' for entry in entries).encode()
+        with self.lock:
+            if self._batch is not None:
+                self._batch.append(payload)
+            else:
+                self._append(payload)
+
+    @contextmanager
+    def transaction(self):
+        """Hold the storage for a batch of mutations and journal them in one append."""
+        with self.lock:
+            if self._batch is not None:
+                yield
+                return
+            self._batch = []
+            try:
+                yield
+            finally:
+                batch, self._batch = self._batch, None
+                if batch:
+                    self._append(b''.join(batch))
+
+    def _append(self, payload):
+        with self.lock:
+            self._written = True
+            self._journal.write(payload)
+            # Hand the entry to the OS right away; only the fsync is batched
+            self._journal.flush()
+            self._journal_size += len(payload)
+            self._unsynced.set()
+
+    def _writer_loop(self):
+        """Fsync and compact the journal until the storage is closed."""
+        while not self._closed.is_set():
+            self._unsynced.wait()
+            # Let concurrent writes share a single fsync
+            self._closed.wait(self.fsync_interval)
+            try:
+                self.flush()
+                if self._journal_size >= self.compact_threshold:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Failed to persist journal {self.journal_path}: {e}")
+
+    def flush(self):
+        """Fsync journal entries that are not durable yet."""
+        with self.lock:
+            if not self._unsynced.is_set():
+                return
+            self._unsynced.clear()
+            fd = os.dup(self._journal.fileno())
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot.
+
+        The snapshot is encoded and the journal rotated at the same instant,
+        so replaying the rotated journal over either the old or the new
+        snapshot yields the same state if we crash half way.
+        """
+        with self.lock:
+            self._written = True
+        self._compact()
+
+    def _compact(self):
+        # Compactions share the rotated journal and the temporary snapshot file
+        with self._compact_lock:
+            with self.lock:
+                payload = self._encoder.encode(self._data)
+                self._rotate()
+
+            write_atomic(self.path, payload)
+            os.remove(self.rotated_path)
+        logger.debug(f"Compacted journal into {self.path}")
+
+    def _rotate(self):
+        self._journal.close()
+        if self.rotated_path.exists():
+            # A previous compaction failed; keep its entries ahead of ours
+            with open(self.rotated_path, 'ab') as rotated, open(self.journal_path, 'rb') as journal:
+                shutil.copyfileobj(journal, rotated)
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.rotated_path)
+        self._journal = open(self.journal_path, 'ab')
+        self._journal_size = 0
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._unsynced.set()  # Wake the writer so it can exit
+        self._writer.join()
+        if not self._written:
+            self._journal.close()
+            return
+        self.compact()
+        self._journal.close()
+        os.remove(self.journal_path)
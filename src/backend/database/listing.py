@@ -0,0 +1,100 @@
+"""Cursor pagination, filtering and field projection for list endpoints."""
+from urllib.parse import urlencode
+from flask import Response, jsonify, make_response, request
+
+MAX_LIMIT = 1000
+
+
+def is_truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def filter_documents(documents, fields):
+    """Keep documents whose ``fields`` match the query string.
+
+    A field given in the query string must equal the document's value,
+    compared as strings; booleans accept true/false, 1/0 and yes/no.
+    Fields missing from the query string do not filter.
+    """
+    wanted = {field: request.args[field] for field in fields if field in request.args}
+    if not wanted:
+        return documents
+
+    def matches(doc):
+        for field, value in wanted.items():
+            actual = doc.get(field)
+            if isinstance(actual, bool):
+                if actual != is_truthy(value):
+                    return False
+            elif str(actual) != value:
+                return False
+        return True
+
+    return [doc for doc in documents if matches(doc)]
+
+
+def list_response(documents, decorate=None):
+    """Serve documents as a page of the list, honouring cursor, limit and fields.
+
+    ``cursor`` is the value of a previous page's X-Next-Cursor header and
+    ``limit`` caps the page size; without either, everything is returned as
+    before. ``fields`` is a comma separated projection, ``id`` is always
+    included. ``decorate(item)`` adds computed values and only runs for the
+    documents on the page. The body stays a plain array; the next cursor is
+    sent in the X-Next-Cursor and Link headers and the filtered total in
+    X-Total-Count.
+    """
+    documents = sorted(documents, key=lambda doc: doc.doc_id)
+    total = len(documents)
+
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit')
+    try:
+        if cursor is not None:
+            after = int(cursor)
+            documents = [doc for doc in documents if doc.doc_id > after]
+        if limit is not None:
+            limit = max(1, min(int(limit), MAX_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'cursor and limit must be integers'}), 400
+
+    next_cursor = None
+    if limit is not None and len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = str(documents[-1].doc_id)
+
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    items = []
+    for doc in documents:
+        item = {'id': doc.doc_id, **doc}
+        if decorate:
+            decorate(item)
+        if fields:
+            item = {key: value for key, value in item.items() if key == 'id' or key in fields}
+        items.append(item)
+
+    response = jsonify(items)
+    response.headers['X-Total-Count'] = str(total)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+        query = urlencode({**request.args.to_dict(), 'cursor': next_cursor})
+        response.headers['Link'] = f'<{request.path}?{query}>; rel="next"'
+    return response
+
+
+def conditional(etag, build):
+    """Answer with 304 if the client holds ``etag``, otherwise with ``build()``.
+
+    ``build`` is only called when the body is needed; successful responses
+    carry ``etag`` as a strong ETag. Read the versions ``etag`` is made of
+    before reading the data, so a tag never claims newer data than it covers.
+    """
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = make_response(build())
+    if response.status_code == 200:
+        response.set_etag(etag)
+    return response
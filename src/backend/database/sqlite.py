@@ -0,0 +1,384 @@
+"""SQLite document store exposing the table API the blueprints use."""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from tinydb.table import Document
+from ..logger import get_logger
+from .journal import JournalStorage
+from .storage import VersionCounters, device_refs, load_snapshot
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    table_name TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    node_id TEXT,
+    PRIMARY KEY (table_name, doc_id)
+);
+CREATE INDEX IF NOT EXISTS documents_node_id
+    ON documents (table_name, node_id) WHERE node_id IS NOT NULL;
+CREATE TABLE IF NOT EXISTS device_refs (
+    table_name TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    device_id TEXT NOT NULL,
+    PRIMARY KEY (table_name, doc_id, device_id)
+);
+CREATE INDEX IF NOT EXISTS device_refs_device_id
+    ON device_refs (device_id, table_name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _node_id(doc):
+    node_id = doc.get('node_id')
+    return None if node_id is None else str(node_id)
+
+
+class SQLiteTable:
+    """A named collection of JSON documents stored in SQLite.
+
+    Mirrors the TinyDB ``Table`` methods used across the app, so blueprints
+    do not care which backend ``database.get_table`` hands them. ``node_id``
+    and the device references of groups, scenes and circuits are kept in
+    indexed columns for ``find_by_node_id`` and ``find_by_device``.
+    """
+
+    def __init__(self, db, name):
+        self._db = db
+        self.name = name
+
+    def _rows(self, sql, params=()):
+        return self._db.connection().execute(sql, params).fetchall()
+
+    def _documents(self, rows):
+        return [Document(json.loads(data), doc_id) for doc_id, data in rows]
+
+    def all(self):
+        return self._documents(self._rows(
+            'SELECT doc_id, data FROM documents WHERE table_name = ? ORDER BY doc_id',
+            (self.name,)
+        ))
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __len__(self):
+        return self._rows(
+            'SELECT COUNT(*) FROM documents WHERE table_name = ?', (self.name,)
+        )[0][0]
+
+    def search(self, cond):
+        return [doc for doc in self.all() if cond(doc)]
+
+    def get(self, cond=None, doc_id=None):
+        if doc_id is not None:
+            rows = self._rows(
+                'SELECT doc_id, data FROM documents WHERE table_name = ? AND doc_id = ?',
+                (self.name, int(doc_id))
+            )
+            return self._documents(rows)[0] if rows else None
+        if cond is not None:
+            return next(iter(self.search(cond)), None)
+        raise RuntimeError('You have to pass either cond or doc_id')
+
+    def contains(self, cond=None, doc_id=None):
+        return self.get(cond=cond, doc_id=doc_id) is not None
+
+    def find_by_node_id(self, node_id):
+        """Documents whose ``node_id`` matches, using the node index."""
+        return self._documents(self._rows(
+            'SELECT doc_id, data FROM documents WHERE table_name = ? AND node_id = ?',
+            (self.name, str(node_id))
+        ))
+
+    def find_by_device(self, device_id):
+        """Documents whose ``devices`` list references a device, using the reference index."""
+        return self._documents(self._rows(
+            'SELECT d.doc_id, d.data FROM device_refs r '
+            'JOIN documents d ON d.table_name = r.table_name AND d.doc_id = r.doc_id '
+            'WHERE r.device_id = ? AND r.table_name = ? ORDER BY d.doc_id',
+            (str(device_id), self.name)
+        ))
+
+    def _put(self, conn, doc_id, doc):
+        conn.execute(
+            'INSERT OR REPLACE INTO documents (table_name, doc_id, data, node_id) VALUES (?, ?, ?, ?)',
+            (self.name, doc_id, json.dumps(doc), _node_id(doc))
+        )
+        conn.execute(
+            'DELETE FROM device_refs WHERE table_name = ? AND doc_id = ?', (self.name, doc_id)
+        )
+        conn.executemany(
+            'INSERT INTO device_refs (table_name, doc_id, device_id) VALUES (?, ?, ?)',
+            [(self.name, doc_id, ref) for ref in device_refs(doc)]
+        )
+        self._db.touched.append((self.name, [doc_id]))
+
+    def _delete(self, conn, doc_id):
+        conn.execute('DELETE FROM documents WHERE table_name = ? AND doc_id = ?', (self.name, doc_id))
+        conn.execute('DELETE FROM device_refs WHERE table_name = ? AND doc_id = ?', (self.name, doc_id))
+        self._db.touched.append((self.name, [doc_id]))
+
+    def _next_id(self, conn):
+        row = conn.execute(
+            'SELECT MAX(doc_id) FROM documents WHERE table_name = ?', (self.name,)
+        ).fetchone()
+        return (row[0] or 0) + 1
+
+    def _targets(self, cond, doc_ids):
+        if doc_ids is not None:
+            return [doc for doc in (self.get(doc_id=doc_id) for doc_id in doc_ids) if doc is not None]
+        if cond is not None:
+            return self.search(cond)
+        return self.all()
+
+    def insert(self, document):
+        return self.insert_multiple([document])[0]
+
+    def insert_multiple(self, documents):
+        with self._db.write() as conn:
+            doc_id = self._next_id(conn)
+            doc_ids = []
+            for document in documents:
+                if isinstance(document, Document):
+                    doc_id = document.doc_id
+                self._put(conn, doc_id, dict(document))
+                doc_ids.append(doc_id)
+                doc_id = max(doc_id, self._next_id(conn))
+            return doc_ids
+
+    def update(self, fields, cond=None, doc_ids=None):
+        with self._db.write() as conn:
+            updated = []
+            for doc in self._targets(cond, doc_ids):
+                if callable(fields):
+                    fields(doc)
+                else:
+                    doc.update(fields)
+                self._put(conn, doc.doc_id, dict(doc))
+                updated.append(doc.doc_id)
+            return updated
+
+    def upsert(self, document, cond=None):
+        if isinstance(document, Document) and cond is None:
+            doc_ids = [document.doc_id]
+        elif cond is not None:
+            doc_ids = None
+        else:
+            raise ValueError('If you don\'t specify a search query, you must specify a doc_id')
+
+        with self._db.write():
+            updated = self.update(document, cond=cond, doc_ids=doc_ids)
+            if updated:
+                return updated
+            return [self.insert(document)]
+
+    def remove(self, cond=None, doc_ids=None):
+        if cond is None and doc_ids is None:
+            raise RuntimeError('Use truncate() to remove all documents')
+
+        with self._db.write() as conn:
+            removed = [doc.doc_id for doc in self._targets(cond, doc_ids)]
+            for doc_id in removed:
+                self._delete(conn, doc_id)
+            return removed
+
+    def truncate(self):
+        with self._db.write() as conn:
+            conn.execute('DELETE FROM documents WHERE table_name = ?', (self.name,))
+            conn.execute('DELETE FROM device_refs WHERE table_name = ?', (self.name,))
+            self._db.touched.append((self.name, None))
+
+    def clear_cache(self):
+        pass
+
+
+class SQLiteDatabase:
+    """SQLite-backed replacement for the shared TinyDB handle.
+
+    The database runs in WAL mode so request threads read concurrently, each
+    through its own connection, while writes are serialized by one lock.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.RLock()
+        self.versions = VersionCounters()
+        # Changes of the open write transaction, counted once it commits
+        self.touched = []
+        self._local = threading.local()
+        self._connections = []
+        self._tables = {}
+
+        conn = self.connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+
+    def connection(self):
+        """Return the calling thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self.lock:
+                self._connections.append(conn)
+        return conn
+
+    def write(self):
+        """Context manager running a write transaction; nested calls join the outer one."""
+        return _WriteTransaction(self)
+
+    def transaction(self):
+        """Group mutations into one write transaction, committed together."""
+        return self.write()
+
+    @contextmanager
+    def savepoint(self, table_name):
+        """Roll back the block's writes if it raises, leaving the rest of the transaction."""
+        with self.write() as conn:
+            touched = len(self.touched)
+            conn.execute('SAVEPOINT item')
+            try:
+                yield
+            except BaseException:
+                conn.execute('ROLLBACK TO item')
+                conn.execute('RELEASE item')
+                del self.touched[touched:]
+                raise
+            conn.execute('RELEASE item')
+
+    def capture(self):
+        """Snapshot of every table, served by a read transaction of its own.
+
+        WAL mode keeps the transaction's view fixed while writers go on, so
+        taking it inside ``transaction()`` only holds writers back for as
+        long as it takes to start it.
+        """
+        return SQLiteSnapshot(self.path)
+
+    def table(self, name):
+        if name not in self._tables:
+            self._tables[name] = SQLiteTable(self, name)
+        return self._tables[name]
+
+    def tables(self):
+        rows = self.connection().execute('SELECT DISTINCT table_name FROM documents').fetchall()
+        return {row[0] for row in rows}
+
+    def get_meta(self, key):
+        row = self.connection().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.write() as conn:
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def flush(self):
+        """Writes are committed as they happen; nothing is buffered."""
+
+    def close(self):
+        with self.lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class SQLiteSnapshot:
+    """Read-only view of the database as it was when the snapshot was taken."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('BEGIN')
+        # The view is fixed by the transaction's first read
+        self._tables = [
+            row[0] for row in self._conn.execute(
+                'SELECT DISTINCT table_name FROM documents ORDER BY table_name'
+            )
+        ]
+
+    def tables(self):
+        return list(self._tables)
+
+    def documents(self, name):
+        """``(doc_id, document)`` pairs of a table in ID order."""
+        rows = self._conn.execute(
+            'SELECT doc_id, data FROM documents WHERE table_name = ? ORDER BY doc_id', (name,)
+        )
+        return [(doc_id, json.loads(data)) for doc_id, data in rows]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.execute('COMMIT')
+            self._conn.close()
+            self._conn = None
+
+
+class _WriteTransaction:
+    def __init__(self, db):
+        self._db = db
+        self._conn = None
+
+    def __enter__(self):
+        self._db.lock.acquire()
+        try:
+            self._conn = self._db.connection()
+            self._outermost = not self._conn.in_transaction
+            if self._outermost:
+                self._conn.execute('BEGIN IMMEDIATE')
+                self._db.touched = []
+        except BaseException:
+            # __exit__ is not called when __enter__ fails
+            self._db.lock.release()
+            raise
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._outermost:
+                self._conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+                touched, self._db.touched = self._db.touched, []
+                if not exc_type:
+                    for table_name, doc_ids in touched:
+                        self._db.versions.bump(table_name, doc_ids)
+        finally:
+            self._db.lock.release()
+        return False
+
+
+def migrate_from_json(db, json_path):
+    """Copy a TinyDB JSON database into ``db`` once.
+
+    Runs only if the SQLite database has never been migrated and is still
+    empty; a leftover journal is folded into the snapshot first.
+    """
+    json_path = Path(json_path)
+    if db.get_meta('migrated_from') is not None or db.tables():
+        return False
+    if not json_path.exists():
+        return False
+
+    if json_path.with_suffix('.journal').exists():
+        journal = JournalStorage(json_path)
+        journal.compact()
+        journal.close()
+
+    data = load_snapshot(json_path)
+    with db.write():
+        for table_name, docs in data.items():
+            db.table(table_name).insert_multiple(
+                [Document(doc, int(doc_id)) for doc_id, doc in docs.items()]
+            )
+        db.set_meta('migrated_from', str(json_path))
+
+    logger.info(f"Migrated {sum(len(docs) for docs in data.values())} documents from {json_path}")
+    return True
@@ -0,0 +1,340 @@
+"""Storage engine shared by every blueprint and manager."""
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+from tinydb import TinyDB
+from tinydb.storages import Storage
+from tinydb.table import Table
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SnapshotEncoder:
+    """Encode the whole database, reusing the encoding of unchanged tables.
+
+    Tables replace their dict on every update, so identity tells us which
+    tables have to be re-encoded.
+    """
+
+    def __init__(self):
+        self._encoded = {}
+
+    def encode(self, data):
+        parts = []
+        encoded = {}
+        for name, table in data.items():
+            cached = self._encoded.get(name)
+            if cached is None or cached[0] is not table:
+                cached = (table, json.dumps(table))
+            encoded[name] = cached
+            parts.append(f'{json.dumps(name)}: {cached[1]}')
+        self._encoded = encoded
+        return '{' + ', '.join(parts) + '}'
+
+
+class VersionCounters:
+    """Change counters for every table and document, kept in memory.
+
+    All counters draw from one sequence, so a version is never reused while
+    the process lives; ``epoch`` is new for every process, which keeps
+    versions from different runs apart.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._tables = {}
+        self._documents = {}
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Register ``callback(table_name, doc_ids)`` to be told about every change.
+
+        Callbacks run on the writing thread right after the change is
+        counted and must return quickly.
+        """
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def bump(self, table_name, doc_ids):
+        """Record a change to ``doc_ids``; ``None`` means the table was truncated."""
+        with self._lock:
+            self._sequence += 1
+            self._tables[table_name] = self._sequence
+            documents = self._documents.setdefault(table_name, {})
+            if doc_ids is None:
+                documents.clear()
+            else:
+                for doc_id in doc_ids:
+                    documents[int(doc_id)] = self._sequence
+
+        for listener in list(self._listeners):
+            try:
+                listener(table_name, doc_ids)
+            except Exception as e:
+                logger.error(f"Error in storage change listener: {e}")
+
+    def table(self, table_name):
+        return self._tables.get(table_name, 0)
+
+    def document(self, table_name, doc_id):
+        return self._documents.get(table_name, {}).get(int(doc_id), 0)
+
+    def etag(self, *versions):
+        """Strong entity tag for a response built from data at ``versions``."""
+        return '-'.join([self.epoch, *(str(version) for version in versions)])
+
+
+def load_snapshot(path):
+    """Parse a JSON database file, treating a missing or empty file as empty."""
+    if not path.exists() or path.stat().st_size == 0:
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_atomic(path, payload):
+    """Replace ``path`` with ``payload`` without ever exposing a partial file."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def device_refs(doc):
+    """Device IDs a document references through its ``devices`` list.
+
+    Groups list plain device IDs while scenes and circuits list objects
+    carrying a ``device_id``.
+    """
+    refs = set()
+    for device in doc.get('devices') or []:
+        device_id = device.get('device_id') if isinstance(device, dict) else device
+        if device_id is not None:
+            refs.add(str(device_id))
+    return refs
+
+
+class TableSnapshot:
+    """Copy of every table of a TinyDB database, taken at one instant.
+
+    Documents are copied one level deep: tables are rebuilt and documents
+    updated field by field on every write, so later writes never reach
+    into the copy.
+    """
+
+    def __init__(self, data):
+        self._tables = {
+            name: {int(doc_id): dict(doc) for doc_id, doc in table.items()}
+            for name, table in data.items()
+        }
+
+    def tables(self):
+        return sorted(self._tables)
+
+    def documents(self, name):
+        """``(doc_id, document)`` pairs of a table in ID order."""
+        return sorted(self._tables.get(name, {}).items())
+
+    def close(self):
+        self._tables = {}
+
+
+class BufferedJSONStorage(Storage):
+    """JSON file storage with a write-back cache and a single writer thread.
+
+    The file is parsed once when the storage is opened and every read is
+    served from memory afterwards. Writes only mark the cache dirty; a
+    background thread coalesces them and atomically replaces the file at
+    most once per ``flush_interval`` seconds.
+    """
+
+    def __init__(self, path, flush_interval=0.5):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        # Serializes flushes, which share one temporary file
+        self._flush_lock = threading.Lock()
+        self.versions = VersionCounters()
+        self._data = load_snapshot(self.path)
+        self._encoder = SnapshotEncoder()
+        self._dirty = threading.Event()
+        self._closed = threading.Event()
+        self._writer = threading.Thread(
+            target=self._writer_loop, name='storage-writer', daemon=True
+        )
+        self._writer.start()
+
+    def read(self):
+        return self._data or None
+
+    def write(self, data):
+        self._data = data
+        self._dirty.set()
+
+    def record(self, table_name, doc_ids):
+        """Hook called after a mutation with the IDs it touched.
+
+        ``doc_ids`` is ``None`` when the whole table was truncated. The full
+        snapshot written by this storage already covers every change, so
+        only the version counters move.
+        """
+        self.versions.bump(table_name, doc_ids)
+
+    @contextmanager
+    def transaction(self):
+        """Hold the storage for a batch of mutations.
+
+        The writer cannot flush while the lock is held, so the whole batch
+        lands in one write.
+        """
+        with self.lock:
+            yield
+
+    def _writer_loop(self):
+        """Flush dirty data to disk until the storage is closed."""
+        while not self._closed.is_set():
+            self._dirty.wait()
+            # Give bursts of writes a chance to coalesce into a single flush
+            self._closed.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush database to {self.path}: {e}")
+
+    def flush(self):
+        """Write pending changes to disk if there are any.
+
+        Mutations only wait for the encoding; the write itself happens
+        outside the storage lock. Concurrent flushes run one after the
+        other, so a payload is never renamed over a newer one. Do not call
+        it inside ``transaction()``.
+        """
+        with self._flush_lock:
+            with self.lock:
+                if not self._dirty.is_set():
+                    return
+                self._dirty.clear()
+                payload = self._encoder.encode(self._data)
+
+            try:
+                write_atomic(self.path, payload)
+            except Exception:
+                self._dirty.set()  # Retry on the next flush
+                raise
+        logger.debug(f"Flushed database to {self.path}")
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._dirty.set()  # Wake the writer so it can exit
+        self._writer.join()
+        self.flush()
+
+
+def _mutation(method, touched_ids):
+    """Run a table mutation while holding the storage lock.
+
+    Once the outermost mutation finishes, the storage is told which documents
+    it touched; ``touched_ids`` maps the method's return value to those IDs.
+    """
+    @wraps(method)
+    def wrapped(self, *args, **kwargs):
+        with self._storage.lock:
+            if self._in_mutation:
+                return method(self, *args, **kwargs)
+            self._in_mutation = True
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                self._in_mutation = False
+            self._storage.record(self.name, touched_ids(result))
+            return result
+    return wrapped
+
+
+class SharedTable(Table):
+    """TinyDB table whose mutations are serialized through the storage lock.
+
+    Document ID allocation and the read-modify-write cycle of a mutation must
+    not interleave between request threads.
+    """
+
+    _in_mutation = False
+
+    insert = _mutation(Table.insert, lambda doc_id: [doc_id])
+    insert_multiple = _mutation(Table.insert_multiple, list)
+    update = _mutation(Table.update, list)
+    update_multiple = _mutation(Table.update_multiple, list)
+    upsert = _mutation(Table.upsert, list)
+    remove = _mutation(Table.remove, list)
+    truncate = _mutation(Table.truncate, lambda result: None)
+
+    def find_by_node_id(self, node_id):
+        """Documents whose ``node_id`` matches."""
+        node_id = str(node_id)
+        return self.search(lambda doc: str(doc.get('node_id')) == node_id)
+
+    def find_by_device(self, device_id):
+        """Documents whose ``devices`` list references a device."""
+        device_id = str(device_id)
+        return self.search(lambda doc: device_id in device_refs(doc))
+
+
+class SharedTinyDB(TinyDB):
+    """TinyDB handle shared by the whole process."""
+
+    table_class = SharedTable
+
+    @property
+    def versions(self):
+        """Change counters of the tables and documents."""
+        return self.storage.versions
+
+    def transaction(self):
+        """Context manager grouping mutations so they are persisted together."""
+        return self.storage.transaction()
+
+    def capture(self):
+        """Snapshot of every table; inside ``transaction()`` no write can interleave."""
+        with self.storage.lock:
+            return TableSnapshot(self.storage.read() or {})
+
+    @contextmanager
+    def savepoint(self, table_name):
+        """Undo the block's changes to a table if it raises.
+
+        The table is copied up front, which costs about what TinyDB already
+        spends rebuilding it on every write. Restored documents are recorded
+        like any other change.
+        """
+        with self.storage.lock:
+            before = {
+                doc_id: dict(doc) for doc_id, doc in ((self.storage.read() or {}).get(table_name) or {}).items()
+            }
+            try:
+                yield
+            except BaseException:
+                data = self.storage.read() or {}
+                after = data.get(table_name) or {}
+                changed = [doc_id for doc_id in {*before, *after} if before.get(doc_id) != after.get(doc_id)]
+                data[table_name] = before
+                self.storage.write(data)
+                self.table(table_name).clear_cache()
+                if changed:
+                    self.storage.record(table_name, [int(doc_id) for doc_id in changed])
+                raise
+
+    def flush(self):
+        """Write pending changes to disk."""
+        self.storage.flush()
@@ -0,0 +1,248 @@
+"""Queue of commissioning jobs run by a bounded pool of async workers."""
+import asyncio
+import csv
+import io
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from ..database.database import initialize_db, get_table
+from ..event_loop import background_loop
+from ..events.bus import event_bus
+from ..logger import get_logger
+from ..matter.protocol_manager import protocol_manager
+
+logger = get_logger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_BULK_PARALLELISM = 4
+MAX_BULK_SIZE = 1000
+MAX_FINISHED_JOBS = 1000
+
+FINISHED_STATES = ('succeeded', 'failed')
+
+
+def normalize_setup_code(code):
+    """Return ``code`` in the form matter-server expects or raise ``ValueError``.
+
+    Accepts QR payloads (``MT:...``) and 11 or 21 digit manual pairing
+    codes, with or without the dashes printed on labels. A bare 8 digit
+    passcode lacks the discriminator that ``commission_with_code`` needs
+    to find the device and is rejected with a hint.
+    """
+    if not isinstance(code, str):
+        raise ValueError('Invalid setup code')
+    code = code.strip()
+    if code.upper().startswith('MT:') and len(code) > 3:
+        return 'MT:' + code[3:]
+    digits = code.replace('-', '').replace(' ', '')
+    if digits.isdigit() and len(digits) in (11, 21):
+        return digits
+    if digits.isdigit() and len(digits) == 8:
+        raise ValueError('A bare passcode cannot be commissioned, use the QR code or the manual pairing code')
+    raise ValueError('Invalid setup code')
+
+
+def parse_bulk_csv(text):
+    """Turn a CSV of setup codes into job requests.
+
+    The first row is a header with a ``setup_code`` column and optionally
+    ``name``, ``type`` and ``network_only``. Returns ``(requests, errors)``
+    where each error names the offending line.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or 'setup_code' not in [field.strip() for field in reader.fieldnames]:
+        raise ValueError("CSV needs a header row with a 'setup_code' column")
+
+    requests, errors = [], []
+    for row in reader:
+        row = {(key or '').strip(): (value or '').strip() for key, value in row.items() if key}
+        if not any(row.values()):
+            continue
+        try:
+            code = normalize_setup_code(row.get('setup_code'))
+        except ValueError as e:
+            errors.append({'line': reader.line_num, 'error': str(e)})
+            continue
+        requests.append({
+            'setup_code': code,
+            'name': row.get('name') or None,
+            'type': row.get('type') or None,
+            'network_only': row.get('network_only', '').lower() in ('1', 'true', 'yes'),
+        })
+    if len(requests) > MAX_BULK_SIZE:
+        raise ValueError(f'A bulk pairing holds at most {MAX_BULK_SIZE} devices')
+    return requests, errors
+
+
+class CommissioningQueue:
+    """Runs commissioning jobs without tying up request handlers.
+
+    Submitting a job returns at once; ``workers`` coroutines on the shared
+    event loop take jobs from a FIFO queue, so that many devices are
+    commissioned at the same time. Bulk submissions feed the queue through
+    their own limit so one pallet cannot take every worker. Job progress is
+    kept in memory and published on the event bus as ``commissioning``
+    events. Successfully commissioned nodes are added to the devices table.
+
+    Everything except ``get_job``, ``get_batch`` and the devices table
+    writes runs on the event loop.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or int(os.environ.get('MATTER_MAESTRO_COMMISSIONING_WORKERS', DEFAULT_WORKERS))
+        self._jobs = OrderedDict()
+        self._batches = {}
+        self._queue = None
+        self._workers = []
+        self._feeders = set()
+        self._devices_table = None
+
+    @property
+    def devices_table(self):
+        if self._devices_table is None:
+            self._devices_table = get_table(initialize_db(), 'devices')
+        return self._devices_table
+
+    def _start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        background_loop.on_shutdown(self.shutdown)
+
+    async def shutdown(self):
+        """Stop the workers; queued jobs are abandoned."""
+        tasks = [*self._workers, *self._feeders]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._feeders.clear()
+
+    def _new_job(self, request, batch_id=None):
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'batch_id': batch_id,
+            'name': request.get('name'),
+            'type': request.get('type'),
+            'network_only': bool(request.get('network_only')),
+            'node_id': None,
+            'device_id': None,
+            'error': None,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+        }
+        self._jobs[job['id']] = job
+        self._evict()
+        return job
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+        for batch_id, batch in list(self._batches.items()):
+            if not any(job_id in self._jobs for job_id in batch['job_ids']):
+                del self._batches[batch_id]
+
+    def submit(self, request):
+        """Queue the commissioning of one device; returns the job."""
+        self._start()
+        job = self._new_job(request)
+        self._publish(job)
+        self._queue.put_nowait((job, request['setup_code'], None))
+        return dict(job)
+
+    def submit_bulk(self, requests, parallelism=DEFAULT_BULK_PARALLELISM):
+        """Queue many devices, at most ``parallelism`` of them commissioning at once."""
+        self._start()
+        batch_id = uuid.uuid4().hex
+        jobs = [(self._new_job(request, batch_id), request['setup_code']) for request in requests]
+        self._batches[batch_id] = {
+            'id': batch_id,
+            'parallelism': parallelism,
+            'created_at': datetime.now().isoformat(),
+            'job_ids': [job['id'] for job, _ in jobs],
+        }
+        for job, _ in jobs:
+            self._publish(job)
+        feeder = asyncio.create_task(self._feed(jobs, asyncio.Semaphore(parallelism)))
+        self._feeders.add(feeder)
+        feeder.add_done_callback(lambda task: self._fed(batch_id, task))
+        return batch_id, [dict(job) for job, _ in jobs]
+
+    def _fed(self, batch_id, task):
+        self._feeders.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Feeding bulk pairing {batch_id} failed: {task.exception()}")
+
+    async def _feed(self, jobs, slots):
+        for job, setup_code in jobs:
+            await slots.acquire()
+            self._queue.put_nowait((job, setup_code, slots))
+
+    async def _work(self):
+        while True:
+            job, setup_code, slots = await self._queue.get()
+            try:
+                await self._commission(job, setup_code)
+            except Exception as e:
+                logger.error(f"Commissioning job {job['id']} failed: {e}")
+                self._update(job, status='failed', error=str(e))
+            finally:
+                if slots is not None:
+                    slots.release()
+                self._queue.task_done()
+
+    async def _commission(self, job, setup_code):
+        self._update(job, status='commissioning', started_at=datetime.now().isoformat())
+        node = await protocol_manager.commission_with_code(setup_code, job['network_only'])
+        node_id = str(node['node_id'])
+
+        # Storage writes block, keep them off the event loop
+        device_id = await asyncio.get_running_loop().run_in_executor(
+            None, self._store_device, job, node_id
+        )
+        logger.info(f"Commissioning job {job['id']} added node {node_id} as device {device_id}")
+        self._update(job, status='succeeded', node_id=node_id, device_id=device_id)
+
+    def _store_device(self, job, node_id):
+        """Device ID of the node, adding it to the devices table if it is new."""
+        devices = self.devices_table.find_by_node_id(node_id)
+        if devices:
+            return devices[0].doc_id
+        return self.devices_table.insert({
+            'name': job['name'] or f'Node {node_id}',
+            'type': job['type'] or 'unknown',
+            'node_id': node_id,
+        })
+
+    def _update(self, job, **changes):
+        job.update(changes)
+        if job['status'] in FINISHED_STATES:
+            job['finished_at'] = datetime.now().isoformat()
+        self._publish(job)
+
+    def _publish(self, job):
+        event_bus.publish('commissioning', dict(job), [job['node_id']] if job['node_id'] else ())
+
+    def get_job(self, job_id):
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def get_batch(self, batch_id):
+        """A bulk pairing with its jobs and a count per status."""
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return None
+        jobs = [dict(self._jobs[job_id]) for job_id in batch['job_ids'] if job_id in self._jobs]
+        counts = {}
+        for job in jobs:
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {**{k: v for k, v in batch.items() if k != 'job_ids'}, 'counts': counts, 'jobs': jobs}
+
+
+# Create a singleton instance
+commissioning_queue = CommissioningQueue()
@@ -1,26 +1,20 @@
-from functools import wraps
 from flask import Blueprint, jsonify, request, current_app, render_template
 from ..logger import get_logger
+from ..database.batch import apply_batch, batch_summary, parse_batch
 from ..database.database import initialize_db, get_table
+from ..database.listing import conditional, filter_documents, is_truthy, list_response
+from ..groups.control import resolve_members
+from ..matter.client import MatterServerUnavailable
 from ..matter.protocol_manager import protocol_manager
-import asyncio
-from datetime import datetime
+from .commissioning import (
+    DEFAULT_BULK_PARALLELISM, commissioning_queue, normalize_setup_code, parse_bulk_csv
+)
 
 devices_blueprint = Blueprint('devices', __name__)
 logger = get_logger(__name__)
 db = initialize_db()
 devices_table = get_table(db, 'devices')
-
-def async_route(f):
-    @wraps(f)
-    def wrapped(*args, **kwargs):
-        loop = asyncio.new_event_loop()
-        try:
-            result = loop.run_until_complete(f(*args, **kwargs))
-            return result
-        finally:
-            loop.close()
-    return wrapped
+groups_table = get_table(db, 'groups')
 
 @devices_blueprint.route('/ui', methods=['GET'])
 def devices_ui():
@@ -32,9 +26,49 @@ def get_devices():
     """
     Get all devices
     ---
+    parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        description: ETag of a previous response; answered with 304 if still current
+      - name: cursor
+        in: query
+        type: string
+        description: X-Next-Cursor header of the previous page
+      - name: limit
+        in: query
+        type: integer
+        description: Page size; without limit or cursor the whole list is returned
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated fields to return, id is always included
+      - name: type
+        in: query
+        type: string
+        description: Only devices of this type
+      - name: location
+        in: query
+        type: string
+        description: Only devices in this location
+      - name: online
+        in: query
+        type: boolean
+        description: Only devices that are (not) reachable
+      - name: group
+        in: query
+        type: integer
+        description: Only members of this group, nested subgroups included
     responses:
       200:
         description: List of all devices
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Cursor of the next page, absent on the last page
+          X-Total-Count:
+            type: integer
+            description: Number of items matching the filters
         schema:
           type: array
           items:
@@ -46,24 +80,107 @@ def get_devices():
                 type: string
               type:
                 type: string
-              status:
+              online:
+                type: boolean
+              last_seen:
                 type: string
+                format: date-time
+                description: >
+                  When the node was last heard from, null if never. The ETag
+                  only follows online/offline changes, so a 304 may carry an
+                  older value; /api/devices/liveness is always current
+              rtt_ms:
+                type: number
+                description: Smoothed command round-trip time
+              failures:
+                type: integer
+                description: Commands failed in a row
+              state:
+                type: object
+                description: Cached on/off and brightness, when the node is known
+      304:
+        description: Not modified since the ETag sent in If-None-Match
+    """
+    versions = db.versions
+    etag = versions.etag(
+        versions.table(devices_table.name),
+        versions.table(groups_table.name),
+        protocol_manager.node_cache.state_version,
+        protocol_manager.liveness.version
+    )
+    return conditional(etag, _list_devices)
+
+def _list_devices():
+    devices = filter_documents(devices_table.all(), ['type', 'location', 'node_id'])
+
+    if 'group' in request.args:
+        try:
+            members, _ = resolve_members(groups_table, int(request.args['group']))
+        except ValueError:
+            return jsonify({'error': 'group must be an integer'}), 400
+        members = {str(member) for member in members}
+        devices = [device for device in devices if str(device.doc_id) in members]
+
+    if 'online' in request.args:
+        online = is_truthy(request.args['online'])
+        devices = [device for device in devices if _is_online(device) == online]
+
+    def decorate(device):
+        device.update(protocol_manager.liveness.get(device.get('node_id')))
+        state = protocol_manager.node_cache.get_state(device.get('node_id'))
+        if state is not None:
+            device['state'] = state
+
+    return list_response(devices, decorate)
+
+def _is_online(device):
+    """Whether the device's node is available and answering commands."""
+    return protocol_manager.liveness.is_online(device.get('node_id'))
+
+@devices_blueprint.route('/liveness', methods=['GET'])
+def get_devices_liveness():
+    """
+    Get the current reachability of every device
+    ---
+    description: >
+      Last-seen times, round-trip times and failure counts as of now, keyed
+      by device ID. They change with every report from a node, so they are
+      served here rather than moving the ETag of the device list.
+    responses:
+      200:
+        description: Liveness of each device
+        schema:
+          type: object
+          additionalProperties:
+            type: object
+            properties:
+              online:
+                type: boolean
               last_seen:
                 type: string
                 format: date-time
+              rtt_ms:
+                type: number
+              failures:
+                type: integer
     """
-    devices = devices_table.all()
-    for device in devices:
-        device['online'] = True  # TODO: Implement real online status check
-        device['last_seen'] = datetime.now().isoformat()
-    return jsonify(devices)
+    try:
+        return jsonify({
+            str(device.doc_id): protocol_manager.liveness.get(device.get('node_id'))
+            for device in devices_table.all()
+        })
+    except Exception as e:
+        logger.error(f"Error getting device liveness: {e}")
+        return jsonify({'error': 'Failed to get device liveness'}), 500
 
 @devices_blueprint.route('/pair', methods=['POST'])
-@async_route
 async def pair_device():
     """
     Pair a new Matter device
     ---
+    description: >
+      Queues the commissioning and returns at once. Follow the job at the
+      returned location or through commissioning events on /api/events.
     parameters:
       - in: body
         name: body
@@ -73,32 +190,126 @@ async def pair_device():
           properties:
             setup_code:
               type: string
-              pattern: '[0-9]{8}'
-              example: '12345678'
+              description: QR payload (MT:...) or manual pairing code
+              example: '34970112332'
+            name:
+              type: string
+            type:
+              type: string
+            network_only:
+              type: boolean
+              description: Commission over IP only, without BLE
     responses:
-      200:
-        description: Device paired successfully
+      202:
+        description: Commissioning job queued
       400:
         description: Invalid setup code
     """
     try:
         data = request.get_json()
-        setup_code = data.get('setup_code')
-
-        if not setup_code or not setup_code.isdigit() or len(setup_code) != 8:
-            return jsonify({'error': 'Invalid setup code'}), 400
-
-        await protocol_manager.initialize()
+        try:
+            setup_code = normalize_setup_code(data.get('setup_code'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        # TODO: Implement actual Matter pairing logic
-        return jsonify({
-            'message': 'Device paired successfully',
-            'device_id': 'mock_id'
-        })
+        job = commissioning_queue.submit({**data, 'setup_code': setup_code})
+        response = jsonify(job)
+        response.status_code = 202
+        response.headers['Location'] = f"{request.path}/{job['id']}"
+        return response
     except Exception as e:
         logger.error(f"Error pairing device: {e}")
         return jsonify({'error': 'Failed to pair device'}), 500
 
+@devices_blueprint.route('/pair/<string:job_id>', methods=['GET'])
+def get_pairing_job(job_id):
+    """
+    Get the progress of a commissioning job
+    ---
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: >
+          The job; status is queued, commissioning, succeeded or failed and
+          node_id and device_id are set once it succeeded
+      404:
+        description: Job not found
+    """
+    job = commissioning_queue.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@devices_blueprint.route('/pair/bulk', methods=['POST'])
+async def pair_devices_bulk():
+    """
+    Pair many devices from a CSV of setup codes
+    ---
+    description: >
+      The CSV is sent as the request body or as a multipart file named
+      "file". Its header row names a setup_code column and optionally name,
+      type and network_only. Nothing is queued if a row is invalid.
+    consumes:
+      - text/csv
+      - multipart/form-data
+    parameters:
+      - name: parallelism
+        in: query
+        type: integer
+        description: Devices of this batch commissioned at the same time
+    responses:
+      202:
+        description: Commissioning jobs queued
+      400:
+        description: Invalid CSV or setup codes
+    """
+    try:
+        upload = request.files.get('file')
+        text = upload.read().decode('utf-8-sig') if upload else request.get_data(as_text=True)
+        try:
+            parallelism = max(1, int(request.args.get('parallelism', DEFAULT_BULK_PARALLELISM)))
+            requests, errors = parse_bulk_csv(text)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if errors:
+            return jsonify({'error': 'Invalid rows', 'rows': errors}), 400
+        if not requests:
+            return jsonify({'error': 'No setup codes given'}), 400
+
+        batch_id, jobs = commissioning_queue.submit_bulk(requests, parallelism)
+        response = jsonify({'batch_id': batch_id, 'parallelism': parallelism, 'jobs': jobs})
+        response.status_code = 202
+        response.headers['Location'] = f"{request.path}/{batch_id}"
+        return response
+    except Exception as e:
+        logger.error(f"Error bulk pairing devices: {e}")
+        return jsonify({'error': 'Failed to pair devices'}), 500
+
+@devices_blueprint.route('/pair/bulk/<string:batch_id>', methods=['GET'])
+def get_bulk_pairing(batch_id):
+    """
+    Get the progress of a bulk pairing
+    ---
+    parameters:
+      - in: path
+        name: batch_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Job counts per status and the jobs of the batch
+      404:
+        description: Batch not found
+    """
+    batch = commissioning_queue.get_batch(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    return jsonify(batch)
+
 @devices_blueprint.route('', methods=['POST'])
 def add_device():
     """
@@ -135,7 +346,6 @@ def add_device():
         return jsonify({'error': 'Failed to add device'}), 500
 
 @devices_blueprint.route('/discover', methods=['POST'])
-@async_route
 async def discover_devices():
     """
     Discover Matter devices in the network
@@ -154,22 +364,29 @@ async def discover_devices():
                 type: object
       500:
         description: Error during device discovery
+      503:
+        description: Matter server unavailable
     """
     try:
         await protocol_manager.initialize()
         devices = await protocol_manager._discover_nodes()
         return jsonify({'message': 'Device discovery completed', 'devices': devices})
+    except MatterServerUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error during device discovery: {e}")
         return jsonify({'error': 'Failed to discover devices'}), 500
 
 @devices_blueprint.route('/<string:node_id>/info', methods=['GET'])
-@async_route
 async def get_device_info(node_id):
     """
     Get detailed information about a device
     ---
     parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        description: ETag of a previous response; answered with 304 if still current
       - in: path
         name: node_id
         type: string
@@ -177,20 +394,26 @@ async def get_device_info(node_id):
     responses:
       200:
         description: Device information
+      304:
+        description: Not modified since the ETag sent in If-None-Match
       404:
         description: Device not found
+      503:
+        description: Matter server unavailable
     """
     try:
+        etag = db.versions.etag(protocol_manager.node_cache.version)
         info = await protocol_manager.get_node_info(node_id)
         if not info:
             return jsonify({'error': 'Device not found'}), 404
-        return jsonify(info)
+        return conditional(etag, lambda: jsonify(info))
+    except MatterServerUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error getting device info: {e}")
         return jsonify({'error': 'Failed to get device information'}), 500
 
 @devices_blueprint.route('/<string:node_id>/control', methods=['POST'])
-@async_route
 async def control_device(node_id):
     """
     Control a Matter device
@@ -215,6 +438,8 @@ async def control_device(node_id):
         description: Command sent successfully
       404:
         description: Device not found
+      503:
+        description: Matter server unavailable
     """
     try:
         data = request.get_json()
@@ -225,6 +450,8 @@ async def control_device(node_id):
         return jsonify(result)
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
+    except MatterServerUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error controlling device: {e}")
         return jsonify({'error': 'Failed to control device'}), 500
@@ -253,7 +480,6 @@ def delete_device(device_id):
         return jsonify({'error': 'Device not found'}), 404
 
 @devices_blueprint.route('/<string:device_id>/fabrics', methods=['GET'])
-@async_route
 async def get_device_fabrics(device_id):
     """
     Get all fabrics a device is connected to
@@ -282,6 +508,8 @@ async def get_device_fabrics(device_id):
                     type: boolean
       404:
         description: Device not found
+      503:
+        description: Matter server unavailable
     """
     try:
         await protocol_manager.initialize()
@@ -292,6 +520,60 @@ async def get_device_fabrics(device_id):
         # Get fabric information from the Matter protocol manager
         fabrics = await protocol_manager.get_device_fabrics(device_id)
         return jsonify({'fabrics': fabrics})
+    except MatterServerUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error getting device fabrics: {e}")
-        return jsonify({'error': 'Failed to get device fabrics'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to get device fabrics'}), 500
+
+def _validate_device(op, data):
+    if op == 'create' and not all(k in data for k in ['name', 'type', 'node_id']):
+        return 'Missing required fields'
+
+
+@devices_blueprint.route('/batch', methods=['POST'])
+def batch_devices():
+    """
+    Create, update and delete devices in one batch
+    ---
+    description: >
+      Operations are applied in order within a single storage transaction and
+      persisted with one flush. Each item succeeds or fails on its own.
+    parameters:
+      - name: batch
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            operations:
+              type: array
+              items:
+                type: object
+                properties:
+                  op:
+                    type: string
+                    enum: [create, update, delete]
+                  id:
+                    type: integer
+                    description: Required for update and delete
+                  data:
+                    type: object
+                    description: The device, as for the single-device endpoints
+    responses:
+      200:
+        description: Per-operation results with an HTTP-like status each
+      400:
+        description: Malformed batch
+    """
+    try:
+        operations = parse_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        results = apply_batch(db, devices_table, operations, validate=_validate_device)
+        return jsonify(batch_summary(results))
+    except Exception as e:
+        logger.error(f"Error applying device batch: {e}")
+        return jsonify({'error': 'Failed to apply batch'}), 500
@@ -0,0 +1,143 @@
+"""Long-lived asyncio event loop shared by every async route."""
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import threading
+from functools import wraps
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BackgroundLoop:
+    """Runs one asyncio event loop in a daemon thread for the whole process.
+
+    Async views and managers are dispatched onto this loop instead of getting
+    a fresh loop per request, so connections, tasks and caches created by
+    ``protocol_manager`` and friends survive between requests.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._owned = False
+        self._shutdown_hooks = []
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """The shared loop, started on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._start()
+            return self._loop
+
+    def _start(self):
+        self._loop = asyncio.new_event_loop()
+        self._owned = True
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name='event-loop', daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info("Started background event loop")
+
+    def attach(self, loop):
+        """Adopt a loop run by someone else, such as the ASGI server, as the shared loop.
+
+        Must be called from the thread running ``loop``.
+        """
+        with self._lock:
+            if self._loop is loop:
+                return
+            if self._loop is not None:
+                raise RuntimeError("Background event loop is already running")
+            self._loop = loop
+            self._thread = threading.current_thread()
+            self._owned = False
+        logger.info("Attached to the server event loop")
+
+    def in_loop_thread(self):
+        """Whether the caller is running on the shared loop."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop and return a concurrent future.
+
+        The caller's context variables (Flask's request context among them)
+        are carried over to the task.
+        """
+        loop = self.loop
+        context = contextvars.copy_context()
+        future = concurrent.futures.Future()
+
+        def copy_result(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        def schedule():
+            task = loop.create_task(coro, context=context)
+            task.add_done_callback(copy_result)
+
+        loop.call_soon_threadsafe(schedule)
+        return future
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it finishes."""
+        if self.in_loop_thread():
+            raise RuntimeError("Cannot block on the event loop from inside it")
+        return self.submit(coro).result(timeout)
+
+    def wrap(self, func):
+        """Turn a coroutine function into a blocking function running on the loop."""
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            return self.run(func(*args, **kwargs))
+        return wrapped
+
+    def on_shutdown(self, callback):
+        """Register a coroutine function to await on the loop before it stops."""
+        if callback not in self._shutdown_hooks:
+            self._shutdown_hooks.append(callback)
+
+    async def run_shutdown_hooks(self):
+        """Await the registered shutdown hooks, most recent first."""
+        hooks, self._shutdown_hooks = self._shutdown_hooks, []
+        for hook in reversed(hooks):
+            try:
+                await hook()
+            except Exception as e:
+                logger.error(f"Error in event loop shutdown hook: {e}")
+
+    def stop(self):
+        """Cancel outstanding tasks and stop the loop.
+
+        An attached loop belongs to its server and is only detached.
+        """
+        with self._lock:
+            loop, thread, owned = self._loop, self._thread, self._owned
+            self._loop = self._thread = None
+        if loop is None or not owned:
+            return
+
+        async def shutdown():
+            await self.run_shutdown_hooks()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        logger.info("Stopped background event loop")
+
+
+# Create a singleton instance
+background_loop = BackgroundLoop()
@@ -0,0 +1,4 @@
+from .bus import event_bus
+from .routes import events_blueprint
+
+__all__ = ['event_bus', 'events_blueprint']
@@ -0,0 +1,159 @@
+"""In-process event bus feeding the push channel."""
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+HISTORY_SIZE = 512
+SUBSCRIBER_QUEUE_SIZE = 1024
+# Open streams are limited so they cannot take over the server
+MAX_SUBSCRIBERS = 64
+
+
+class TooManySubscribers(Exception):
+    """Raised by ``subscribe`` when ``max_subscribers`` streams are open."""
+
+
+class Subscription:
+    """A subscriber's queue of events, optionally limited to some nodes and types."""
+
+    def __init__(self, bus, node_ids=None, types=None, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        self._bus = bus
+        self.node_ids = {str(node_id) for node_id in node_ids} if node_ids else None
+        self.types = set(types) if types else None
+        self.overflowed = False
+        self._queue = queue.Queue(max_queue)
+
+    def wants(self, event):
+        if self.types is not None and event['type'] not in self.types:
+            return False
+        if self.node_ids is not None and event['nodes']:
+            return not self.node_ids.isdisjoint(event['nodes'])
+        return True
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Dropping events silently would leave the client with stale state
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrived within ``timeout`` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """A subscription read from an event loop through an ``asyncio.Queue``.
+
+    Events published on other threads are handed to the loop, so waiting
+    for them does not hold a thread.
+    """
+
+    def __init__(self, bus, loop, node_ids=None, types=None, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        super().__init__(bus, node_ids, types, max_queue)
+        self._loop = loop
+        self._queue = asyncio.Queue(max_queue)
+
+    def put(self, event):
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout=None):
+        """Next event, or None if none arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    """Fans events out to subscribers and keeps a short history for resuming.
+
+    ``publish`` is safe to call from any thread, including the event loop,
+    and never blocks. Every event gets an increasing ``id``; a subscriber
+    that reconnects with the last ID it saw is replayed what it missed, as
+    long as that is still in the history.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE, max_subscribers=MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=history_size)
+        self._subscribers = []
+
+    def publish(self, event_type, data, node_ids=()):
+        """Send an event to every interested subscriber.
+
+        ``node_ids`` lists the Matter nodes the event concerns, so clients
+        can subscribe to a subset of nodes.
+        """
+        with self._lock:
+            event = {
+                'id': next(self._ids),
+                'type': event_type,
+                'time': time.time(),
+                'nodes': [str(node_id) for node_id in node_ids],
+                'data': data,
+            }
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            if subscription.wants(event):
+                subscription.put(event)
+        return event
+
+    def subscribe(self, node_ids=None, types=None, last_event_id=None, loop=None):
+        """Register a subscriber, replaying events after ``last_event_id``.
+
+        With ``loop`` the subscription is an ``AsyncSubscription`` read on
+        that event loop. Returns ``(subscription, complete)`` where
+        ``complete`` is False if events after ``last_event_id`` have already
+        left the history. Raises ``TooManySubscribers`` when
+        ``max_subscribers`` are connected.
+        """
+        if loop is not None:
+            subscription = AsyncSubscription(self, loop, node_ids, types)
+        else:
+            subscription = Subscription(self, node_ids, types)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers(f"{self.max_subscribers} event subscribers already connected")
+            complete = True
+            if last_event_id is not None:
+                history = list(self._history)
+                complete = not history or history[0]['id'] <= last_event_id + 1
+                for event in history:
+                    if event['id'] > last_event_id and subscription.wants(event):
+                        subscription.put(event)
+            self._subscribers.append(subscription)
+        logger.debug(f"Event subscriber added, {len(self._subscribers)} connected")
+        return subscription, complete
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+        logger.debug(f"Event subscriber removed, {len(self._subscribers)} connected")
+
+
+# Create a singleton instance
+event_bus = EventBus()
@@ -0,0 +1,192 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+from flask import Blueprint, Response, jsonify, request
+from ..logger import get_logger
+from ..matter.protocol_manager import protocol_manager
+from .bus import TooManySubscribers, event_bus
+
+events_blueprint = Blueprint('events', __name__)
+logger = get_logger(__name__)
+
+HEARTBEAT_INTERVAL = 15
+
+STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+}
+
+EVENT_TYPES = [
+    'attribute_updated', 'node_added', 'node_removed', 'node_online', 'node_offline',
+    'scene_activated', 'circuit_propagated', 'commissioning', 'network_changed',
+]
+
+def _forward_matter_event(event, data):
+    """Publish matter-server node events on the bus."""
+    if event == 'attribute_updated':
+        node_id, path, value = data
+        event_bus.publish('attribute_updated', {'node_id': node_id, 'path': path, 'value': value}, [node_id])
+    elif event == 'node_added':
+        event_bus.publish('node_added', {'node_id': data['node_id'], 'available': bool(data.get('available'))}, [data['node_id']])
+    elif event == 'node_removed':
+        event_bus.publish('node_removed', {'node_id': data}, [data])
+
+def _forward_liveness(node_id, online):
+    event_bus.publish('node_online' if online else 'node_offline', {'node_id': node_id}, [node_id])
+
+protocol_manager.add_listener(_forward_matter_event)
+protocol_manager.liveness.add_listener(_forward_liveness)
+
+def _format(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def _split(value):
+    return [part for part in (value or '').split(',') if part] or None
+
+def _subscribe(nodes, types, last_event_id, loop=None):
+    """Validate the stream parameters and subscribe to the bus.
+
+    Raises ``ValueError`` for invalid parameters and ``TooManySubscribers``
+    when no more streams are accepted.
+    """
+    types = _split(types)
+    if types and not set(types) <= set(EVENT_TYPES):
+        raise ValueError(f"Unknown event type, expected some of {', '.join(EVENT_TYPES)}")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise ValueError('Last-Event-ID must be an integer') from None
+
+    return event_bus.subscribe(
+        node_ids=_split(nodes),
+        types=types,
+        last_event_id=last_event_id,
+        loop=loop
+    )
+
+@events_blueprint.route('', methods=['GET'])
+def stream_events():
+    """
+    Stream controller events as Server-Sent Events
+    ---
+    description: >
+      Pushes attribute changes, node online/offline transitions, scene
+      activations, circuit propagations, commissioning progress and network
+      readiness changes as they happen. Each message has
+      an id; reconnecting with Last-Event-ID replays what was missed, or
+      sends a resync event if that is no longer possible. A comment line is
+      sent every 15 seconds to keep the connection open.
+    produces:
+      - text/event-stream
+    parameters:
+      - name: nodes
+        in: query
+        type: string
+        description: Comma separated node IDs; events about other nodes are not sent
+      - name: types
+        in: query
+        type: string
+        description: Comma separated event types to receive
+      - name: Last-Event-ID
+        in: header
+        type: integer
+        description: ID of the last event received, also accepted as the last_event_id query parameter
+    responses:
+      200:
+        description: Event stream
+      400:
+        description: Invalid parameters
+      503:
+        description: Too many event subscribers connected
+    """
+    try:
+        subscription, complete = _subscribe(
+            request.args.get('nodes'),
+            request.args.get('types'),
+            request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except TooManySubscribers as e:
+        logger.warning(f"Refused event subscriber: {e}")
+        return jsonify({'error': 'Too many event subscribers'}), 503
+
+    def generate():
+        try:
+            if not complete:
+                yield "event: resync\ndata: {}\n\n"
+            while True:
+                event = subscription.get(timeout=HEARTBEAT_INTERVAL)
+                if subscription.overflowed:
+                    logger.warning("Event subscriber fell behind, closing its stream")
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+                yield _format(event) if event else ": keepalive\n\n"
+        finally:
+            subscription.close()
+
+    return Response(generate(), mimetype='text/event-stream', headers=STREAM_HEADERS)
+
+async def serve_asgi(scope, receive, send):
+    """Serve ``GET /api/events`` directly on the ASGI server's event loop.
+
+    Behaves like ``stream_events`` but waits for events on an
+    ``asyncio.Queue`` instead of a blocked request thread, so open streams
+    do not use up the WSGI worker pool.
+    """
+    args = {key: values[0] for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+
+    async def respond(status, body, content_type='application/json', more_body=False, extra_headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type.encode()), *extra_headers],
+        })
+        await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': more_body})
+
+    try:
+        subscription, complete = _subscribe(
+            args.get('nodes'),
+            args.get('types'),
+            headers.get('last-event-id', args.get('last_event_id')),
+            loop=asyncio.get_running_loop()
+        )
+    except ValueError as e:
+        await respond(400, json.dumps({'error': str(e)}))
+        return
+    except TooManySubscribers as e:
+        logger.warning(f"Refused event subscriber: {e}")
+        await respond(503, json.dumps({'error': 'Too many event subscribers'}))
+        return
+
+    async def pump():
+        await respond(
+            200, "event: resync\ndata: {}\n\n" if not complete else '',
+            content_type='text/event-stream', more_body=True,
+            extra_headers=[(name.lower().encode(), value.encode()) for name, value in STREAM_HEADERS.items()]
+        )
+        while True:
+            event = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+            if subscription.overflowed:
+                logger.warning("Event subscriber fell behind, closing its stream")
+                await send({'type': 'http.response.body', 'body': b"event: overflow\ndata: {}\n\n"})
+                return
+            chunk = _format(event) if event else ": keepalive\n\n"
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.create_task(pump()), asyncio.create_task(disconnected())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.debug(f"Event stream closed: {task.exception()}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        subscription.close()
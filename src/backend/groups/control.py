@@ -0,0 +1,183 @@
+"""Dispatch of commands to the devices of groups, by group cast and unicast."""
+import asyncio
+import time
+from ..logger import get_logger
+from ..matter.protocol_manager import protocol_manager
+
+logger = get_logger(__name__)
+
+
+def resolve_members(groups_table, group_id):
+    """Collect a group's devices, following nested ``subgroups``.
+
+    Each device appears once however many paths lead to it and cycles are
+    ignored. Returns ``(device_ids, cast_groups)`` where ``cast_groups`` are
+    the visited groups that have a ``matter_group_id``.
+    """
+    device_ids = {}
+    cast_groups = []
+    seen = set()
+    pending = [group_id]
+
+    while pending:
+        current = pending.pop(0)
+        if current in seen:
+            continue
+        seen.add(current)
+
+        group = groups_table.get(doc_id=current)
+        if not group:
+            logger.warning(f"Group {group_id} references missing subgroup {current}")
+            continue
+
+        if group.get('matter_group_id') is not None:
+            cast_groups.append(group)
+        for device_id in group.get('devices', []):
+            device_ids.setdefault(str(device_id), device_id)
+        pending.extend(group.get('subgroups', []))
+
+    return list(device_ids.values()), cast_groups
+
+
+def resolve_nodes(devices_table, device_ids):
+    """Map device IDs to the Matter node IDs stored on their device documents.
+
+    Returns ``(nodes, missing)``: ``nodes`` maps each ``str(device_id)`` to
+    its node ID, ``missing`` lists the device IDs that have no document or
+    no node.
+    """
+    nodes = {}
+    missing = []
+    for device_id in device_ids:
+        device = devices_table.get(doc_id=int(device_id)) if str(device_id).isdigit() else None
+        if device and device.get('node_id') is not None:
+            nodes[str(device_id)] = device['node_id']
+        else:
+            missing.append(device_id)
+    return nodes, missing
+
+
+def dispatch_limits(options, concurrency, deadline):
+    """Read ``concurrency`` and ``deadline`` from request options.
+
+    ``concurrency`` and ``deadline`` are the defaults. Raises ``ValueError``
+    unless concurrency is a positive integer and deadline a positive number
+    of seconds.
+    """
+    concurrency = options.get('concurrency', concurrency)
+    deadline = options.get('deadline', deadline)
+    if isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError('concurrency must be a positive integer')
+    if isinstance(deadline, bool) or not isinstance(deadline, (int, float)) or not 0 < deadline < float('inf'):
+        raise ValueError('deadline must be a positive number of seconds')
+    return concurrency, float(deadline)
+
+
+async def dispatch_commands(casts, unicast, concurrency, deadline):
+    """Send Matter group casts and unicast commands together.
+
+    ``unicast`` is a list of ``(key, node_id, command, params)`` requests
+    and ``casts`` a list of ``(group, command, params, members)``, where
+    ``members`` are the requests reaching the group's devices one by one.
+    Members of a cast that failed are unicast within what is left of
+    ``deadline``; casts still running at the deadline are cancelled and
+    reported as failed. Returns a result per key, saying whether the
+    device was reached by group cast or unicast.
+    """
+    started = time.monotonic()
+
+    def send(requests, time_left):
+        return protocol_manager.control_devices(
+            [(node_id, command, params) for _, node_id, command, params in requests],
+            concurrency=concurrency,
+            deadline=time_left
+        )
+
+    async def cast_all():
+        tasks = [
+            asyncio.create_task(protocol_manager.group_command(group['matter_group_id'], command, params))
+            for group, command, params, _ in casts
+        ]
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return [None if task in pending else task.result() for task in tasks]
+
+    cast_results, unicast_results = await asyncio.gather(cast_all(), send(unicast, deadline))
+    unicast = list(unicast)
+    unicast_results = list(unicast_results)
+
+    results = {}
+    fallback = []
+    for (group, _, _, members), result in zip(casts, cast_results):
+        if result is None:
+            logger.warning(f"Group cast to group {group.doc_id} exceeded the deadline")
+            for key, _, _, _ in members:
+                results[key] = {
+                    'success': False,
+                    'via': 'group',
+                    'group_id': group.doc_id,
+                    'latency_ms': round(deadline * 1000, 1),
+                    'error': 'Deadline exceeded'
+                }
+            continue
+        if not result['success']:
+            if not result.get('unsupported'):
+                logger.warning(f"Group cast to group {group.doc_id} failed, falling back to unicast")
+            fallback.extend(members)
+            continue
+        for key, _, _, _ in members:
+            results[key] = {
+                'success': True,
+                'via': 'group',
+                'group_id': group.doc_id,
+                'latency_ms': result['latency_ms']
+            }
+
+    if fallback:
+        time_left = max(0, deadline - (time.monotonic() - started))
+        unicast += fallback
+        unicast_results += await send(fallback, time_left)
+
+    for (key, _, _, _), result in zip(unicast, unicast_results):
+        results[key] = {
+            'success': result['success'],
+            'via': 'unicast',
+            'latency_ms': result['latency_ms'],
+            **({'error': result['error']} if not result['success'] else {})
+        }
+    return results
+
+
+async def dispatch_group(nodes, cast_groups, command, params, concurrency, deadline):
+    """Send ``command`` to every node of a group.
+
+    ``nodes`` maps device IDs to node IDs. Matter groups are cast to first
+    and their members are only unicast if the cast fails; every other device
+    is unicast concurrently with the casts. Returns one result per device.
+    """
+    cast_members = {}
+    for group in cast_groups:
+        for device_id in group.get('devices', []):
+            if str(device_id) in nodes:
+                cast_members.setdefault(group.doc_id, []).append(str(device_id))
+    covered = {device_id for members in cast_members.values() for device_id in members}
+
+    casts = [
+        (group, command, params, [
+            (device_id, nodes[device_id], command, params) for device_id in cast_members[group.doc_id]
+        ])
+        for group in cast_groups if group.doc_id in cast_members
+    ]
+    unicast = [
+        (device_id, nodes[device_id], command, params) for device_id in nodes if device_id not in covered
+    ]
+    results = await dispatch_commands(casts, unicast, concurrency, deadline)
+
+    return [
+        {'device_id': device_id, 'node_id': node_id, **results[device_id]}
+        for device_id, node_id in nodes.items()
+    ]
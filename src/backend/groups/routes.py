@@ -1,12 +1,21 @@
+import time
 from flask import Blueprint, jsonify, request, render_template
 from ..logger import get_logger
+from ..database.batch import apply_batch, batch_summary, parse_batch
 from ..database.database import initialize_db, get_table
+from ..database.listing import conditional, filter_documents, list_response
+from ..matter.client import MatterServerUnavailable
 from ..matter.protocol_manager import protocol_manager
+from .control import dispatch_group, dispatch_limits, resolve_members, resolve_nodes
 
 groups_blueprint = Blueprint('groups', __name__)
 logger = get_logger(__name__)
 db = initialize_db()
 groups_table = get_table(db, 'groups')
+devices_table = get_table(db, 'devices')
+
+GROUP_CONCURRENCY = 16
+GROUP_DEADLINE = 10.0
 
 @groups_blueprint.route('/ui', methods=['GET'])
 def groups_ui():
@@ -18,13 +27,53 @@ def get_groups():
     """
     Get all groups
     ---
+    parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        description: ETag of a previous response; answered with 304 if still current
+      - name: cursor
+        in: query
+        type: string
+        description: X-Next-Cursor header of the previous page
+      - name: limit
+        in: query
+        type: integer
+        description: Page size; without limit or cursor the whole list is returned
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated fields to return, id is always included
+      - name: name
+        in: query
+        type: string
+        description: Only groups with this name
+      - name: device
+        in: query
+        type: string
+        description: Only groups listing this device directly
     responses:
       200:
         description: List of all groups
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Cursor of the next page, absent on the last page
+          X-Total-Count:
+            type: integer
+            description: Number of items matching the filters
+      304:
+        description: Not modified since the ETag sent in If-None-Match
     """
     try:
-        groups = groups_table.all()
-        return jsonify(groups)
+        def build():
+            if 'device' in request.args:
+                groups = groups_table.find_by_device(request.args['device'])
+            else:
+                groups = groups_table.all()
+            return list_response(filter_documents(groups, ['name', 'matter_group_id']))
+
+        return conditional(db.versions.etag(db.versions.table(groups_table.name)), build)
     except Exception as e:
         logger.error(f"Error fetching groups: {e}")
         return jsonify({'error': 'Failed to fetch groups'}), 500
@@ -35,6 +84,10 @@ def get_group(group_id):
     Get a specific group
     ---
     parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        description: ETag of a previous response; answered with 304 if still current
       - name: group_id
         in: path
         type: integer
@@ -42,14 +95,17 @@ def get_group(group_id):
     responses:
       200:
         description: Group details
+      304:
+        description: Not modified since the ETag sent in If-None-Match
       404:
         description: Group not found
     """
     try:
+        etag = db.versions.etag(db.versions.document(groups_table.name, group_id))
         group = groups_table.get(doc_id=group_id)
         if not group:
             return jsonify({'error': 'Group not found'}), 404
-        return jsonify({**group, 'id': group_id})
+        return conditional(etag, lambda: jsonify({**group, 'id': group_id}))
     except Exception as e:
         logger.error(f"Error fetching group {group_id}: {e}")
         return jsonify({'error': 'Failed to fetch group'}), 500
@@ -70,10 +126,18 @@ def create_group():
               type: string
             description:
               type: string
+            matter_group_id:
+              type: integer
+              description: Matter Group ID provisioned on the members, enables group casts
             devices:
               type: array
               items:
                 type: integer
+            subgroups:
+              type: array
+              items:
+                type: integer
+              description: IDs of nested groups whose devices are controlled with this group
     responses:
       201:
         description: Group created successfully
@@ -85,8 +149,9 @@ def create_group():
         if not data.get('name'):
             return jsonify({'error': 'Group name is required'}), 400
 
-        # Ensure devices is always a list
+        # Ensure devices and subgroups are always lists
         data['devices'] = data.get('devices', [])
+        data['subgroups'] = data.get('subgroups', [])
 
         # Add the group to the database
         group_id = groups_table.insert(data)
@@ -117,10 +182,18 @@ def update_group(group_id):
               type: string
             description:
               type: string
+            matter_group_id:
+              type: integer
+              description: Matter Group ID provisioned on the members, enables group casts
             devices:
               type: array
               items:
                 type: integer
+            subgroups:
+              type: array
+              items:
+                type: integer
+              description: IDs of nested groups whose devices are controlled with this group
     responses:
       200:
         description: Group updated successfully
@@ -196,7 +269,7 @@ def add_device_to_group(group_id):
         if not group:
             return jsonify({'error': 'Group not found'}), 404
 
-        devices = group.get('devices', [])
+        devices = list(group.get('devices', []))
         if data['device_id'] not in devices:
             devices.append(data['device_id'])
             groups_table.update({'devices': devices}, doc_ids=[group_id])
@@ -205,4 +278,150 @@ def add_device_to_group(group_id):
         return jsonify({'message': 'Device added to group successfully'})
     except Exception as e:
         logger.error(f"Error adding device to group: {e}")
-        return jsonify({'error': 'Failed to add device to group'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to add device to group'}), 500
+
+@groups_blueprint.route('/<int:group_id>/control', methods=['POST'])
+async def control_group(group_id):
+    """
+    Send a command to every device in a group
+    ---
+    description: >
+      Devices reached through nested subgroups are commanded once. Groups
+      with a matter_group_id are multicast to, with unicast fallback; other
+      devices are commanded concurrently.
+    parameters:
+      - name: group_id
+        in: path
+        type: integer
+        required: true
+      - name: command
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            command:
+              type: string
+              enum: [on, off, toggle, set_level, set_color, apply_state, device_command]
+            params:
+              type: object
+            concurrency:
+              type: integer
+              description: Maximum number of devices commanded at once
+            deadline:
+              type: number
+              description: Seconds before outstanding commands are abandoned
+    responses:
+      200:
+        description: Command dispatched, with per-device results and timing
+      400:
+        description: Invalid request data
+      404:
+        description: Group not found
+      503:
+        description: Matter server unavailable
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not data.get('command'):
+            return jsonify({'error': 'Command is required'}), 400
+        try:
+            concurrency, deadline = dispatch_limits(data, GROUP_CONCURRENCY, GROUP_DEADLINE)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not groups_table.get(doc_id=group_id):
+            return jsonify({'error': 'Group not found'}), 404
+
+        device_ids, cast_groups = resolve_members(groups_table, group_id)
+
+        # Groups store device IDs; commands go to the device's Matter node
+        nodes, missing = resolve_nodes(devices_table, device_ids)
+        for device_id in missing:
+            logger.warning(f"Group {group_id} references device {device_id} with no Matter node")
+
+        started = time.monotonic()
+        report = await dispatch_group(
+            nodes,
+            cast_groups,
+            data['command'],
+            data.get('params'),
+            concurrency=concurrency,
+            deadline=deadline
+        )
+        report += [
+            {'device_id': device_id, 'node_id': None, 'success': False, 'error': 'not_found'}
+            for device_id in missing
+        ]
+        duration_ms = round((time.monotonic() - started) * 1000, 1)
+
+        succeeded = sum(1 for result in report if result['success'])
+        logger.info(f"Sent {data['command']} to group {group_id}: "
+                    f"{succeeded}/{len(report)} devices in {duration_ms}ms")
+        return jsonify({
+            'group_id': group_id,
+            'command': data['command'],
+            'succeeded': succeeded,
+            'failed': len(report) - succeeded,
+            'duration_ms': duration_ms,
+            'devices': report
+        })
+    except MatterServerUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"Error controlling group {group_id}: {e}")
+        return jsonify({'error': 'Failed to control group'}), 500
+
+def _validate_group(op, data):
+    if op == 'create':
+        if not data.get('name'):
+            return 'Group name is required'
+        data['devices'] = data.get('devices', [])
+        data['subgroups'] = data.get('subgroups', [])
+
+
+@groups_blueprint.route('/batch', methods=['POST'])
+def batch_groups():
+    """
+    Create, update and delete groups in one batch
+    ---
+    description: >
+      Operations are applied in order within a single storage transaction and
+      persisted with one flush. Each item succeeds or fails on its own.
+    parameters:
+      - name: batch
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            operations:
+              type: array
+              items:
+                type: object
+                properties:
+                  op:
+                    type: string
+                    enum: [create, update, delete]
+                  id:
+                    type: integer
+                    description: Required for update and delete
+                  data:
+                    type: object
+                    description: The group, as for the single-group endpoints
+    responses:
+      200:
+        description: Per-operation results with an HTTP-like status each
+      400:
+        description: Malformed batch
+    """
+    try:
+        operations = parse_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        results = apply_batch(db, groups_table, operations, validate=_validate_group)
+        return jsonify(batch_summary(results))
+    except Exception as e:
+        logger.error(f"Error applying group batch: {e}")
+        return jsonify({'error': 'Failed to apply batch'}), 500
@@ -0,0 +1,201 @@
+"""Websocket client for the python-matter-server API."""
+import asyncio
+import itertools
+import aiohttp
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# matter-server error code for commands it does not implement
+INVALID_COMMAND_ERROR = 9
+
+
+class MatterServerError(Exception):
+    """Error result returned by the matter-server for a command."""
+
+    def __init__(self, command, error_code, details=None):
+        super().__init__(f"{command} failed with error {error_code}: {details}")
+        self.command = command
+        self.error_code = error_code
+        self.details = details
+
+
+class MatterServerUnavailable(ConnectionError):
+    """The matter-server cannot be reached right now."""
+
+
+class MatterServerClient:
+    """Keeps one persistent websocket connection to a matter-server instance.
+
+    Commands are tagged with a message ID and their responses are matched
+    back to the waiting caller, so any number of commands can be in flight
+    on the single connection at once. A supervisor task reconnects with
+    exponential backoff whenever the connection drops; in-flight commands
+    then fail with ``ConnectionError`` and new ones with
+    ``MatterServerUnavailable`` until the connection is back.
+
+    ``on_connect`` is awaited after every (re)connection, before commands
+    from other callers are let through, and every event message is passed
+    to the listeners registered with ``add_listener``.
+    """
+
+    def __init__(self, url, on_connect=None, command_timeout=30, max_backoff=30):
+        self.url = url
+        self.server_info = None
+        self.command_timeout = command_timeout
+        self.max_backoff = max_backoff
+        self._on_connect = on_connect
+        self._listeners = []
+        self._pending = {}
+        self._message_ids = itertools.count(1)
+        self._session = None
+        self._ws = None
+        self._send_lock = None
+        self._connected = None
+        self._failed = None
+        self._supervisor = None
+        self.last_error = None
+
+    @property
+    def connected(self):
+        return self._connected is not None and self._connected.is_set()
+
+    @property
+    def reconnecting(self):
+        """Whether the supervisor is retrying after a failed connection attempt."""
+        return self._supervisor is not None and not self.connected and self._failed.is_set()
+
+    def unavailable(self):
+        """The error to fail commands with while there is no connection."""
+        reason = f": {self.last_error}" if self.last_error else ''
+        return MatterServerUnavailable(f"Matter server unavailable at {self.url}{reason}")
+
+    def add_listener(self, callback):
+        """Register ``callback(event, data)`` for server events; returns a remover."""
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    async def start(self, timeout=10):
+        """Start the connection supervisor and wait for the first connection.
+
+        Raises ``MatterServerUnavailable`` as soon as a connection attempt
+        fails, or after ``timeout`` seconds; the supervisor keeps retrying
+        in the background either way.
+        """
+        if self._supervisor is None:
+            self._connected = asyncio.Event()
+            self._failed = asyncio.Event()
+            self._send_lock = asyncio.Lock()
+            self._session = aiohttp.ClientSession()
+            self._supervisor = asyncio.create_task(self._supervise())
+        waiters = [asyncio.create_task(self._connected.wait()), asyncio.create_task(self._failed.wait())]
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if not self.connected:
+            if self.last_error is None:
+                self.last_error = f"no connection within {timeout}s"
+            raise self.unavailable()
+
+    async def stop(self):
+        """Close the connection and stop reconnecting."""
+        if self._supervisor is None:
+            return
+        self._supervisor.cancel()
+        await asyncio.gather(self._supervisor, return_exceptions=True)
+        self._supervisor = None
+        await self._session.close()
+        self._session = None
+
+    async def _supervise(self):
+        backoff = 1
+        while True:
+            try:
+                async with self._session.ws_connect(self.url, heartbeat=30, max_msg_size=0) as ws:
+                    self._ws = ws
+                    # The server greets every client with its info
+                    self.server_info = await ws.receive_json()
+                    logger.info(f"Connected to matter-server at {self.url} "
+                                f"(schema {self.server_info.get('schema_version')})")
+                    backoff = 1
+                    reader = asyncio.create_task(self._read(ws))
+                    try:
+                        if self._on_connect:
+                            await self._on_connect()
+                        self.last_error = None
+                        self._failed.clear()
+                        self._connected.set()
+                        await reader
+                    finally:
+                        reader.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"matter-server connection to {self.url} failed: {e}")
+                self.last_error = str(e) or type(e).__name__
+                self._failed.set()
+            finally:
+                self._ws = None
+                self._connected.clear()
+                self._fail_pending(ConnectionError("Connection to matter-server lost"))
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _read(self, ws):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            try:
+                self._dispatch(msg.json())
+            except Exception as e:
+                logger.error(f"Failed to handle matter-server message: {e}")
+
+    def _dispatch(self, message):
+        if 'event' in message:
+            for listener in list(self._listeners):
+                try:
+                    listener(message['event'], message.get('data'))
+                except Exception as e:
+                    logger.error(f"Error in matter-server event listener: {e}")
+            return
+
+        command, future = self._pending.pop(message.get('message_id'), (None, None))
+        if future is None or future.done():
+            return
+        if 'error_code' in message:
+            future.set_exception(MatterServerError(
+                command, message['error_code'], message.get('details')
+            ))
+        else:
+            future.set_result(message.get('result'))
+
+    def _fail_pending(self, error):
+        pending, self._pending = self._pending, {}
+        for _, future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def send_command(self, command, args=None, timeout=None, require_connected=True):
+        """Send a command and wait for its result.
+
+        ``require_connected`` is only cleared by the ``on_connect`` hook,
+        which runs before the connection is announced to other callers.
+        """
+        if require_connected and not self.connected:
+            raise self.unavailable()
+        ws = self._ws
+        if ws is None:
+            raise self.unavailable()
+
+        message_id = str(next(self._message_ids))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = (command, future)
+        try:
+            async with self._send_lock:
+                await ws.send_json({'message_id': message_id, 'command': command, 'args': args or {}})
+            return await asyncio.wait_for(future, timeout or self.command_timeout)
+        finally:
+            self._pending.pop(message_id, None)
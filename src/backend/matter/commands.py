@@ -0,0 +1,85 @@
+"""Translation of the app's device commands into Matter cluster commands."""
+
+ON_OFF_CLUSTER = 6
+LEVEL_CONTROL_CLUSTER = 8
+COLOR_CONTROL_CLUSTER = 768
+SCENES_CLUSTER = 5
+
+DEFAULT_ENDPOINT = 1
+
+
+def _scale(value, maximum):
+    """Scale an app value (0..maximum) onto the Matter 0..254 range."""
+    return max(0, min(254, round(value * 254 / maximum)))
+
+
+def _command(endpoint_id, cluster_id, command_name, payload=None):
+    return {
+        'endpoint_id': endpoint_id,
+        'cluster_id': cluster_id,
+        'command_name': command_name,
+        'payload': payload or {},
+    }
+
+
+def state_commands(state, endpoint_id=DEFAULT_ENDPOINT):
+    """Cluster commands that bring a light to ``state``.
+
+    ``state`` uses the scene and circuit format: ``on``, ``brightness``
+    (0-100) and ``hue`` (0-360) / ``saturation`` (0-100) / ``value`` (0-100).
+    """
+    transition = state.get('transition_time', 0)
+    level = state.get('brightness', state.get('value'))
+    commands = []
+
+    if state.get('on') is False or level == 0:
+        commands.append(_command(endpoint_id, ON_OFF_CLUSTER, 'Off'))
+    elif level is not None:
+        commands.append(_command(endpoint_id, LEVEL_CONTROL_CLUSTER, 'MoveToLevelWithOnOff', {
+            'level': max(1, _scale(level, 100)),
+            'transitionTime': transition,
+            'optionsMask': 0,
+            'optionsOverride': 0,
+        }))
+    elif state.get('on') is True:
+        commands.append(_command(endpoint_id, ON_OFF_CLUSTER, 'On'))
+
+    if 'hue' in state and 'saturation' in state and state.get('on') is not False:
+        commands.append(_command(endpoint_id, COLOR_CONTROL_CLUSTER, 'MoveToHueAndSaturation', {
+            'hue': _scale(state['hue'], 360),
+            'saturation': _scale(state['saturation'], 100),
+            'transitionTime': transition,
+            'optionsMask': 0,
+            'optionsOverride': 0,
+        }))
+
+    return commands
+
+
+def build_commands(command, params=None):
+    """Translate an API command and its params into Matter cluster commands.
+
+    Raises ``ValueError`` for commands we do not know how to send.
+    """
+    params = params or {}
+    endpoint_id = params.get('endpoint_id', DEFAULT_ENDPOINT)
+
+    if command in ('on', 'off', 'toggle'):
+        return [_command(endpoint_id, ON_OFF_CLUSTER, command.capitalize())]
+    if command == 'set_level':
+        return state_commands({'brightness': params.get('brightness', params.get('level'))}, endpoint_id)
+    if command == 'set_color':
+        return state_commands({k: v for k, v in params.items() if k != 'on'}, endpoint_id)
+    if command == 'apply_state':
+        return state_commands(params, endpoint_id)
+    if command == 'recall_scene':
+        return [_command(endpoint_id, SCENES_CLUSTER, 'RecallScene', {
+            'groupID': params['group_id'],
+            'sceneID': params['scene_id'],
+        })]
+    if command == 'device_command':
+        if 'cluster_id' not in params or 'command_name' not in params:
+            raise ValueError("device_command requires 'cluster_id' and 'command_name'")
+        return [_command(endpoint_id, params['cluster_id'], params['command_name'], params.get('payload'))]
+
+    raise ValueError(f"Unsupported command: {command}")
@@ -0,0 +1,233 @@
+"""Per-node reachability derived from matter-server traffic."""
+import asyncio
+import time
+from datetime import datetime
+from ..database.database import initialize_db, get_table
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+FLUSH_INTERVAL = 60
+FAILURE_THRESHOLD = 3
+RTT_SMOOTHING = 0.2
+
+
+class NodeLiveness:
+    __slots__ = ('last_heard', 'rtt_ms', 'failures', 'available', 'online')
+
+    def __init__(self):
+        self.last_heard = None
+        self.rtt_ms = None
+        self.failures = 0
+        self.available = None
+        self.online = False
+
+
+class LivenessTracker:
+    """When each node was last heard from, how fast it answers and whether it is failing.
+
+    Fed by matter-server events (any report from a node counts as hearing
+    from it, ``available`` flags come with node updates) and by the outcome
+    of commands. A node is online while matter-server considers it available
+    and fewer than ``FAILURE_THRESHOLD`` commands in a row have failed.
+    Listeners are told about transitions and ``version`` only moves with
+    them, not every time a node is heard from. Records live in memory and
+    are written to the ``device_liveness`` table every ``FLUSH_INTERVAL``
+    seconds, so last-seen times survive a restart.
+
+    Updates happen on the event loop; request threads only read.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._dirty = set()
+        self._table = None
+        # Node ID -> document ID in the device_liveness table, None until read
+        self._doc_ids = None
+        self._flusher = None
+        self._listeners = []
+        self.version = 0
+        # Offset turning monotonic timestamps into wall-clock time
+        self._wall_offset = time.time() - time.monotonic()
+
+    def _record(self, node_id):
+        node_id = str(node_id)
+        record = self._nodes.get(node_id)
+        if record is None:
+            record = self._nodes[node_id] = NodeLiveness()
+        return record
+
+    def add_listener(self, callback):
+        """Register ``callback(node_id, online)`` for online/offline transitions."""
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def _changed(self, node_id, record):
+        self._dirty.add(str(node_id))
+        online = bool(record.available) and record.failures < FAILURE_THRESHOLD
+        if online == record.online:
+            return
+        record.online = online
+        self.version += 1
+        for listener in list(self._listeners):
+            try:
+                listener(node_id, online)
+            except Exception as e:
+                logger.error(f"Error in liveness listener: {e}")
+
+    def heard(self, node_id):
+        record = self._record(node_id)
+        record.last_heard = time.monotonic()
+        record.failures = 0
+        self._changed(node_id, record)
+
+    def set_available(self, node_id, available):
+        record = self._record(node_id)
+        record.available = bool(available)
+        if available:
+            record.last_heard = time.monotonic()
+        self._changed(node_id, record)
+
+    def record_command(self, node_id, latency_ms, success):
+        """Account for the outcome of a command sent to a node."""
+        record = self._record(node_id)
+        if success:
+            record.last_heard = time.monotonic()
+            record.failures = 0
+            record.rtt_ms = latency_ms if record.rtt_ms is None else round(
+                record.rtt_ms + RTT_SMOOTHING * (latency_ms - record.rtt_ms), 1
+            )
+        else:
+            record.failures += 1
+        self._changed(node_id, record)
+
+    def load_nodes(self, nodes):
+        """Take availability from a full node dump."""
+        for node in nodes:
+            self.set_available(node['node_id'], node.get('available'))
+
+    def handle_event(self, event, data):
+        """Apply a matter-server event."""
+        if event == 'attribute_updated':
+            self.heard(data[0])
+        elif event in ('node_added', 'node_updated'):
+            self.set_available(data['node_id'], data.get('available'))
+        elif event == 'node_removed':
+            self._nodes.pop(str(data), None)
+            self._dirty.add(str(data))
+            self.version += 1
+
+    def is_online(self, node_id):
+        record = self._nodes.get(str(node_id))
+        return record.online if record else False
+
+    def get(self, node_id):
+        """Liveness of a node as served by the API."""
+        record = self._nodes.get(str(node_id))
+        if record is None:
+            return {'online': False, 'last_seen': None, 'rtt_ms': None, 'failures': 0}
+        return {
+            'online': record.online,
+            'last_seen': self._wall_time(record.last_heard),
+            'rtt_ms': record.rtt_ms,
+            'failures': record.failures,
+        }
+
+    def _wall_time(self, monotonic):
+        if monotonic is None:
+            return None
+        return datetime.fromtimestamp(monotonic + self._wall_offset).isoformat()
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = get_table(initialize_db(), 'device_liveness')
+        return self._table
+
+    def load(self):
+        """Restore last-seen times and failure counts from storage."""
+        self._doc_ids = {}
+        for doc in self.table.all():
+            self._doc_ids[str(doc['node_id'])] = doc.doc_id
+            record = self._record(doc['node_id'])
+            if record.last_heard is None and doc.get('last_seen') is not None:
+                record.last_heard = doc['last_seen'] - self._wall_offset
+            record.rtt_ms = record.rtt_ms if record.rtt_ms is not None else doc.get('rtt_ms')
+            record.failures = max(record.failures, doc.get('failures', 0))
+        self.version += 1
+
+    def _snapshot(self):
+        """Documents for the records that changed since the last flush; None marks removed nodes.
+
+        The records are no longer marked as changed; ``flush`` marks them
+        again if writing the snapshot fails.
+        """
+        dirty, self._dirty = self._dirty, set()
+        snapshot = {}
+        for node_id in dirty:
+            record = self._nodes.get(node_id)
+            snapshot[node_id] = None if record is None else {
+                'node_id': node_id,
+                'last_seen': None if record.last_heard is None else record.last_heard + self._wall_offset,
+                'rtt_ms': record.rtt_ms,
+                'failures': record.failures,
+            }
+        return snapshot
+
+    def _write(self, snapshot):
+        if not snapshot:
+            return
+        if self._doc_ids is None:
+            self._doc_ids = {str(doc['node_id']): doc.doc_id for doc in self.table.all()}
+        # Only this tracker writes the table, so the ID map stays accurate
+        doc_ids = dict(self._doc_ids)
+        try:
+            with initialize_db().transaction():
+                for node_id, doc in snapshot.items():
+                    doc_id = doc_ids.get(node_id)
+                    if doc is None:
+                        if doc_id is not None:
+                            self.table.remove(doc_ids=[doc_id])
+                            del doc_ids[node_id]
+                    elif doc_id is not None:
+                        self.table.update(doc, doc_ids=[doc_id])
+                    else:
+                        doc_ids[node_id] = self.table.insert(doc)
+        except Exception:
+            # Part of the writes may have landed; read the IDs again next time
+            self._doc_ids = None
+            raise
+        self._doc_ids = doc_ids
+        logger.debug(f"Flushed liveness of {len(snapshot)} node(s)")
+
+    async def flush(self):
+        """Write the records that changed since the last flush."""
+        snapshot = self._snapshot()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, snapshot)
+        except BaseException:
+            # Keep them for the next flush
+            self._dirty.update(snapshot)
+            raise
+
+    def start(self):
+        """Start flushing periodically; call on the event loop."""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Stop the periodic flush and write what is left."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        # Write directly, the default executor may already be gone at exit
+        self._write(self._snapshot())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush node liveness: {e}")
@@ -0,0 +1,150 @@
+"""In-memory cache of Matter node attributes fed by matter-server events."""
+import time
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+ON_OFF_PATH = (1, 6, 0)
+CURRENT_LEVEL_PATH = (1, 8, 0)
+CURRENT_HUE_PATH = (1, 768, 0)
+CURRENT_SATURATION_PATH = (1, 768, 1)
+# Attributes get_state reads
+STATE_PATHS = (ON_OFF_PATH, CURRENT_LEVEL_PATH, CURRENT_HUE_PATH, CURRENT_SATURATION_PATH)
+
+
+def parse_path(path):
+    """Turn an 'endpoint/cluster/attribute' path into an int tuple."""
+    endpoint, cluster, attribute = (int(part) for part in path.split('/'))
+    return endpoint, cluster, attribute
+
+
+def format_path(key):
+    return '/'.join(str(part) for part in key)
+
+
+class NodeCache:
+    """Attribute values of every commissioned node, keyed by node and path.
+
+    The cache is bootstrapped from the full node dump matter-server sends on
+    ``start_listening`` and then kept current from ``attribute_updated``,
+    ``node_added``, ``node_updated`` and ``node_removed`` events. Every value
+    carries the wall-clock time it was last reported, so callers can judge
+    staleness without asking the device.
+
+    Writes happen on the event loop only; request threads just read.
+    ``version`` grows with every change, for responses derived from the cache;
+    ``state_version`` only when nodes or what ``get_state`` reports change.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._attributes = {}
+        self.version = 0
+        self.state_version = 0
+
+    def __contains__(self, node_id):
+        return str(node_id) in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def node_ids(self):
+        return list(self._nodes)
+
+    def load(self, nodes):
+        """Replace the cache with a full node dump."""
+        self._nodes = {}
+        self._attributes = {}
+        self.version += 1
+        self.state_version += 1
+        for node in nodes:
+            self.set_node(node)
+
+    def set_node(self, node):
+        """Store a node as sent by matter-server, attributes included."""
+        node_id = str(node['node_id'])
+        now = time.time()
+        self.version += 1
+        self.state_version += 1
+        self._nodes[node_id] = {k: v for k, v in node.items() if k != 'attributes'}
+        self._attributes[node_id] = {
+            parse_path(path): (value, now)
+            for path, value in (node.get('attributes') or {}).items()
+        }
+
+    def remove_node(self, node_id):
+        self.version += 1
+        self.state_version += 1
+        self._nodes.pop(str(node_id), None)
+        self._attributes.pop(str(node_id), None)
+
+    def remove_endpoint(self, node_id, endpoint_id):
+        attributes = self._attributes.get(str(node_id))
+        if attributes is None:
+            return
+        self.version += 1
+        self.state_version += 1
+        self._attributes[str(node_id)] = {
+            key: entry for key, entry in attributes.items() if key[0] != endpoint_id
+        }
+
+    def update_attribute(self, node_id, path, value):
+        attributes = self._attributes.get(str(node_id))
+        if attributes is None:
+            logger.debug(f"Ignoring attribute update for unknown node {node_id}")
+            return
+        key = parse_path(path)
+        if key in STATE_PATHS and attributes.get(key, (None,))[0] != value:
+            self.state_version += 1
+        attributes[key] = (value, time.time())
+        self.version += 1
+
+    def handle_event(self, event, data):
+        """Apply a matter-server event to the cache."""
+        if event == 'attribute_updated':
+            node_id, path, value = data
+            self.update_attribute(node_id, path, value)
+        elif event in ('node_added', 'node_updated'):
+            self.set_node(data)
+        elif event == 'node_removed':
+            self.remove_node(data)
+        elif event == 'endpoint_removed':
+            self.remove_endpoint(data['node_id'], data['endpoint_id'])
+
+    def is_available(self, node_id):
+        """Whether matter-server currently reports the node as reachable."""
+        return bool(self._nodes.get(str(node_id), {}).get('available', False))
+
+    def get_attribute(self, node_id, endpoint, cluster, attribute, default=None):
+        entry = self._attributes.get(str(node_id), {}).get((endpoint, cluster, attribute))
+        return default if entry is None else entry[0]
+
+    def get_node(self, node_id):
+        """The node with its attributes and the time each was last reported."""
+        node = self._nodes.get(str(node_id))
+        if node is None:
+            return None
+        attributes = dict(self._attributes.get(str(node_id), {}))
+        return {
+            **node,
+            'attributes': {format_path(key): value for key, (value, _) in attributes.items()},
+            'attributes_updated_at': {format_path(key): ts for key, (_, ts) in attributes.items()},
+        }
+
+    def get_state(self, node_id):
+        """Light state of a node in the scene/circuit format, from cached attributes."""
+        if str(node_id) not in self._nodes:
+            return None
+        state = {}
+        on = self.get_attribute(node_id, *ON_OFF_PATH)
+        if on is not None:
+            state['on'] = bool(on)
+        level = self.get_attribute(node_id, *CURRENT_LEVEL_PATH)
+        if level is not None:
+            state['brightness'] = round(level * 100 / 254)
+        hue = self.get_attribute(node_id, *CURRENT_HUE_PATH)
+        saturation = self.get_attribute(node_id, *CURRENT_SATURATION_PATH)
+        if hue is not None and saturation is not None:
+            state['hue'] = round(hue * 360 / 254)
+            state['saturation'] = round(saturation * 100 / 254)
+        return state
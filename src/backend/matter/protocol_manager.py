@@ -1,78 +1,262 @@
 """Matter Protocol Manager for handling device communication and fabric management."""
 import asyncio
-import logging
+import os
+import time
+from ..event_loop import background_loop
 from ..logger import get_logger
+from .client import INVALID_COMMAND_ERROR, MatterServerClient, MatterServerError
+from .commands import build_commands
+from .liveness import LivenessTracker
+from .node_cache import NodeCache
 
 logger = get_logger(__name__)
 
+DEFAULT_SERVER_URL = "ws://localhost:5580/ws"
+DEFAULT_CONCURRENCY = 16
+COMMISSION_TIMEOUT = 300
+
 class MatterProtocolManager:
-    def __init__(self):
-        self._nodes = {}
+    def __init__(self, server_url=None):
+        self.node_cache = NodeCache()
+        self.liveness = LivenessTracker()
         self._initialized = False
         self._fabric_id = None
         self._vendor_id = "0xFFF1"  # Default development vendor ID
+        self._server_url = server_url or os.environ.get('MATTER_SERVER_URL', DEFAULT_SERVER_URL)
+        self._client = None
+        self._init_lock = None
+        self._group_cast_supported = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Register ``callback(event, data)`` for matter-server events; returns a remover.
+
+        Listeners run on the event loop after the node cache has been updated
+        and are kept across reconnects.
+        """
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def _dispatch_event(self, event, data):
+        for listener in list(self._listeners):
+            try:
+                listener(event, data)
+            except Exception as e:
+                logger.error(f"Error in Matter event listener: {e}")
 
     async def initialize(self):
-        """Initialize Matter protocol manager."""
+        """Connect to the matter-server, once per process.
+
+        While the server is down and the client is retrying in the
+        background, callers fail at once with ``MatterServerUnavailable``
+        instead of queueing up for another connection timeout.
+        """
         if self._initialized:
             return
+        self._check_available()
 
-        try:
-            # For now, we'll simulate the Matter server connection
-            # TODO: Implement actual Matter server connection
-            logger.info("Initializing Matter protocol manager")
-            self._initialized = True
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
 
-            # Start node discovery
-            await self._discover_nodes()
-        except Exception as e:
-            logger.error(f"Failed to initialize Matter protocol manager: {e}")
-            self._initialized = False
-            raise
+        async with self._init_lock:
+            if self._initialized:
+                return
+            self._check_available()
+            try:
+                logger.info(f"Initializing Matter protocol manager against {self._server_url}")
+                if self._client is None:
+                    self._client = MatterServerClient(self._server_url, on_connect=self._on_connect)
+                    self._client.add_listener(self.node_cache.handle_event)
+                    self._client.add_listener(self.liveness.handle_event)
+                    self._client.add_listener(self._dispatch_event)
+                    self.liveness.load()
+                    self.liveness.start()
+                background_loop.on_shutdown(self.shutdown)
+                await self._client.start()
+                self._initialized = True
+            except Exception as e:
+                logger.error(f"Failed to initialize Matter protocol manager: {e}")
+                raise
+
+    def _check_available(self):
+        if self._client is not None and self._client.reconnecting:
+            raise self._client.unavailable()
+
+    async def shutdown(self):
+        """Close the matter-server connection."""
+        if self._client is not None:
+            await self._client.stop()
+            self._client = None
+            await self.liveness.stop()
+        self._initialized = False
+
+    async def _on_connect(self):
+        """Subscribe to server events and rebuild the node cache from a full dump."""
+        nodes = await self._client.send_command('start_listening', require_connected=False)
+        self.node_cache.load(nodes or [])
+        self.liveness.load_nodes(nodes or [])
+        self._group_cast_supported = None
+        logger.info(f"Loaded {len(self.node_cache)} Matter node(s) from matter-server")
+
+    async def _send(self, command, args=None, timeout=None):
+        if not self._initialized:
+            await self.initialize()
+        return await self._client.send_command(command, args, timeout=timeout)
 
     async def _discover_nodes(self):
-        """Discover Matter nodes in the network."""
+        """Discover commissionable Matter nodes in the network."""
         if not self._initialized:
             await self.initialize()
 
         try:
-            # TODO: Implement actual node discovery
-            # For now, return empty list
-            self._nodes = {}
+            nodes = await self._send('discover')
             logger.info("Node discovery completed")
-            return []
+            return nodes or []
         except Exception as e:
             logger.error(f"Error discovering nodes: {e}")
             return []
 
+    async def commission_with_code(self, code: str, network_only: bool = False) -> dict:
+        """Commission a device with its setup code; returns the new node.
+
+        Commissioning takes tens of seconds, so this waits up to
+        ``COMMISSION_TIMEOUT`` seconds. Errors are raised to the caller.
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        logger.info("Commissioning device with setup code")
+        node = await self._send(
+            'commission_with_code', {'code': code, 'network_only': network_only},
+            timeout=COMMISSION_TIMEOUT
+        )
+        logger.info(f"Commissioned node {node.get('node_id')}")
+        return node
+
     async def get_node_info(self, node_id: str) -> dict:
-        """Get information about a specific node."""
+        """Get information about a specific node from the node cache."""
         if not self._initialized:
             await self.initialize()
 
         try:
-            node = self._nodes.get(node_id)
+            node = self.node_cache.get_node(node_id)
             return node if node else {}
         except Exception as e:
             logger.error(f"Error getting node info: {e}")
             return {}
 
     async def control_device(self, node_id: str, command: str, params: dict = None) -> dict:
-        """Send control command to a device."""
+        """Send control command to a device.
+
+        The command is translated into one or more cluster commands which are
+        sent concurrently over the shared matter-server connection. Raises
+        ``ValueError`` for a node matter-server does not know.
+        """
         if not self._initialized:
             await self.initialize()
 
-        try:
-            if node_id not in self._nodes:
-                raise ValueError(f"Node {node_id} not found")
+        if node_id not in self.node_cache:
+            raise ValueError(f"Node {node_id} not found")
 
-            # TODO: Implement actual device control
+        try:
+            cluster_commands = build_commands(command, params)
             logger.info(f"Sending command {command} to node {node_id}")
-            return {'success': True, 'result': 'Command simulated'}
+            start = time.monotonic()
+            try:
+                results = await asyncio.gather(*(
+                    self._send('device_command', {'node_id': int(node_id), **cluster_command})
+                    for cluster_command in cluster_commands
+                ))
+            except Exception:
+                self.liveness.record_command(node_id, None, success=False)
+                raise
+            self.liveness.record_command(node_id, (time.monotonic() - start) * 1000, success=True)
+            return {'success': True, 'result': results}
         except Exception as e:
             logger.error(f"Error controlling device {node_id}: {e}")
             return {'success': False, 'error': str(e)}
 
+    async def control_devices(self, requests, concurrency=DEFAULT_CONCURRENCY, deadline=None) -> list:
+        """Send commands to many devices concurrently.
+
+        ``requests`` is a list of ``(node_id, command, params)`` tuples. At most
+        ``concurrency`` devices are commanded at once and anything still
+        running after ``deadline`` seconds is cancelled. Returns one result
+        per request, in order, with its latency.
+        """
+        if not requests:
+            return []
+        if not self._initialized:
+            await self.initialize()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.monotonic()
+
+        async def run(node_id, command, params):
+            async with semaphore:
+                start = time.monotonic()
+                try:
+                    result = await self.control_device(node_id, command, params)
+                except ValueError as e:
+                    result = {'success': False, 'error': str(e)}
+                return {**result, 'latency_ms': round((time.monotonic() - start) * 1000, 1)}
+
+        tasks = [asyncio.create_task(run(*request)) for request in requests]
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for (node_id, _, _), task in zip(requests, tasks):
+            if task in pending:
+                results.append({
+                    'node_id': node_id,
+                    'success': False,
+                    'error': 'Deadline exceeded',
+                    'latency_ms': round((time.monotonic() - started) * 1000, 1)
+                })
+            else:
+                results.append({'node_id': node_id, **task.result()})
+        return results
+
+    async def group_command(self, group_id: int, command: str, params: dict = None) -> dict:
+        """Multicast a command to every member of a Matter group with one message.
+
+        Servers that do not implement group commands are remembered until the
+        next reconnect; the result then carries ``unsupported`` so callers can
+        fall back to unicast.
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        if self._group_cast_supported is False:
+            return {'success': False, 'unsupported': True, 'error': 'Group commands are not supported'}
+
+        start = time.monotonic()
+        try:
+            cluster_commands = build_commands(command, params)
+            logger.info(f"Sending command {command} to group {group_id}")
+            await asyncio.gather(*(
+                self._send('group_command', {
+                    'group_id': int(group_id),
+                    **{k: v for k, v in cluster_command.items() if k != 'endpoint_id'}
+                })
+                for cluster_command in cluster_commands
+            ))
+            self._group_cast_supported = True
+            return {'success': True, 'latency_ms': round((time.monotonic() - start) * 1000, 1)}
+        except MatterServerError as e:
+            if e.error_code == INVALID_COMMAND_ERROR:
+                logger.info("matter-server does not support group commands, using unicast")
+                self._group_cast_supported = False
+                return {'success': False, 'unsupported': True, 'error': str(e)}
+            logger.error(f"Error controlling group {group_id}: {e}")
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            logger.error(f"Error controlling group {group_id}: {e}")
+            return {'success': False, 'error': str(e)}
+
     async def get_device_fabrics(self, node_id: str) -> list:
         """Get all fabrics a device is connected to."""
         if not self._initialized:
@@ -105,4 +289,4 @@ class MatterProtocolManager:
         return self._vendor_id
 
 # Create a singleton instance
-protocol_manager = MatterProtocolManager()
\ No newline at end of file
+protocol_manager = MatterProtocolManager()
@@ -1,3 +1,4 @@
+from .monitor import NetworkMonitor, network_monitor
 from .routes import network_blueprint
 
-__all__ = ['network_blueprint']
+__all__ = ['NetworkMonitor', 'network_monitor', 'network_blueprint']
@@ -0,0 +1,246 @@
+"""Cached view of the host's network interfaces and IPv6 readiness."""
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from datetime import datetime
+import netifaces
+from ..event_loop import background_loop
+from ..events.bus import event_bus
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# Full rescans when no change feed is available, and as a safety net when it is
+POLL_INTERVAL = 30
+NETLINK_POLL_INTERVAL = 300
+# Netlink messages come in bursts; rescan once they settle
+NETLINK_DEBOUNCE = 0.2
+
+# rtnetlink multicast groups: links, IPv4/IPv6 addresses and IPv6 routes
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+
+IPV6_ROUTES = '/proc/net/ipv6_route'
+# Route learned from a Route Information Option of a router advertisement
+RTF_ROUTEINFO = 0x00800000
+
+ULA_NETWORK = ipaddress.ip_network('fc00::/7')
+
+# Readiness flags reported, and compared to detect changes
+READINESS_KEYS = ('ipv6', 'link_local', 'ula', 'global_ipv6')
+
+
+def _address_scope(address):
+    if address.is_link_local:
+        return 'link-local'
+    if address in ULA_NETWORK:
+        return 'ula'
+    if address.is_global:
+        return 'global'
+    return 'other'
+
+
+def scan_interfaces():
+    """Addresses of every interface that has a non-loopback one, from netifaces."""
+    interfaces = {}
+    for name in netifaces.interfaces():
+        addresses = netifaces.ifaddresses(name)
+        ipv4 = [
+            entry['addr'] for entry in addresses.get(netifaces.AF_INET, [])
+            if not ipaddress.ip_address(entry['addr']).is_loopback
+        ]
+        ipv6 = []
+        for entry in addresses.get(netifaces.AF_INET6, []):
+            address = ipaddress.ip_address(entry['addr'].split('%', 1)[0])
+            if address.is_loopback:
+                continue
+            ipv6.append({'address': str(address), 'scope': _address_scope(address)})
+        if not ipv4 and not ipv6:
+            continue
+        interfaces[name] = {'ipv4': ipv4, 'ipv6': ipv6}
+    return interfaces
+
+
+def scan_thread_prefixes(path=IPV6_ROUTES):
+    """Off-mesh routable prefixes advertised by Thread border routers.
+
+    Border routers announce their Thread network's /64 ULA prefix in the
+    Route Information Option of router advertisements; Linux installs those
+    as routes flagged RTF_ROUTEINFO. Returns an empty list where the IPv6
+    routing table cannot be read.
+    """
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+
+    prefixes = []
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 10 or not int(fields[8], 16) & RTF_ROUTEINFO:
+            continue
+        network = ipaddress.ip_network((int(fields[0], 16), int(fields[1], 16)))
+        if network.prefixlen != 64 or network.network_address not in ULA_NETWORK:
+            continue
+        prefixes.append({
+            'prefix': str(network),
+            'router': str(ipaddress.ip_address(int(fields[4], 16))),
+            'interface': fields[9],
+        })
+    return prefixes
+
+
+class NetworkMonitor:
+    """Keeps interface, address and IPv6 readiness state up to date in memory.
+
+    On Linux an rtnetlink socket reports link, address and route changes
+    as they happen and the state is rescanned once a burst of them settles.
+    Elsewhere the state is rescanned every ``POLL_INTERVAL`` seconds.
+    Readers only ever get the cached state. When readiness or Thread
+    prefixes change, listeners are called and a ``network_changed`` event
+    is published.
+    """
+
+    def __init__(self):
+        self._status = None
+        self._scanned_at = None
+        self._scan_lock = threading.Lock()
+        self._listeners = []
+        self._task = None
+        self._netlink = None
+        self._rescan = None
+
+    def add_listener(self, callback):
+        """Register ``callback(status, changes)``; returns a remover."""
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def status(self):
+        """The cached network status.
+
+        Without a running monitor, e.g. under the development server, the
+        state is rescanned once it is older than ``POLL_INTERVAL`` seconds.
+        """
+        if self._task is None and (
+            self._scanned_at is None or time.monotonic() - self._scanned_at > POLL_INTERVAL
+        ):
+            self.refresh()
+        return self._status
+
+    def refresh(self):
+        """Rescan the interfaces now and notify about changes; returns the status."""
+        with self._scan_lock:
+            interfaces = scan_interfaces()
+            addresses = [address for interface in interfaces.values() for address in interface['ipv6']]
+            scopes = {address['scope'] for address in addresses}
+            status = {
+                'ipv6': bool(addresses),
+                'link_local': 'link-local' in scopes,
+                'ula': 'ula' in scopes,
+                'global_ipv6': 'global' in scopes,
+                'thread_prefixes': scan_thread_prefixes(),
+                'interfaces': interfaces,
+                'change_feed': 'netlink' if self._netlink is not None else 'polling',
+                'updated_at': datetime.now().isoformat(),
+            }
+            previous, self._status = self._status, status
+            self._scanned_at = time.monotonic()
+
+        if previous is not None:
+            changes = {
+                key: status[key] for key in (*READINESS_KEYS, 'thread_prefixes')
+                if status[key] != previous[key]
+            }
+            if changes:
+                self._notify(status, changes)
+        return status
+
+    def _notify(self, status, changes):
+        if 'ipv6' in changes or 'link_local' in changes:
+            level = logger.info if status['link_local'] else logger.warning
+            level(f"IPv6 readiness changed: {changes}")
+        event_bus.publish('network_changed', {
+            'changes': changes,
+            **{key: status[key] for key in READINESS_KEYS},
+            'thread_prefixes': status['thread_prefixes'],
+        })
+        for listener in list(self._listeners):
+            try:
+                listener(status, changes)
+            except Exception as e:
+                logger.error(f"Error in network listener: {e}")
+
+    def start(self):
+        """Start watching for changes; safe to call from any thread."""
+        if not background_loop.in_loop_thread():
+            background_loop.loop.call_soon_threadsafe(self.start)
+            return
+        if self._task is not None:
+            return
+        self._netlink = self._open_netlink()
+        if self._netlink is not None:
+            asyncio.get_running_loop().add_reader(self._netlink.fileno(), self._on_netlink)
+        self.refresh()
+        self._task = asyncio.create_task(self._poll())
+        background_loop.on_shutdown(self.stop)
+        logger.info(f"Started network monitor using {self._status['change_feed']}")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        if self._netlink is not None:
+            asyncio.get_running_loop().remove_reader(self._netlink.fileno())
+            self._netlink.close()
+            self._netlink = None
+        if self._rescan is not None:
+            self._rescan.cancel()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def _open_netlink(self):
+        if not hasattr(socket, 'AF_NETLINK'):
+            return None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR | RTMGRP_IPV6_ROUTE))
+            sock.setblocking(False)
+            return sock
+        except OSError as e:
+            logger.info(f"rtnetlink not available, polling network state: {e}")
+            return None
+
+    def _on_netlink(self):
+        # The messages only say that something changed; the rescan finds out what
+        try:
+            while self._netlink.recv(65536):
+                pass
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            # Overflowing the socket buffer loses messages, a rescan covers them
+            logger.debug(f"rtnetlink read failed: {e}")
+        if self._rescan is None:
+            self._rescan = asyncio.get_running_loop().call_later(NETLINK_DEBOUNCE, self._rescan_now)
+
+    def _rescan_now(self):
+        self._rescan = None
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Failed to rescan network interfaces: {e}")
+
+    async def _poll(self):
+        interval = NETLINK_POLL_INTERVAL if self._netlink is not None else POLL_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            self._rescan_now()
+
+
+# Create a singleton instance
+network_monitor = NetworkMonitor()
@@ -1,9 +1,8 @@
 from flask import Blueprint, jsonify
 from ..logger import get_logger
-import socket
-import netifaces
-import asyncio
+from ..matter.client import MatterServerUnavailable
 from ..matter.protocol_manager import protocol_manager
+from .monitor import network_monitor
 
 network_blueprint = Blueprint('network', __name__)
 logger = get_logger(__name__)
@@ -12,16 +11,14 @@ logger = get_logger(__name__)
 def get_ipv6_status():
     """Get IPv6 status of the network."""
     try:
-        # Check if any interface has an IPv6 address
-        ipv6_enabled = False
-        for interface in netifaces.interfaces():
-            addrs = netifaces.ifaddresses(interface)
-            if netifaces.AF_INET6 in addrs:
-                ipv6_enabled = True
-                break
-
+        status = network_monitor.status()
+        ipv6_enabled = status['ipv6']
         return jsonify({
             'enabled': ipv6_enabled,
+            'link_local': status['link_local'],
+            'ula': status['ula'],
+            'global': status['global_ipv6'],
+            'thread_prefixes': status['thread_prefixes'],
             'message': 'IPv6 is enabled' if ipv6_enabled else 'IPv6 is not enabled'
         })
     except Exception as e:
@@ -31,6 +28,15 @@ def get_ipv6_status():
             'message': 'Failed to check IPv6 status'
         })
 
+@network_blueprint.route('/status', methods=['GET'])
+def get_network_status():
+    """Get the cached interface, address and IPv6 readiness state."""
+    try:
+        return jsonify(network_monitor.status())
+    except Exception as e:
+        logger.error(f"Error getting network status: {e}")
+        return jsonify({'error': 'Failed to get network status'}), 500
+
 @network_blueprint.route('/matter-routers', methods=['GET'])
 async def get_matter_routers():
     """Get Matter routers on the network."""
@@ -46,6 +52,8 @@ async def get_matter_routers():
             'routers': routers,
             'message': f'Found {len(routers)} Matter router(s)'
         })
+    except MatterServerUnavailable as e:
+        return jsonify({'routers': [], 'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error discovering Matter routers: {e}")
         return jsonify({
@@ -0,0 +1,74 @@
+"""Scene activation through Matter group casts with unicast fallback."""
+from ..groups.control import dispatch_commands
+
+
+def plan_group_casts(scene, groups, nodes):
+    """Split a scene into Matter group casts and the devices left for unicast.
+
+    ``nodes`` maps scene device IDs to Matter node IDs; devices missing from
+    it are left out. A group with a ``matter_group_id`` is cast to when every
+    member is part of the scene and either all members share one target
+    state, or the scene is stored on the devices as a Matter scene
+    (``matter_scene_id``), which a single RecallScene to the group restores.
+    Larger groups are tried first. Returns ``(casts, unicast_devices)`` where
+    each cast is ``(group, devices, command, params)`` and every device
+    carries its ``node_id``.
+    """
+    remaining = {
+        str(device['device_id']): {**device, 'node_id': nodes[str(device['device_id'])]}
+        for device in scene['devices'] if str(device['device_id']) in nodes
+    }
+    matter_scene_id = scene.get('matter_scene_id')
+    casts = []
+
+    candidates = [group for group in groups if group.get('matter_group_id') is not None]
+    for group in sorted(candidates, key=lambda g: len(g.get('devices', [])), reverse=True):
+        members = [str(member) for member in group.get('devices', [])]
+        if not members or not all(member in remaining for member in members):
+            continue
+
+        if matter_scene_id is not None:
+            command = 'recall_scene'
+            params = {'group_id': group['matter_group_id'], 'scene_id': matter_scene_id}
+        else:
+            states = [remaining[member]['state'] for member in members]
+            if any(state != states[0] for state in states):
+                continue
+            command, params = 'apply_state', states[0]
+
+        casts.append((group, [remaining.pop(member) for member in members], command, params))
+
+    return casts, list(remaining.values())
+
+
+def _apply_state(device):
+    return str(device['device_id']), device['node_id'], 'apply_state', device['state']
+
+
+async def apply_scene(scene, groups, nodes, concurrency, deadline):
+    """Apply a scene and return a per-device result report in scene order.
+
+    ``nodes`` maps scene device IDs to Matter node IDs; devices without one
+    are reported as failed with ``not_found``. Group casts and unicast
+    commands go out together; members of a group cast that failed are
+    retried by unicast within what is left of the deadline.
+    """
+    casts, unicast = plan_group_casts(scene, groups, nodes)
+    results = await dispatch_commands(
+        [
+            (group, command, params, [_apply_state(device) for device in devices])
+            for group, devices, command, params in casts
+        ],
+        [_apply_state(device) for device in unicast],
+        concurrency,
+        deadline
+    )
+
+    return [
+        {
+            'device_id': device['device_id'],
+            'node_id': nodes.get(str(device['device_id'])),
+            **results.get(str(device['device_id']), {'success': False, 'error': 'not_found'})
+        }
+        for device in scene['devices']
+    ]
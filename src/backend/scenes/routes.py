@@ -1,12 +1,25 @@
+import time
 from flask import Blueprint, jsonify, request, render_template
 from ..logger import get_logger
+from ..database.batch import apply_batch, batch_summary, parse_batch
 from ..database.database import initialize_db, get_table
+from ..database.listing import conditional, filter_documents, list_response
+from ..events.bus import event_bus
+from ..matter.client import MatterServerUnavailable
 from ..matter.protocol_manager import protocol_manager
+from ..groups.control import dispatch_limits, resolve_nodes
+from .activation import apply_scene
 
 scenes_blueprint = Blueprint('scenes', __name__)
 logger = get_logger(__name__)
 db = initialize_db()
 scenes_table = get_table(db, 'scenes')
+groups_table = get_table(db, 'groups')
+devices_table = get_table(db, 'devices')
+
+# Activation defaults, overridable per scene or per request
+SCENE_CONCURRENCY = 16
+SCENE_DEADLINE = 10.0
 
 @scenes_blueprint.route('/ui', methods=['GET'])
 def scenes_ui():
@@ -18,12 +31,52 @@ def get_scenes():
     """
     Get all scenes
     ---
+    parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        description: ETag of a previous response; answered with 304 if still current
+      - name: cursor
+        in: query
+        type: string
+        description: X-Next-Cursor header of the previous page
+      - name: limit
+        in: query
+        type: integer
+        description: Page size; without limit or cursor the whole list is returned
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated fields to return, id is always included
+      - name: name
+        in: query
+        type: string
+        description: Only scenes with this name
+      - name: device
+        in: query
+        type: string
+        description: Only scenes including this device
     responses:
       200:
         description: List of all scenes
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Cursor of the next page, absent on the last page
+          X-Total-Count:
+            type: integer
+            description: Number of items matching the filters
+      304:
+        description: Not modified since the ETag sent in If-None-Match
     """
-    scenes = scenes_table.all()
-    return jsonify(scenes)
+    def build():
+        if 'device' in request.args:
+            scenes = scenes_table.find_by_device(request.args['device'])
+        else:
+            scenes = scenes_table.all()
+        return list_response(filter_documents(scenes, ['name']))
+
+    return conditional(db.versions.etag(db.versions.table(scenes_table.name)), build)
 
 @scenes_blueprint.route('/<int:scene_id>', methods=['GET'])
 def get_scene(scene_id):
@@ -31,6 +84,10 @@ def get_scene(scene_id):
     Get a specific scene
     ---
     parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        description: ETag of a previous response; answered with 304 if still current
       - name: scene_id
         in: path
         type: integer
@@ -38,13 +95,16 @@ def get_scene(scene_id):
     responses:
       200:
         description: Scene details
+      304:
+        description: Not modified since the ETag sent in If-None-Match
       404:
         description: Scene not found
     """
+    etag = db.versions.etag(db.versions.document(scenes_table.name, scene_id))
     scene = scenes_table.get(doc_id=scene_id)
     if not scene:
         return jsonify({'error': 'Scene not found'}), 404
-    return jsonify(scene)
+    return conditional(etag, lambda: jsonify(scene))
 
 @scenes_blueprint.route('', methods=['POST'])
 def create_scene():
@@ -96,35 +156,79 @@ async def activate_scene(scene_id):
         in: path
         type: integer
         required: true
+      - name: options
+        in: body
+        required: false
+        schema:
+          type: object
+          properties:
+            concurrency:
+              type: integer
+              description: Maximum number of devices commanded at once
+            deadline:
+              type: number
+              description: Seconds after which unfinished devices are reported as failed
     responses:
       200:
-        description: Scene activated successfully
+        description: Scene activated, with a per-device result report saying whether each device was reached by group cast or unicast
+      400:
+        description: Invalid concurrency or deadline
       404:
         description: Scene not found
       500:
         description: Error activating scene
+      503:
+        description: Matter server unavailable
     """
     try:
         scene = scenes_table.get(doc_id=scene_id)
         if not scene:
             return jsonify({'error': 'Scene not found'}), 404
 
+        options = request.get_json(silent=True) or {}
+        try:
+            concurrency, deadline = dispatch_limits(
+                options,
+                scene.get('concurrency', SCENE_CONCURRENCY),
+                scene.get('deadline', SCENE_DEADLINE)
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         # Initialize Matter protocol if needed
         await protocol_manager.initialize()
 
-        # Apply scene state to each device
-        for device in scene['devices']:
-            try:
-                await protocol_manager.control_device(
-                    node_id=device['device_id'],
-                    command='apply_state',
-                    params=device['state']
-                )
-            except Exception as e:
-                logger.error(f"Error applying scene state to device {device['device_id']}: {e}")
-                continue
-
-        return jsonify({'message': 'Scene activated successfully'})
+        # Apply scene state through group casts where possible, unicast elsewhere
+        started = time.monotonic()
+        # Scenes store device IDs; commands go to the device's Matter node
+        nodes, missing = resolve_nodes(devices_table, [device['device_id'] for device in scene['devices']])
+        for device_id in missing:
+            logger.warning(f"Scene {scene_id} references device {device_id} with no Matter node")
+
+        groups = groups_table.search(lambda group: group.get('matter_group_id') is not None)
+        report = await apply_scene(scene, groups, nodes, concurrency=concurrency, deadline=deadline)
+        for result in report:
+            if not result['success']:
+                logger.error(f"Error applying scene state to device {result['device_id']}: {result['error']}")
+
+        failed = sum(1 for result in report if not result['success'])
+        duration_ms = round((time.monotonic() - started) * 1000, 1)
+        event_bus.publish('scene_activated', {
+            'scene_id': scene_id,
+            'name': scene.get('name'),
+            'succeeded': len(report) - failed,
+            'failed': failed,
+            'duration_ms': duration_ms
+        }, [result['node_id'] for result in report if result['node_id'] is not None])
+        return jsonify({
+            'message': 'Scene activated successfully' if not failed else f'Scene activated with {failed} failed device(s)',
+            'succeeded': len(report) - failed,
+            'failed': failed,
+            'duration_ms': duration_ms,
+            'devices': report
+        })
+    except MatterServerUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error activating scene: {e}")
         return jsonify({'error': 'Failed to activate scene'}), 500
@@ -192,4 +296,56 @@ def delete_scene(scene_id):
         return jsonify({'message': 'Scene deleted successfully'})
     except Exception as e:
         logger.error(f"Error deleting scene: {e}")
-        return jsonify({'error': 'Scene not found'}), 404
\ No newline at end of file
+        return jsonify({'error': 'Scene not found'}), 404
+
+def _validate_scene(op, data):
+    if op == 'create' and not all(k in data for k in ['name', 'devices']):
+        return 'Missing required fields'
+
+
+@scenes_blueprint.route('/batch', methods=['POST'])
+def batch_scenes():
+    """
+    Create, update and delete scenes in one batch
+    ---
+    description: >
+      Operations are applied in order within a single storage transaction and
+      persisted with one flush. Each item succeeds or fails on its own.
+    parameters:
+      - name: batch
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            operations:
+              type: array
+              items:
+                type: object
+                properties:
+                  op:
+                    type: string
+                    enum: [create, update, delete]
+                  id:
+                    type: integer
+                    description: Required for update and delete
+                  data:
+                    type: object
+                    description: The scene, as for the single-scene endpoints
+    responses:
+      200:
+        description: Per-operation results with an HTTP-like status each
+      400:
+        description: Malformed batch
+    """
+    try:
+        operations = parse_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        results = apply_batch(db, scenes_table, operations, validate=_validate_scene)
+        return jsonify(batch_summary(results))
+    except Exception as e:
+        logger.error(f"Error applying scene batch: {e}")
+        return jsonify({'error': 'Failed to apply batch'}), 500
@@ -1,20 +1,41 @@
 """Scene Manager for handling Matter scene configurations and virtual devices."""
+import atexit
 import json
+import os
+import threading
 from pathlib import Path
+from ..database.storage import write_atomic
 from ..logger import get_logger
 import uuid
 
 logger = get_logger(__name__)
 
+SAVE_DELAY = 0.5
+
 class SceneManager:
-    def __init__(self):
+    """Scenes and their virtual devices, kept in memory and indexed.
+
+    ``scenes.json`` is parsed once and only re-read when its mtime or inode
+    changes, i.e. when something else replaced it. Changes are written back
+    atomically after ``save_delay`` seconds so bursts of edits cost one write.
+    """
+
+    def __init__(self, save_delay=SAVE_DELAY):
         self.scenes_dir = Path.home() / '.matter-maestro' / 'scenes'
         self.scenes_dir.mkdir(parents=True, exist_ok=True)
         self.scenes_file = self.scenes_dir / 'scenes.json'
-        
+        self.save_delay = save_delay
+
+        self._lock = threading.RLock()
+        self._data = None
+        self._file_id = None
+        self._virtual_devices = {}
+        self._save_timer = None
+        atexit.register(self.flush)
+
         if not self.scenes_file.exists():
             self._initialize_scenes()
-    
+
     def _initialize_scenes(self):
         """Initialize empty scenes file."""
         default_scenes = {
@@ -22,48 +43,104 @@ class SceneManager:
             'virtual_devices': {}
         }
         self.save_scenes(default_scenes)
+        self.flush()
         logger.info("Initialized new scenes configuration")
-    
-    def save_scenes(self, scenes_data):
-        """Save scenes to file."""
+
+    def locked(self):
+        """Context manager keeping the scenes from changing while held."""
+        return self._lock
+
+    def _stat(self):
         try:
-            with open(self.scenes_file, 'w') as f:
-                json.dump(scenes_data, f, indent=2)
+            stat = os.stat(self.scenes_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    def _index(self):
+        """Rebuild the virtual device ID -> scene ID index."""
+        self._virtual_devices = {
+            device['id']: scene_id
+            for scene_id, device in self._data['virtual_devices'].items()
+        }
+
+    def _schedule_save(self):
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self._save_in_background)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save_in_background(self):
+        try:
+            self.flush()
         except Exception as e:
             logger.error(f"Failed to save scenes: {e}")
-            raise
+
+    def flush(self):
+        """Write pending changes to disk now."""
+        with self._lock:
+            if self._save_timer is None:
+                return
+            self._save_timer.cancel()
+            self._save_timer = None
+            try:
+                write_atomic(self.scenes_file, json.dumps(self._data))
+            except Exception:
+                self._schedule_save()  # Retry later
+                raise
+            self._file_id = self._stat()
+
+    def save_scenes(self, scenes_data):
+        """Replace the scenes and schedule them to be written to file."""
+        with self._lock:
+            self._data = scenes_data
+            self._index()
+            self._schedule_save()
 
     def load_scenes(self):
-        """Load scenes from file."""
-        try:
-            with open(self.scenes_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load scenes: {e}")
-            raise
+        """Scenes data, re-read from file only if it changed on disk."""
+        with self._lock:
+            if self._save_timer is not None:
+                return self._data  # Unsaved changes are newer than the file
+
+            file_id = self._stat()
+            if self._data is not None and file_id == self._file_id:
+                return self._data
+
+            try:
+                with open(self.scenes_file, 'r') as f:
+                    self._data = json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load scenes: {e}")
+                raise
+            self._file_id = file_id
+            self._index()
+            logger.debug(f"Loaded {len(self._data['scenes'])} scenes from {self.scenes_file}")
+            return self._data
 
     def create_scene(self, name, devices):
         """Create a new scene with specified device states."""
         try:
-            scenes_data = self.load_scenes()
-            scene_id = str(uuid.uuid4())
-            
-            scenes_data['scenes'][scene_id] = {
-                'id': scene_id,
-                'name': name,
-                'devices': devices,
-                'virtual_device_id': str(uuid.uuid4())  # Generate virtual device ID
-            }
-            
-            # Create corresponding virtual device
-            scenes_data['virtual_devices'][scene_id] = {
-                'id': scenes_data['scenes'][scene_id]['virtual_device_id'],
-                'type': 'switch',
-                'name': f"Scene: {name}",
-                'scene_id': scene_id
-            }
-            
-            self.save_scenes(scenes_data)
+            with self._lock:
+                scenes_data = self.load_scenes()
+                scene_id = str(uuid.uuid4())
+
+                scenes_data['scenes'][scene_id] = {
+                    'id': scene_id,
+                    'name': name,
+                    'devices': devices,
+                    'virtual_device_id': str(uuid.uuid4())  # Generate virtual device ID
+                }
+
+                # Create corresponding virtual device
+                scenes_data['virtual_devices'][scene_id] = {
+                    'id': scenes_data['scenes'][scene_id]['virtual_device_id'],
+                    'type': 'switch',
+                    'name': f"Scene: {name}",
+                    'scene_id': scene_id
+                }
+
+                self.save_scenes(scenes_data)
             logger.info(f"Created new scene: {name} with ID: {scene_id}")
             return scene_id
         except Exception as e:
@@ -73,8 +150,8 @@ class SceneManager:
     def get_scene(self, scene_id):
         """Get scene by ID."""
         try:
-            scenes_data = self.load_scenes()
-            return scenes_data['scenes'].get(scene_id)
+            scene = self.load_scenes()['scenes'].get(scene_id)
+            return dict(scene) if scene else None
         except Exception as e:
             logger.error(f"Failed to get scene {scene_id}: {e}")
             return None
@@ -82,8 +159,8 @@ class SceneManager:
     def get_all_scenes(self):
         """Get all scenes."""
         try:
-            scenes_data = self.load_scenes()
-            return list(scenes_data['scenes'].values())
+            with self._lock:
+                return [dict(scene) for scene in self.load_scenes()['scenes'].values()]
         except Exception as e:
             logger.error(f"Failed to get scenes: {e}")
             return []
@@ -91,19 +168,24 @@ class SceneManager:
     def update_scene(self, scene_id, name, devices):
         """Update an existing scene."""
         try:
-            scenes_data = self.load_scenes()
-            if scene_id not in scenes_data['scenes']:
-                return False
-            
-            scenes_data['scenes'][scene_id].update({
-                'name': name,
-                'devices': devices
-            })
-            
-            # Update virtual device name
-            scenes_data['virtual_devices'][scene_id]['name'] = f"Scene: {name}"
-            
-            self.save_scenes(scenes_data)
+            with self._lock:
+                scenes_data = self.load_scenes()
+                if scene_id not in scenes_data['scenes']:
+                    return False
+
+                scenes_data['scenes'][scene_id] = {
+                    **scenes_data['scenes'][scene_id],
+                    'name': name,
+                    'devices': devices
+                }
+
+                # Update virtual device name
+                scenes_data['virtual_devices'][scene_id] = {
+                    **scenes_data['virtual_devices'][scene_id],
+                    'name': f"Scene: {name}"
+                }
+
+                self.save_scenes(scenes_data)
             logger.info(f"Updated scene: {scene_id}")
             return True
         except Exception as e:
@@ -113,15 +195,16 @@ class SceneManager:
     def delete_scene(self, scene_id):
         """Delete a scene and its virtual device."""
         try:
-            scenes_data = self.load_scenes()
-            if scene_id not in scenes_data['scenes']:
-                return False
-            
-            # Remove both scene and its virtual device
-            del scenes_data['scenes'][scene_id]
-            del scenes_data['virtual_devices'][scene_id]
-            
-            self.save_scenes(scenes_data)
+            with self._lock:
+                scenes_data = self.load_scenes()
+                if scene_id not in scenes_data['scenes']:
+                    return False
+
+                # Remove both scene and its virtual device
+                del scenes_data['scenes'][scene_id]
+                del scenes_data['virtual_devices'][scene_id]
+
+                self.save_scenes(scenes_data)
             logger.info(f"Deleted scene: {scene_id}")
             return True
         except Exception as e:
@@ -131,11 +214,26 @@ class SceneManager:
     def get_virtual_device(self, device_id):
         """Get virtual device by ID."""
         try:
-            scenes_data = self.load_scenes()
-            for device in scenes_data['virtual_devices'].values():
-                if device['id'] == device_id:
-                    return device
-            return None
+            with self._lock:
+                scenes_data = self.load_scenes()
+                scene_id = self._virtual_devices.get(device_id)
+                if scene_id is None:
+                    return None
+                return dict(scenes_data['virtual_devices'][scene_id])
         except Exception as e:
             logger.error(f"Failed to get virtual device {device_id}: {e}")
             return None
+
+    def get_scene_for_virtual_device(self, device_id):
+        """Get the scene a virtual device triggers."""
+        try:
+            with self._lock:
+                self.load_scenes()
+                scene_id = self._virtual_devices.get(device_id)
+            return self.get_scene(scene_id) if scene_id else None
+        except Exception as e:
+            logger.error(f"Failed to get scene for virtual device {device_id}: {e}")
+            return None
+
+# Create a singleton instance
+scene_manager = SceneManager()
@@ -0,0 +1,300 @@
+"""Event-driven propagation of device state across virtual circuits."""
+import asyncio
+import threading
+import time
+from ..database.database import initialize_db, get_table
+from ..event_loop import background_loop
+from ..events.bus import event_bus
+from ..logger import get_logger
+from ..matter.node_cache import parse_path
+from ..matter.protocol_manager import protocol_manager
+
+logger = get_logger(__name__)
+
+COALESCE_WINDOW = 0.15
+ECHO_TTL = 3.0
+PROPAGATION_DEADLINE = 5.0
+
+# State keys each circuit type carries from one device to the others
+CIRCUIT_STATE_KEYS = {
+    'switch': ('on',),
+    'dimmer': ('on', 'brightness'),
+    'color': ('hue', 'saturation', 'value'),
+}
+
+# State keys a reported attribute (cluster, attribute) can change
+ATTRIBUTE_STATE_KEYS = {
+    (6, 0): ('on',),
+    (8, 0): ('brightness', 'value'),
+    (768, 0): ('hue',),
+    (768, 1): ('saturation',),
+}
+
+# Rounding between the app's ranges and Matter's 0..254 is not lossless
+STATE_TOLERANCE = 2
+
+
+def circuit_state(circuit_type, node_state):
+    """The part of a node's state that a circuit of ``circuit_type`` propagates."""
+    state = dict(node_state)
+    if 'brightness' in state:
+        state.setdefault('value', state['brightness'])
+    return {key: state[key] for key in CIRCUIT_STATE_KEYS[circuit_type] if key in state}
+
+
+def _matches(expected, actual):
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return expected == actual
+    return abs(expected - actual) <= STATE_TOLERANCE
+
+
+class CircuitPropagator:
+    """Carries state changes from one circuit device to the others.
+
+    Attribute reports from matter-server are turned into circuit triggers.
+    Per circuit, the first change goes out immediately and further changes
+    within ``window`` seconds are coalesced so only the latest is sent, which
+    keeps dimmer drags to a few commands per second. Values this propagator
+    wrote are remembered for ``echo_ttl`` seconds and reports matching them
+    are ignored, so a target device's confirmation never bounces back.
+
+    Devices are matched to nodes through an index of the devices table.
+    It is built off the event loop when the propagator starts and then kept
+    current by storage change notifications on the writing thread, so
+    attribute reports never read the table.
+
+    Everything except ``start``, ``submit`` and the storage listener runs
+    on the shared event loop.
+    """
+
+    def __init__(self, manager, window=COALESCE_WINDOW, echo_ttl=ECHO_TTL):
+        self.manager = manager
+        self.window = window
+        self.echo_ttl = echo_ttl
+        self._pending = {}
+        self._timers = {}
+        self._running = {}
+        self._expected = {}
+        self._remove_listener = None
+        self._devices_table = None
+        # Device ID -> node ID, and node ID -> device IDs, of the devices table.
+        # Written under the lock on the writing thread; lists are replaced, not changed.
+        self._device_nodes = {}
+        self._node_devices = {}
+        self._index_lock = threading.Lock()
+
+    def start(self):
+        """Start consuming matter-server attribute events; safe to call from any thread.
+
+        On the event loop the node index is built on an executor thread,
+        elsewhere right away.
+        """
+        if self._remove_listener is not None:
+            return
+        self._remove_listener = protocol_manager.add_listener(self.handle_event)
+        background_loop.on_shutdown(self.shutdown)
+        if background_loop.in_loop_thread():
+            asyncio.get_running_loop().run_in_executor(None, self._build_index)
+        else:
+            self._build_index()
+
+    async def shutdown(self):
+        """Drop queued changes and wait for in-flight propagations."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pending.clear()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    @property
+    def devices_table(self):
+        if self._devices_table is None:
+            self._devices_table = get_table(initialize_db(), 'devices')
+        return self._devices_table
+
+    def _build_index(self):
+        db = initialize_db()
+        try:
+            # No write can land between reading the table and listening for changes
+            with db.transaction():
+                db.versions.add_listener(self._on_storage_change)
+                self._rebuild_index()
+        except Exception as e:
+            logger.error(f"Failed to index circuit devices: {e}")
+
+    def _rebuild_index(self):
+        device_nodes = {
+            str(device.doc_id): device['node_id'] for device in self.devices_table.all()
+            if device.get('node_id') is not None
+        }
+        node_devices = {}
+        for device_id, node_id in device_nodes.items():
+            node_devices.setdefault(str(node_id), []).append(device_id)
+        with self._index_lock:
+            self._device_nodes = device_nodes
+            self._node_devices = node_devices
+
+    def _on_storage_change(self, table_name, doc_ids):
+        # Called on the writing thread, which still holds the storage
+        if table_name != 'devices':
+            return
+        if doc_ids is None:
+            self._rebuild_index()
+            return
+
+        for doc_id in doc_ids:
+            device = self.devices_table.get(doc_id=int(doc_id))
+            self._set_node(str(doc_id), device.get('node_id') if device else None)
+
+    def _set_node(self, device_id, node_id):
+        with self._index_lock:
+            previous = self._device_nodes.pop(device_id, None)
+            if previous is not None:
+                devices = [other for other in self._node_devices.get(str(previous), []) if other != device_id]
+                if devices:
+                    self._node_devices[str(previous)] = devices
+                else:
+                    self._node_devices.pop(str(previous), None)
+            if node_id is not None:
+                self._device_nodes[device_id] = node_id
+                self._node_devices[str(node_id)] = [*self._node_devices.get(str(node_id), []), device_id]
+
+    def _device_ids(self, node_id):
+        """IDs of the device documents of a node."""
+        return self._node_devices.get(str(node_id), [])
+
+    def _node_id(self, device_id):
+        """Node ID of a device, or None if it has no device document or node."""
+        return self._device_nodes.get(str(device_id))
+
+    def handle_event(self, event, data):
+        """Trigger the circuits of a device whose light state was reported."""
+        if event != 'attribute_updated' or not self.manager.device_mappings:
+            return
+        node_id, path, _ = data
+        _, cluster, attribute = parse_path(path)
+        changed = ATTRIBUTE_STATE_KEYS.get((cluster, attribute))
+        if changed is None:
+            return
+
+        node_state = protocol_manager.node_cache.get_state(node_id)
+        if not node_state:
+            return
+
+        for device_id in self._device_ids(node_id):
+            circuit_ids = self.manager.circuits_for_device(device_id)
+            if not circuit_ids or self._is_echo(device_id, changed, node_state):
+                continue
+            for circuit_id in circuit_ids:
+                circuit = self.manager.get_circuit(circuit_id)
+                state = circuit_state(circuit['type'], node_state)
+                try:
+                    self.manager.validate_state(circuit['type'], state)
+                except ValueError:
+                    continue
+                self._enqueue(circuit_id, device_id, state)
+
+    def _expect(self, device_id, state, expires):
+        expected = self._expected.setdefault(device_id, {})
+        for key, value in state.items():
+            expected.setdefault(key, []).append((value, expires))
+
+    def _is_echo(self, device_id, changed, node_state):
+        """Whether the reported values are ones this propagator recently wrote."""
+        expected = self._expected.get(device_id)
+        if not expected:
+            return False
+
+        now = time.monotonic()
+        echo = False
+        for key in changed:
+            live = [(value, expires) for value, expires in expected.get(key, ()) if expires > now]
+            if live:
+                expected[key] = live
+            else:
+                expected.pop(key, None)
+            if key in node_state and any(_matches(value, node_state[key]) for value, _ in live):
+                echo = True
+        if not expected:
+            del self._expected[device_id]
+        return echo
+
+    def submit(self, circuit_id, source_device_id, state):
+        """Queue a circuit change; safe to call from any thread."""
+        if not background_loop.in_loop_thread():
+            background_loop.loop.call_soon_threadsafe(
+                self._enqueue, circuit_id, str(source_device_id), state
+            )
+            return
+        self._enqueue(circuit_id, str(source_device_id), state)
+
+    def _enqueue(self, circuit_id, source_device_id, state):
+        # Last value wins until the circuit's window ends
+        self._pending[circuit_id] = (source_device_id, state)
+        if circuit_id not in self._timers:
+            self._flush(circuit_id)
+
+    def _flush(self, circuit_id):
+        self._timers.pop(circuit_id, None)
+        if circuit_id not in self._pending:
+            return
+
+        loop = asyncio.get_running_loop()
+        running = self._running.get(circuit_id)
+        if running is None or running.done():
+            source_device_id, state = self._pending.pop(circuit_id)
+            task = loop.create_task(self._propagate(circuit_id, source_device_id, state))
+            self._running[circuit_id] = task
+            task.add_done_callback(lambda task: self._finished(circuit_id, task))
+        # Keep the window open; a still running propagation holds back the next one
+        self._timers[circuit_id] = loop.call_later(self.window, self._flush, circuit_id)
+
+    def _finished(self, circuit_id, task):
+        if self._running.get(circuit_id) is task:
+            del self._running[circuit_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error propagating circuit {circuit_id}: {task.exception()}")
+
+    async def _propagate(self, circuit_id, source_device_id, state):
+        circuit = self.manager.get_circuit(circuit_id)
+        if not circuit:
+            return
+
+        targets = []
+        for device in circuit.get('devices', []):
+            device_id = str(device.get('device_id'))
+            if device_id != source_device_id and device_id not in targets:
+                targets.append(device_id)
+        if not targets:
+            return
+
+        nodes = {device_id: self._node_id(device_id) for device_id in targets}
+        reachable = [device_id for device_id in targets if nodes[device_id] is not None]
+        failed = [device_id for device_id in targets if nodes[device_id] is None]
+        if failed:
+            logger.warning(f"Circuit {circuit_id} references devices {failed} with no Matter node")
+
+        expires = time.monotonic() + self.echo_ttl
+        for device_id in reachable:
+            self._expect(device_id, state, expires)
+
+        started = time.monotonic()
+        node_ids = [nodes[device_id] for device_id in reachable]
+        results = await protocol_manager.control_devices(
+            [(node_id, 'apply_state', state) for node_id in node_ids],
+            deadline=PROPAGATION_DEADLINE
+        )
+        failed += [device_id for device_id, result in zip(reachable, results) if not result['success']]
+        duration_ms = round((time.monotonic() - started) * 1000, 1)
+        event_bus.publish('circuit_propagated', {
+            'circuit_id': circuit_id,
+            'source_device_id': source_device_id,
+            'state': state,
+            'targets': targets,
+            'failed': failed,
+            'duration_ms': duration_ms
+        }, [node_id for node_id in (self._node_id(source_device_id), *node_ids) if node_id is not None])
+        if failed:
+            logger.warning(f"Circuit {circuit_id} could not update devices {failed}")
+        logger.info(f"Propagated circuit {circuit_id} from device {source_device_id} "
+                    f"to {len(targets) - len(failed)}/{len(targets)} devices in {duration_ms}ms")
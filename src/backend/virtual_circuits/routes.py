@@ -1,6 +1,10 @@
 from flask import Blueprint, jsonify, request, render_template
+from ..backup.manager import backup_manager
 from ..logger import get_logger
+from ..database.batch import apply_batch, batch_summary, parse_batch
 from ..database.database import initialize_db, get_table
+from ..database.listing import conditional, filter_documents, list_response
+from .propagation import CircuitPropagator
 from .virtual_manager import VirtualCircuitManager
 
 virtual_circuits_blueprint = Blueprint('virtual_circuits', __name__)
@@ -8,6 +12,10 @@ logger = get_logger(__name__)
 db = initialize_db()
 circuits_table = get_table(db, 'virtual_circuits')
 circuit_manager = VirtualCircuitManager()
+circuit_manager.load_circuits(circuits_table.all())
+backup_manager.add_restore_listener(lambda: circuit_manager.load_circuits(circuits_table.all()))
+circuit_manager.propagator = CircuitPropagator(circuit_manager)
+circuit_manager.propagator.start()
 
 @virtual_circuits_blueprint.route('/ui', methods=['GET'])
 def virtual_circuits_ui():
@@ -21,9 +29,41 @@ def get_circuits():
     """
     Get all virtual circuits
     ---
+    parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        description: ETag of a previous response; answered with 304 if still current
+      - name: cursor
+        in: query
+        type: string
+        description: X-Next-Cursor header of the previous page
+      - name: limit
+        in: query
+        type: integer
+        description: Page size; without limit or cursor the whole list is returned
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated fields to return, id is always included
+      - name: type
+        in: query
+        type: string
+        description: Only circuits of this type
+      - name: device
+        in: query
+        type: string
+        description: Only circuits including this device
     responses:
       200:
         description: List of all virtual circuits
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Cursor of the next page, absent on the last page
+          X-Total-Count:
+            type: integer
+            description: Number of items matching the filters
         schema:
           type: array
           items:
@@ -45,9 +85,17 @@ def get_circuits():
                       type: integer
                     role:
                       type: string
+      304:
+        description: Not modified since the ETag sent in If-None-Match
     """
-    circuits = circuits_table.all()
-    return jsonify(circuits)
+    def build():
+        if 'device' in request.args:
+            circuits = circuits_table.find_by_device(request.args['device'])
+        else:
+            circuits = circuits_table.all()
+        return list_response(filter_documents(circuits, ['name', 'type']))
+
+    return conditional(db.versions.etag(db.versions.table(circuits_table.name)), build)
 
 @virtual_circuits_blueprint.route('', methods=['POST'])
 def create_circuit():
@@ -90,12 +138,12 @@ def create_circuit():
         if data['type'] not in ['switch', 'dimmer', 'color']:
             return jsonify({'error': 'Invalid circuit type'}), 400
 
-        # Register with virtual circuit manager
-        circuit_data = circuit_manager.register_circuit(data)
+        # Save to database, the document ID becomes the circuit ID
+        circuit_id = circuits_table.insert(data)
 
-        # Save to database
-        circuit_id = circuits_table.insert(circuit_data)
-        return jsonify({'id': circuit_id, **circuit_data}), 201
+        # Register with virtual circuit manager
+        circuit_data = circuit_manager.register_circuit({**data, 'id': circuit_id})
+        return jsonify(circuit_data), 201
     except Exception as e:
         logger.error(f"Error creating virtual circuit: {e}")
         return jsonify({'error': str(e)}), 500
@@ -106,6 +154,10 @@ def get_circuit(circuit_id):
     Get a specific virtual circuit
     ---
     parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        description: ETag of a previous response; answered with 304 if still current
       - name: circuit_id
         in: path
         type: integer
@@ -113,14 +165,17 @@ def get_circuit(circuit_id):
     responses:
       200:
         description: Circuit details
+      304:
+        description: Not modified since the ETag sent in If-None-Match
       404:
         description: Circuit not found
     """
     try:
+        etag = db.versions.etag(db.versions.document(circuits_table.name, circuit_id))
         circuit = circuit_manager.get_circuit(circuit_id)
         if not circuit:
             return jsonify({'error': 'Circuit not found'}), 404
-        return jsonify(circuit)
+        return conditional(etag, lambda: jsonify(circuit))
     except Exception as e:
         logger.error(f"Error getting circuit: {e}")
         return jsonify({'error': 'Circuit not found'}), 404
@@ -212,4 +267,107 @@ def trigger_circuit(circuit_id):
         return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error triggering circuit: {e}")
-        return jsonify({'error': 'Failed to trigger circuit'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to trigger circuit'}), 500
+
+@virtual_circuits_blueprint.route('/devices/<device_id>/trigger', methods=['POST'])
+def trigger_device_circuits(device_id):
+    """
+    Propagate a device state change to every circuit containing the device
+    ---
+    parameters:
+      - name: device_id
+        in: path
+        type: string
+        required: true
+      - name: trigger
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            state:
+              type: object
+    responses:
+      200:
+        description: IDs of the circuits that were triggered
+      400:
+        description: Missing state
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data.get('state'), dict):
+            return jsonify({'error': 'State is required'}), 400
+
+        triggered = circuit_manager.trigger_by_device(device_id, data['state'])
+        return jsonify({'triggered': triggered})
+    except Exception as e:
+        logger.error(f"Error triggering circuits for device {device_id}: {e}")
+        return jsonify({'error': 'Failed to trigger circuits'}), 500
+
+def _validate_circuit(op, data):
+    if op == 'create' and not all(k in data for k in ['name', 'type', 'devices']):
+        return 'Missing required fields'
+    if 'type' in data and data['type'] not in ['switch', 'dimmer', 'color']:
+        return 'Invalid circuit type'
+
+
+@virtual_circuits_blueprint.route('/batch', methods=['POST'])
+def batch_circuits():
+    """
+    Create, update and delete virtual circuits in one batch
+    ---
+    description: >
+      Operations are applied in order within a single storage transaction and
+      persisted with one flush. Each item succeeds or fails on its own.
+    parameters:
+      - name: batch
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            operations:
+              type: array
+              items:
+                type: object
+                properties:
+                  op:
+                    type: string
+                    enum: [create, update, delete]
+                  id:
+                    type: integer
+                    description: Required for update and delete
+                  data:
+                    type: object
+                    description: The circuit, as for the single-circuit endpoints
+    responses:
+      200:
+        description: Per-operation results with an HTTP-like status each
+      400:
+        description: Malformed batch
+    """
+    try:
+        operations = parse_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        results = apply_batch(db, circuits_table, operations, validate=_validate_circuit)
+
+        # Keep the circuit manager in step with what was stored
+        for result in results:
+            if result['status'] >= 400:
+                continue
+            try:
+                if result['op'] == 'delete':
+                    if circuit_manager.get_circuit(result['id']):
+                        circuit_manager.delete_circuit(result['id'])
+                else:
+                    circuit_manager.register_circuit({**circuits_table.get(doc_id=result['id']), 'id': result['id']})
+            except Exception as e:
+                logger.error(f"Error registering circuit {result['id']} from batch: {e}")
+                result.update({'status': 500, 'error': f'Stored but not registered: {e}'})
+        return jsonify(batch_summary(results))
+    except Exception as e:
+        logger.error(f"Error applying circuit batch: {e}")
+        return jsonify({'error': 'Failed to apply batch'}), 500
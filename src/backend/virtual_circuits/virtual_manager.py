@@ -6,9 +6,30 @@ class VirtualCircuitManager:
     def __init__(self):
         self.circuits = {}
         self.device_mappings = {}
+        self.propagator = None
+
+    def load_circuits(self, circuits):
+        """Replace every circuit with the stored ones, e.g. at startup.
+
+        ``circuits`` are documents from the ``virtual_circuits`` table; their
+        document ID is the circuit ID.
+        """
+        self.circuits = {}
+        self.device_mappings = {}
+        for circuit in circuits:
+            try:
+                self._add_circuit({**circuit, 'id': circuit.doc_id})
+            except ValueError as e:
+                logger.error(f"Skipping stored circuit {circuit.doc_id}: {e}")
+        logger.info(f"Loaded {len(self.circuits)} virtual circuits")
 
     def register_circuit(self, circuit_data):
         """Register a new virtual circuit."""
+        circuit = self._add_circuit(circuit_data)
+        logger.info(f"Registered virtual circuit: {circuit['id']} ({circuit['type']})")
+        return circuit
+
+    def _add_circuit(self, circuit_data):
         circuit_id = circuit_data.get('id')
         circuit_type = circuit_data.get('type', 'switch')  # Default to switch type
 
@@ -16,6 +37,9 @@ class VirtualCircuitManager:
         if circuit_type not in ['switch', 'dimmer', 'color']:
             raise ValueError(f"Invalid circuit type: {circuit_type}")
 
+        if circuit_id in self.circuits:
+            self.delete_circuit(circuit_id)
+
         self.circuits[circuit_id] = {
             **circuit_data,
             'type': circuit_type,
@@ -23,15 +47,18 @@ class VirtualCircuitManager:
         }
 
         # Map devices to circuits for quick lookup
-        for device in circuit_data.get('devices', []):
-            device_id = device.get('device_id')
-            if device_id not in self.device_mappings:
-                self.device_mappings[device_id] = []
-            self.device_mappings[device_id].append(circuit_id)
+        for device_id in self._device_ids(self.circuits[circuit_id]):
+            circuits = self.device_mappings.setdefault(device_id, [])
+            if circuit_id not in circuits:
+                circuits.append(circuit_id)
 
-        logger.info(f"Registered virtual circuit: {circuit_id} ({circuit_type})")
         return self.circuits[circuit_id]
 
+    @staticmethod
+    def _device_ids(circuit):
+        """Device IDs of a circuit as strings, whatever type they were stored as."""
+        return [str(device.get('device_id')) for device in circuit.get('devices', [])]
+
     def get_circuit(self, circuit_id):
         """Get circuit details by ID."""
         return self.circuits.get(circuit_id)
@@ -43,17 +70,29 @@ class VirtualCircuitManager:
 
         # Remove device mappings
         circuit = self.circuits[circuit_id]
-        for device in circuit.get('devices', []):
-            device_id = device.get('device_id')
-            if device_id in self.device_mappings:
-                self.device_mappings[device_id].remove(circuit_id)
-                if not self.device_mappings[device_id]:
+        for device_id in self._device_ids(circuit):
+            circuits = self.device_mappings.get(device_id)
+            if circuits and circuit_id in circuits:
+                circuits.remove(circuit_id)
+                if not circuits:
                     del self.device_mappings[device_id]
 
         # Remove circuit
         del self.circuits[circuit_id]
         logger.info(f"Deleted virtual circuit: {circuit_id}")
 
+    @staticmethod
+    def validate_state(circuit_type, state):
+        """Raise ``ValueError`` if ``state`` does not fit the circuit type."""
+        if not isinstance(state, dict):
+            raise ValueError("State must be an object")
+        if circuit_type == 'switch' and not isinstance(state.get('on'), bool):
+            raise ValueError("Switch state must include boolean 'on' value")
+        elif circuit_type == 'dimmer' and not isinstance(state.get('brightness'), (int, float)):
+            raise ValueError("Dimmer state must include 'brightness' value")
+        elif circuit_type == 'color' and not all(k in state for k in ['hue', 'saturation', 'value']):
+            raise ValueError("Color state must include 'hue', 'saturation', and 'value'")
+
     def trigger_circuit(self, circuit_id, trigger_data):
         """Trigger a virtual circuit and update linked devices."""
         try:
@@ -65,26 +104,38 @@ class VirtualCircuitManager:
             new_state = trigger_data.get('state')
             circuit_type = circuit.get('type', 'switch')
 
-            # Validate state based on circuit type
-            if circuit_type == 'switch' and not isinstance(new_state.get('on'), bool):
-                raise ValueError("Switch state must include boolean 'on' value")
-            elif circuit_type == 'dimmer' and not isinstance(new_state.get('brightness'), (int, float)):
-                raise ValueError("Dimmer state must include 'brightness' value")
-            elif circuit_type == 'color' and not all(k in new_state for k in ['hue', 'saturation', 'value']):
-                raise ValueError("Color state must include 'hue', 'saturation', and 'value'")
+            self.validate_state(circuit_type, new_state)
 
-            # Update state for all linked devices
-            for device in circuit.get('devices', []):
-                if device.get('device_id') != trigger_device:
-                    self._update_device_state(device.get('device_id'), new_state, circuit_type)
+            # Hand the change to the propagator, which updates every other linked device
+            if self.propagator is None:
+                logger.warning(f"No propagator attached, circuit {circuit_id} change not sent")
+            else:
+                self.propagator.submit(circuit_id, trigger_device, new_state)
 
             logger.info(f"Triggered circuit {circuit_id} ({circuit_type}) from device {trigger_device}")
         except Exception as e:
             logger.error(f"Error triggering circuit: {e}")
             raise
 
-    def _update_device_state(self, device_id, state, circuit_type):
-        """Update the state of a device based on circuit type."""
-        logger.info(f"Updating device {device_id} state to {state} (type: {circuit_type})")
-        # TODO: Implement actual Matter device state update based on circuit type
-        pass
\ No newline at end of file
+    def circuits_for_device(self, device_id):
+        """IDs of the circuits a device belongs to."""
+        return list(self.device_mappings.get(str(device_id), ()))
+
+    def trigger_by_device(self, device_id, state):
+        """Propagate a device's new state to every circuit it belongs to.
+
+        Circuits are found through ``device_mappings``, so the cost depends
+        only on how many circuits the device is part of. Circuits whose type
+        does not match the state (e.g. an on/off report for a dimmer circuit)
+        are skipped. Returns the IDs of the circuits that were triggered.
+        """
+        triggered = []
+        for circuit_id in self.circuits_for_device(device_id):
+            try:
+                self.validate_state(self.circuits[circuit_id]['type'], state)
+            except ValueError as e:
+                logger.debug(f"Not triggering circuit {circuit_id} from device {device_id}: {e}")
+                continue
+            self.trigger_circuit(circuit_id, {'device_id': device_id, 'state': state})
+            triggered.append(circuit_id)
+        return triggered
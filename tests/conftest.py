@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+# The backend opens its database in the user data directory on import
+_data_home = tempfile.mkdtemp(prefix='matter-maestro-tests-')
+os.environ['HOME'] = _data_home
+os.environ['XDG_DATA_HOME'] = os.path.join(_data_home, 'data')
+
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def shutdown():
+    """Flush the database and stop the event loop while output is still captured."""
+    yield
+    from backend.database.database import close_db
+    from backend.event_loop import background_loop
+    close_db()
+    background_loop.stop()
+
+
+@pytest.fixture
+def app():
+    from backend.app import app
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def memory_backups():
+    """The backup manager writing to a fresh in-memory store."""
+    from backend.backup.manager import backup_manager
+    from backend.backup.store import MemoryStore
+    config = dict(backup_manager.get_config())
+    backup_manager.memory_store = MemoryStore()
+    backup_manager.update_config({'service': 'memory', 'backup_enabled': True})
+    yield backup_manager
+    backup_manager.update_config(config)
@@ -0,0 +1,109 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from backend.asgi import MAX_MEMORY_BODY, _WsgiRequest, _build_environ
+
+
+def http_scope(method='GET', path='/', query=b'', headers=()):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'path': path,
+        'root_path': '',
+        'query_string': query,
+        'headers': list(headers),
+        'server': ('testserver', 8000),
+        'client': ('10.0.0.2', 51000),
+    }
+
+
+def call(wsgi_app, scope, chunks=(b'',)):
+    """Run one request through the adapter; returns the messages sent to the server."""
+    chunks = list(chunks)
+    messages = [
+        {'type': 'http.request', 'body': chunk, 'more_body': index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            await _WsgiRequest(wsgi_app, executor, scope, send)(receive)
+
+    asyncio.run(run())
+    return sent
+
+
+def echo(environ, start_response):
+    body = environ['wsgi.input'].read()
+    start_response('201 Created', [('Content-Type', 'application/json'), ('X-Test', 'yes')])
+    return [json.dumps({
+        'method': environ['REQUEST_METHOD'],
+        'path': environ['PATH_INFO'],
+        'query': environ['QUERY_STRING'],
+        'accept': environ.get('HTTP_ACCEPT'),
+        'length': len(body),
+    }).encode(), b'']
+
+
+def test_environ_follows_the_scope():
+    scope = http_scope('POST', '/api/scenes', b'limit=2', [
+        (b'content-type', b'application/json'),
+        (b'x-forwarded-for', b'a'),
+        (b'x-forwarded-for', b'b'),
+    ])
+
+    environ = _build_environ(scope, None)
+
+    assert environ['REQUEST_METHOD'] == 'POST'
+    assert environ['PATH_INFO'] == '/api/scenes'
+    assert environ['QUERY_STRING'] == 'limit=2'
+    assert environ['CONTENT_TYPE'] == 'application/json'
+    assert environ['HTTP_X_FORWARDED_FOR'] == 'a,b'
+    assert (environ['SERVER_NAME'], environ['SERVER_PORT']) == ('testserver', '8000')
+    assert environ['REMOTE_ADDR'] == '10.0.0.2'
+
+
+def test_root_path_is_moved_to_script_name():
+    environ = _build_environ({**http_scope(path='/maestro/api/scenes'), 'root_path': '/maestro'}, None)
+
+    assert (environ['SCRIPT_NAME'], environ['PATH_INFO']) == ('/maestro', '/api/scenes')
+
+
+def test_response_and_chunked_body_are_relayed():
+    body = b'x' * (MAX_MEMORY_BODY + 10)
+
+    sent = call(echo, http_scope('POST', '/upload', headers=[(b'accept', b'text/plain')]), [body[:100], body[100:]])
+
+    start, *chunks = sent
+    assert start['status'] == 201
+    assert (b'x-test', b'yes') in start['headers']
+    assert json.loads(chunks[0]['body']) == {
+        'method': 'POST', 'path': '/upload', 'query': '', 'accept': 'text/plain', 'length': len(body)
+    }
+    assert chunks[-1] == {'type': 'http.response.body'}
+
+
+def test_disconnect_before_the_body_skips_the_app():
+    called = []
+
+    def app(environ, start_response):
+        called.append(True)
+        return []
+
+    assert call(app, http_scope('POST'), []) == []
+    assert called == []
+
+
+def test_flask_app_is_served(app):
+    sent = call(app.wsgi_app, http_scope(path='/api/scenes'))
+
+    assert sent[0]['status'] == 200
+    assert isinstance(json.loads(b''.join(message.get('body', b'') for message in sent[1:])), list)
@@ -0,0 +1,82 @@
+import pytest
+from backend.backup.archive import CHUNK_DOCS, BackupWriter, object_key, read_object
+from backend.backup.store import LocalDirectoryStore, MemoryStore
+from backend.database.database import get_table, initialize_db
+from backend.event_loop import background_loop
+
+
+def write_backup(store, documents, backup_id):
+    writer = BackupWriter(store)
+    writer.write_table('devices', documents)
+    writer.write_file('scenes', {'scenes': []})
+    return writer.finish(backup_id)
+
+
+def devices(count):
+    return [(doc_id, {'name': f'Light {doc_id}'}) for doc_id in range(1, count + 1)]
+
+
+def read_table(store, manifest, name):
+    table = read_object(store, manifest['tables'][name]['manifest'])
+    return [
+        (doc_id, document)
+        for chunk in table['chunks']
+        for doc_id, document in read_object(store, chunk['hash'])
+    ]
+
+
+@pytest.mark.parametrize('kind', ['memory', 'directory'])
+def test_archive_round_trip(kind, tmp_path):
+    store = MemoryStore() if kind == 'memory' else LocalDirectoryStore(tmp_path)
+    documents = devices(CHUNK_DOCS * 2 + 10)
+
+    manifest = write_backup(store, documents, '20250101T000000000000Z')
+
+    assert manifest['tables']['devices'] == {
+        'manifest': manifest['tables']['devices']['manifest'],
+        'documents': len(documents),
+        'chunks': 3,
+    }
+    assert read_table(store, manifest, 'devices') == documents
+    assert read_object(store, manifest['files']['scenes']) == {'scenes': []}
+
+
+def test_unchanged_chunks_are_not_uploaded_again():
+    store = MemoryStore()
+    documents = devices(CHUNK_DOCS * 4)
+    first = write_backup(store, documents, '20250101T000000000000Z')
+
+    again = write_backup(store, documents, '20250101T010000000000Z')
+    documents[5] = (6, {'name': 'Renamed'})
+    changed = write_backup(store, documents, '20250101T020000000000Z')
+
+    assert first['stats']['uploaded'] == first['stats']['objects']
+    assert again['stats']['uploaded'] == 0
+    # The chunk holding the document and the table manifest pointing at it
+    assert changed['stats']['uploaded'] == 2
+
+
+def test_corrupt_objects_are_detected():
+    store = MemoryStore()
+    manifest = write_backup(store, devices(3), '20250101T000000000000Z')
+    digest = manifest['files']['scenes']
+    store.put(object_key(digest), store.get(object_key(manifest['tables']['devices']['manifest'])))
+
+    with pytest.raises(ValueError, match='corrupt'):
+        read_object(store, digest)
+
+
+def test_second_backup_only_uploads_changes(memory_backups):
+    table = get_table(initialize_db(), 'groups')
+    table.truncate()
+    table.insert({'name': 'Kitchen', 'devices': []})
+    background_loop.run(memory_backups.perform_backup(manual=True))
+
+    store = memory_backups.memory_store
+    before = len(store.list('objects'))
+    second = background_loop.run(memory_backups.perform_backup(manual=True))
+
+    # Only the settings table changes, it records the first backup
+    assert second['success']
+    assert len(store.list('objects')) - before <= 2
+    table.truncate()
@@ -0,0 +1,48 @@
+from datetime import datetime
+import pytest
+from backend.backup.archive import BackupWriter
+from backend.backup.store import MemoryStore
+from backend.database.database import get_table, initialize_db
+from backend.event_loop import background_loop
+
+
+@pytest.fixture
+def groups():
+    table = get_table(initialize_db(), 'groups')
+    table.truncate()
+    yield table
+    table.truncate()
+
+
+def test_backup_and_restore_round_trip(memory_backups, groups):
+    groups.insert({'name': 'Kitchen', 'devices': [1, 2]})
+    groups.insert({'name': 'Hall', 'devices': []})
+
+    backup = background_loop.run(memory_backups.perform_backup(manual=True))
+    assert backup['success']
+
+    groups.update({'name': 'Changed'}, doc_ids=[1])
+    groups.insert({'name': 'Added later'})
+    restored = background_loop.run(memory_backups.restore_backup(backup['backup_id']))
+
+    assert restored['success']
+    assert restored['tables']['groups'] == 2
+    assert [(doc.doc_id, doc['name']) for doc in groups.all()] == [(1, 'Kitchen'), (2, 'Hall')]
+
+
+def test_restore_of_a_missing_backup_is_not_found(memory_backups):
+    restored = background_loop.run(memory_backups.restore_backup('20000101T000000000000Z'))
+
+    assert not restored['success']
+    assert restored['not_found']
+
+
+def test_point_in_time_picks_the_latest_backup_before_it(memory_backups):
+    store = MemoryStore()
+    for backup_id in ['20250101T000000000000Z', '20250102T000000000000Z', '20250103T000000000000Z']:
+        BackupWriter(store).finish(backup_id)
+
+    assert memory_backups.find_backup(store, at=datetime(2025, 1, 2, 12))['id'] == '20250102T000000000000Z'
+    assert memory_backups.find_backup(store, 'latest')['id'] == '20250103T000000000000Z'
+    with pytest.raises(LookupError):
+        memory_backups.find_backup(store, at=datetime(2024, 12, 31))
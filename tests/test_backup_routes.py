@@ -0,0 +1,27 @@
+import pytest
+from backend.backup.manager import is_backup_id, parse_timestamp
+
+
+@pytest.mark.parametrize('backup_id', ['..', 'manifests', '20250101T000000', '20250101T000000000000Zx'])
+def test_restore_rejects_malformed_backup_ids(client, backup_id):
+    response = client.post(f'/api/backup/restore/{backup_id}')
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('timestamp', ['yesterday', '2025-13-01', 12])
+def test_restore_rejects_malformed_timestamps(client, timestamp):
+    response = client.post('/api/backup/restore', json={'timestamp': timestamp})
+
+    assert response.status_code == 400
+
+
+def test_backup_id_format():
+    assert is_backup_id('20250102T030405000006Z')
+    assert not is_backup_id('../20250102T030405000006Z')
+    assert not is_backup_id(None)
+
+
+def test_timestamps_are_converted_to_utc():
+    assert parse_timestamp('2025-01-02T05:00:00+02:00').isoformat() == '2025-01-02T03:00:00'
+    assert parse_timestamp('2025-01-02T03:00:00').isoformat() == '2025-01-02T03:00:00'
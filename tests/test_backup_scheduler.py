@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from backend.backup import scheduler as scheduler_module
+from backend.backup.scheduler import INTERVALS, BackupScheduler
+
+
+class Manager:
+    """Backup manager with the settings given and backups that run in no time."""
+
+    def __init__(self, **config):
+        self.config = {'backup_enabled': True, 'auto_backup': True, 'interval': 'daily', **config}
+        self.backups = 0
+        self.fail = 0
+
+    def get_config(self):
+        return self.config
+
+    async def perform_backup(self):
+        self.backups += 1
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError('store went away')
+        self.config['last_backup'] = datetime.utcnow().isoformat()
+        return {'success': True}
+
+
+def test_backup_is_due_an_interval_after_the_last_one():
+    last_backup = datetime.utcnow() - timedelta(hours=1)
+    scheduler = BackupScheduler(Manager(last_backup=last_backup.isoformat()))
+
+    assert INTERVALS['daily'] - 3700 < scheduler._next_delay() <= INTERVALS['daily'] - 3600
+
+
+def test_disabled_backups_are_never_due():
+    assert BackupScheduler(Manager(auto_backup=False))._next_delay() is None
+
+
+@pytest.mark.parametrize('last_backup', ['yesterday', 12, '2025-01-01T00:00:00+02:00x'])
+def test_unreadable_last_backup_counts_as_never(last_backup):
+    assert BackupScheduler(Manager(last_backup=last_backup))._next_delay() == 0.0
+
+
+def test_scheduler_keeps_running_after_a_failed_backup(monkeypatch):
+    monkeypatch.setattr(scheduler_module, 'RETRY_DELAY', 0.01)
+    manager = Manager(last_backup='yesterday')
+    manager.fail = 1
+    scheduler = BackupScheduler(manager)
+
+    async def run():
+        scheduler._wake = asyncio.Event()
+        task = asyncio.create_task(scheduler._run())
+        for _ in range(100):
+            if manager.backups == 2:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+
+    assert manager.backups == 2
+    assert scheduler._retry_at is None
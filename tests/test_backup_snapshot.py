@@ -0,0 +1,68 @@
+import copy
+import threading
+import pytest
+from backend.backup.snapshot import take_snapshot
+from backend.credentials.credential_manager import credential_manager
+from backend.database.sqlite import SQLiteDatabase
+from backend.database.storage import BufferedJSONStorage, SharedTinyDB
+from backend.scenes.scene_manager import scene_manager
+
+
+@pytest.fixture(params=['tinydb', 'sqlite'])
+def db(request, tmp_path):
+    if request.param == 'tinydb':
+        db = SharedTinyDB(tmp_path / 'db.json', storage=BufferedJSONStorage)
+    else:
+        db = SQLiteDatabase(tmp_path / 'db.sqlite3')
+    db.table('devices').insert({'name': 'Lamp'})
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def scenes():
+    saved = copy.deepcopy(scene_manager.load_scenes())
+    scene_manager.save_scenes({'scenes': {'1': {'name': 'Evening'}}, 'virtual_devices': {}})
+    yield
+    scene_manager.save_scenes(saved)
+    scene_manager.flush()
+
+
+def test_snapshot_is_not_changed_by_later_writes(db, scenes):
+    with take_snapshot(db) as snapshot:
+        db.table('devices').update({'name': 'Desk lamp'}, doc_ids=[1])
+        db.table('devices').insert({'name': 'Switch'})
+        scene_manager.load_scenes()['scenes']['1']['name'] = 'Night'
+        scene_manager.save_scenes({'scenes': {}, 'virtual_devices': {}})
+
+        assert [dict(doc) for _, doc in snapshot.tables.documents('devices')] == [{'name': 'Lamp'}]
+        assert snapshot.scenes['scenes'] == {'1': {'name': 'Evening'}}
+        assert snapshot.credentials == credential_manager.load_credentials()
+
+
+def test_writers_wait_for_the_snapshot(db, scenes, monkeypatch):
+    capture = db.capture
+    writers = []
+
+    def write():
+        db.table('devices').insert({'name': 'Switch'})
+        scene_manager.save_scenes({'scenes': {}, 'virtual_devices': {}})
+
+    def capture_while_writing():
+        # A write started while the snapshot is taken has to wait for it
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+        writer.join(timeout=0.2)
+        writers.append((writer, writer.is_alive()))
+        return capture()
+
+    monkeypatch.setattr(db, 'capture', capture_while_writing)
+    with take_snapshot(db) as snapshot:
+        [(writer, waited)] = writers
+        writer.join(timeout=5)
+
+        assert waited
+        assert len(snapshot.tables.documents('devices')) == 1
+        assert snapshot.scenes['scenes'] == {'1': {'name': 'Evening'}}
+    assert len(db.table('devices')) == 2
+    assert scene_manager.load_scenes()['scenes'] == {}
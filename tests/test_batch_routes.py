@@ -0,0 +1,61 @@
+import pytest
+from backend.groups import routes as group_routes
+from backend.virtual_circuits import routes as circuit_routes
+
+
+@pytest.fixture
+def groups():
+    group_routes.groups_table.truncate()
+    yield group_routes.groups_table
+    group_routes.groups_table.truncate()
+
+
+@pytest.fixture
+def circuits():
+    circuit_routes.circuits_table.truncate()
+    circuit_routes.circuit_manager.load_circuits([])
+    yield circuit_routes.circuits_table
+    circuit_routes.circuits_table.truncate()
+    circuit_routes.circuit_manager.load_circuits([])
+
+
+def test_items_succeed_or_fail_on_their_own(client, groups):
+    kitchen = groups.insert({'name': 'Kitchen', 'devices': []})
+
+    response = client.post('/api/groups/batch', json={'operations': [
+        {'op': 'create', 'data': {'name': 'Hall', 'devices': []}},
+        {'op': 'update', 'id': kitchen, 'data': {'name': 'Kitchen lights'}},
+        {'op': 'delete', 'id': 999},
+        {'op': 'rename', 'id': kitchen},
+    ]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body['succeeded'], body['failed']) == (2, 2)
+    assert [result['status'] for result in body['results']] == [201, 200, 404, 400]
+    assert sorted(group['name'] for group in groups.all()) == ['Hall', 'Kitchen lights']
+
+
+def test_malformed_batch_is_rejected(client, groups):
+    assert client.post('/api/groups/batch', json={'operations': 'all'}).status_code == 400
+
+
+def test_circuit_registration_failure_is_reported_per_item(client, circuits, monkeypatch):
+    register = circuit_routes.circuit_manager.register_circuit
+
+    def register_circuit(circuit):
+        if circuit['name'] == 'Broken':
+            raise ValueError('cannot map devices')
+        return register(circuit)
+
+    monkeypatch.setattr(circuit_routes.circuit_manager, 'register_circuit', register_circuit)
+    response = client.post('/api/virtual-circuits/batch', json={'operations': [
+        {'op': 'create', 'data': {'name': 'Broken', 'type': 'switch', 'devices': []}},
+        {'op': 'create', 'data': {'name': 'Stairs', 'type': 'switch', 'devices': []}},
+    ]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result['status'] for result in body['results']] == [500, 201]
+    assert 'cannot map devices' in body['results'][0]['error']
+    assert circuit_routes.circuit_manager.get_circuit(body['results'][1]['id'])
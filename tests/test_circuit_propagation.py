@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import pytest
+from backend.database.database import get_table, initialize_db
+from backend.event_loop import background_loop
+from backend.matter.protocol_manager import protocol_manager
+from backend.virtual_circuits.propagation import CircuitPropagator
+from backend.virtual_circuits.virtual_manager import VirtualCircuitManager
+
+
+@pytest.fixture
+def devices():
+    table = get_table(initialize_db(), 'devices')
+    table.truncate()
+    yield table
+    table.truncate()
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    commands = []
+
+    async def control_devices(commands_, concurrency=None, deadline=None):
+        commands.extend(commands_)
+        return [{'success': True, 'latency_ms': 1.0} for _ in commands_]
+
+    monkeypatch.setattr(protocol_manager, 'control_devices', control_devices)
+    return commands
+
+
+def report(propagator, node_id, on):
+    protocol_manager.node_cache.set_node({'node_id': node_id, 'attributes': {'1/6/0': on}})
+
+    async def deliver():
+        propagator.handle_event('attribute_updated', [node_id, '1/6/0', on])
+        await asyncio.sleep(0.05)
+
+    background_loop.run(deliver())
+
+
+def make_propagator(circuit_devices):
+    manager = VirtualCircuitManager()
+    manager.register_circuit({
+        'id': 1, 'type': 'switch',
+        'devices': [{'device_id': device_id} for device_id in circuit_devices]
+    })
+    propagator = CircuitPropagator(manager, window=0.01)
+    propagator.start()
+    return propagator
+
+
+def test_report_from_node_outside_circuit_is_ignored(devices, sent):
+    first = devices.insert({'name': 'Switch', 'node_id': 101})
+    second = devices.insert({'name': 'Light', 'node_id': 102})
+    propagator = make_propagator([first, second])
+
+    # Node 1 shares its number with device 1 but is in no circuit
+    report(propagator, first, True)
+
+    assert sent == []
+
+
+def test_report_propagates_to_other_nodes(devices, sent):
+    first = devices.insert({'name': 'Switch', 'node_id': 101})
+    second = devices.insert({'name': 'Light', 'node_id': 102})
+    propagator = make_propagator([first, second])
+
+    report(propagator, 101, True)
+
+    assert [(node_id, state) for node_id, _, state in sent] == [(102, {'on': True})]
+
+
+def test_index_follows_device_changes(devices, sent):
+    first = devices.insert({'name': 'Switch', 'node_id': 101})
+    second = devices.insert({'name': 'Light', 'node_id': 102})
+    propagator = make_propagator([first, second])
+    report(propagator, 101, True)
+    sent.clear()
+
+    devices.update({'node_id': 202}, doc_ids=[second])
+    report(propagator, 101, False)
+
+    assert [node_id for node_id, _, _ in sent] == [202]
+
+
+def test_index_is_built_off_the_event_loop(devices, monkeypatch):
+    device_id = devices.insert({'name': 'Switch', 'node_id': 101})
+    propagator = CircuitPropagator(VirtualCircuitManager())
+    threads = []
+    rebuild = propagator._rebuild_index
+
+    def recording_rebuild():
+        threads.append(threading.current_thread())
+        rebuild()
+
+    monkeypatch.setattr(propagator, '_rebuild_index', recording_rebuild)
+
+    async def start():
+        propagator.start()
+        for _ in range(100):
+            if propagator._node_id(device_id) is not None:
+                break
+            await asyncio.sleep(0.01)
+        return threading.current_thread()
+
+    loop_thread = background_loop.run(start())
+
+    assert propagator._node_id(device_id) == 101
+    assert threads and loop_thread not in threads
+
+
+def test_index_is_rebuilt_after_truncation(devices, sent):
+    first = devices.insert({'name': 'Switch', 'node_id': 101})
+    propagator = make_propagator([first])
+
+    devices.truncate()
+    restored = devices.insert({'name': 'Switch', 'node_id': 301})
+
+    assert propagator._device_ids(101) == []
+    assert propagator._device_ids(301) == [str(restored)]
@@ -0,0 +1,29 @@
+import pytest
+from backend.devices.commissioning import normalize_setup_code, parse_bulk_csv
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('MT:Y.K9042C00KA0648G00', 'MT:Y.K9042C00KA0648G00'),
+    ('3497-011-2332', '34970112332'),
+    ('749701123365521327694', '749701123365521327694'),
+])
+def test_setup_codes_are_normalized(code, expected):
+    assert normalize_setup_code(code) == expected
+
+
+def test_bare_passcodes_are_rejected():
+    with pytest.raises(ValueError, match='passcode'):
+        normalize_setup_code('20202021')
+
+
+def test_pair_rejects_bare_passcode(client):
+    response = client.post('/api/devices/pair', json={'setup_code': '20202021'})
+
+    assert response.status_code == 400
+
+
+def test_bulk_csv_reports_bad_lines():
+    requests, errors = parse_bulk_csv('setup_code,name\n34970112332,Lamp\n20202021,Old\n')
+
+    assert [request['name'] for request in requests] == ['Lamp']
+    assert [error['line'] for error in errors] == [3]
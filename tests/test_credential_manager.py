@@ -0,0 +1,60 @@
+import json
+import os
+import pytest
+from backend.credentials.credential_manager import CredentialManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return CredentialManager()
+
+
+def test_new_fabric_is_created_on_first_use(manager):
+    creds = json.loads(manager.cred_file.read_text())
+
+    assert creds['fabric_id'] == manager.get_fabric_info()['fabric_id']
+    assert creds['devices'] == {}
+
+
+def test_device_credentials_round_trip(manager):
+    assert manager.set_device_credentials(5, {'key': 'secret'})
+
+    assert manager.get_device_credentials('5') == {'key': 'secret'}
+    assert json.loads(manager.cred_file.read_text())['devices'] == {'5': {'key': 'secret'}}
+    assert manager.remove_device_credentials(5)
+    assert manager.get_device_credentials(5) is None
+    assert not list(manager.cred_dir.glob('*.tmp'))
+
+
+def test_callers_cannot_change_the_cache(manager):
+    manager.set_device_credentials(5, {'key': 'secret'})
+
+    manager.load_credentials()['devices']['5']['key'] = 'changed'
+    manager.get_device_credentials(5)['key'] = 'changed'
+
+    assert manager.get_device_credentials(5) == {'key': 'secret'}
+
+
+def test_file_is_read_once_until_replaced(manager, monkeypatch):
+    manager.get_fabric_info()
+    reads = []
+    real_open = open
+
+    def counting_open(path, *args, **kwargs):
+        if str(path) == str(manager.cred_file):
+            reads.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', counting_open)
+    for _ in range(3):
+        manager.get_fabric_info()
+    assert reads == []
+
+    creds = json.loads(manager.cred_file.read_text())
+    replacement = manager.cred_file.with_name('replacement.json')
+    replacement.write_text(json.dumps({**creds, 'fabric_id': 'replaced'}))
+    os.replace(replacement, manager.cred_file)
+
+    assert manager.get_fabric_info()['fabric_id'] == 'replaced'
+    assert len(reads) == 1
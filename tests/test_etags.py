@@ -0,0 +1,104 @@
+import pytest
+from backend.devices import routes as device_routes
+from backend.matter.protocol_manager import protocol_manager
+from backend.scenes import routes as scene_routes
+
+
+@pytest.fixture
+def scenes():
+    scene_routes.scenes_table.truncate()
+    yield scene_routes.scenes_table
+    scene_routes.scenes_table.truncate()
+
+
+def test_list_is_answered_with_304_while_unchanged(client, scenes):
+    scenes.insert({'name': 'Evening', 'devices': []})
+
+    first = client.get('/api/scenes')
+    etag = first.headers['ETag']
+    again = client.get('/api/scenes', headers={'If-None-Match': etag})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+
+
+def test_list_etag_changes_with_the_table(client, scenes):
+    scenes.insert({'name': 'Evening', 'devices': []})
+    etag = client.get('/api/scenes').headers['ETag']
+
+    scenes.insert({'name': 'Night', 'devices': []})
+    response = client.get('/api/scenes', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [scene['name'] for scene in response.get_json()] == ['Evening', 'Night']
+
+
+def test_document_etag_only_follows_its_document(client, scenes):
+    evening = scenes.insert({'name': 'Evening', 'devices': []})
+    night = scenes.insert({'name': 'Night', 'devices': []})
+    etag = client.get(f'/api/scenes/{evening}').headers['ETag']
+
+    scenes.update({'name': 'Late night'}, doc_ids=[night])
+    assert client.get(f'/api/scenes/{evening}', headers={'If-None-Match': etag}).status_code == 304
+
+    scenes.update({'name': 'Early evening'}, doc_ids=[evening])
+    assert client.get(f'/api/scenes/{evening}', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_stale_etag_from_another_process_is_not_matched(client, scenes):
+    scenes.insert({'name': 'Evening', 'devices': []})
+    etag = client.get('/api/scenes').headers['ETag']
+    _, *versions = etag.strip('"').split('-')
+
+    response = client.get('/api/scenes', headers={'If-None-Match': '"000000000000-' + '-'.join(versions) + '"'})
+
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def node():
+    devices = device_routes.devices_table
+    devices.truncate()
+    protocol_manager.node_cache.set_node({'node_id': 100, 'available': True, 'attributes': {'1/6/0': False}})
+    protocol_manager.liveness.set_available(100, True)
+    devices.insert({'name': 'Light', 'node_id': 100})
+    yield 100
+    devices.truncate()
+    protocol_manager.node_cache.remove_node(100)
+    protocol_manager.liveness.handle_event('node_removed', 100)
+
+
+def test_device_list_etag_ignores_reports_that_do_not_change_it(client, node):
+    etag = client.get('/api/devices').headers['ETag']
+
+    for event, data in [
+        ('attribute_updated', (node, '0/40/10', 'firmware')),
+        ('attribute_updated', (node, '1/6/0', False)),
+    ]:
+        protocol_manager.node_cache.handle_event(event, data)
+        protocol_manager.liveness.handle_event(event, data)
+    assert client.get('/api/devices', headers={'If-None-Match': etag}).status_code == 304
+
+    protocol_manager.node_cache.handle_event('attribute_updated', (node, '1/6/0', True))
+    response = client.get('/api/devices', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['state'] == {'on': True}
+
+    etag = response.headers['ETag']
+    protocol_manager.liveness.set_available(node, False)
+    response = client.get('/api/devices', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['online'] is False
+
+
+def test_liveness_endpoint_is_current(client, node):
+    protocol_manager.liveness.record_command(node, 25.0, success=True)
+
+    [liveness] = client.get('/api/devices/liveness').get_json().values()
+
+    assert liveness['online']
+    assert liveness['rtt_ms'] == 25.0
+    assert liveness['last_seen'] is not None
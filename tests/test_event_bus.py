@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import pytest
+from backend.events.bus import EventBus, TooManySubscribers
+
+
+def test_subscribers_are_capped():
+    bus = EventBus(max_subscribers=2)
+    first, _ = bus.subscribe()
+    bus.subscribe()
+    with pytest.raises(TooManySubscribers):
+        bus.subscribe()
+
+    first.close()
+    bus.subscribe()
+
+
+def test_async_subscription_receives_events_from_other_threads():
+    bus = EventBus()
+
+    async def main():
+        subscription, complete = bus.subscribe(node_ids=[5], loop=asyncio.get_running_loop())
+        publisher = threading.Thread(target=lambda: [
+            bus.publish('attribute_updated', {'n': 6}, [6]),
+            bus.publish('attribute_updated', {'n': 5}, [5]),
+        ])
+        publisher.start()
+        publisher.join()
+        event = await subscription.get(timeout=1)
+        empty = await subscription.get(timeout=0.05)
+        subscription.close()
+        return complete, event, empty
+
+    complete, event, empty = asyncio.run(main())
+    assert complete
+    assert event['data'] == {'n': 5}
+    assert empty is None
+
+
+def test_async_subscription_replays_history():
+    bus = EventBus()
+    first = bus.publish('scene_activated', {}, [])
+    bus.publish('scene_activated', {'second': True}, [])
+
+    async def main():
+        subscription, complete = bus.subscribe(last_event_id=first['id'], loop=asyncio.get_running_loop())
+        return complete, await subscription.get(timeout=1)
+
+    complete, event = asyncio.run(main())
+    assert complete
+    assert event['data'] == {'second': True}
@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+import threading
+import pytest
+from backend.event_loop import BackgroundLoop, background_loop
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+@pytest.fixture
+def loop():
+    loop = BackgroundLoop()
+    yield loop
+    loop.stop()
+
+
+def test_coroutines_share_one_loop(loop):
+    async def current():
+        return asyncio.get_running_loop()
+
+    first = loop.run(current())
+
+    assert loop.run(current()) is first is loop.loop
+    assert first.is_running()
+
+
+def test_tasks_outlive_the_call_that_started_them(loop):
+    async def start():
+        return asyncio.get_running_loop().create_task(asyncio.sleep(0, 'done'))
+
+    task = loop.run(start())
+
+    async def result():
+        return await task
+
+    assert loop.run(result()) == 'done'
+
+
+def test_context_variables_are_carried_over(loop):
+    async def read():
+        return request_id.get()
+
+    request_id.set('abc')
+
+    assert loop.run(read()) == 'abc'
+
+
+def test_blocking_on_the_loop_from_inside_it_is_refused(loop):
+    async def nested():
+        coro = asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            loop.run(coro)
+        coro.close()
+
+    loop.run(nested())
+
+
+def test_stop_runs_hooks_and_cancels_tasks(loop):
+    events = []
+
+    async def hook():
+        events.append('hook')
+
+    async def forever():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            events.append('cancelled')
+            raise
+
+    loop.on_shutdown(hook)
+    loop.submit(forever())
+    loop.run(asyncio.sleep(0.01))
+    loop.stop()
+
+    assert events == ['hook', 'cancelled']
+
+
+def test_async_views_run_on_the_shared_loop(app):
+    async def view():
+        return threading.current_thread()
+
+    assert app.async_to_sync(view)() is background_loop.run(view())
+    assert background_loop.run(view()) is not threading.current_thread()
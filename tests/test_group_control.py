@@ -0,0 +1,80 @@
+import asyncio
+import time
+import pytest
+from backend.groups import routes as group_routes
+from backend.matter.protocol_manager import protocol_manager
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    commands = []
+
+    async def control_devices(commands_, concurrency, deadline):
+        commands.extend(commands_)
+        return [{'success': True, 'latency_ms': 1.0} for _ in commands_]
+
+    monkeypatch.setattr(protocol_manager, 'control_devices', control_devices)
+    return commands
+
+
+@pytest.fixture
+def tables():
+    tables = group_routes.devices_table, group_routes.groups_table
+    for table in tables:
+        table.truncate()
+    yield tables
+    for table in tables:
+        table.truncate()
+
+
+def test_unknown_members_are_not_found(client, sent, tables):
+    devices, groups = tables
+    device_id = devices.insert({'name': 'Light', 'node_id': 100})
+    group_id = groups.insert({'name': 'Kitchen', 'devices': [device_id, 9]})
+
+    response = client.post(f'/api/groups/{group_id}/control', json={'command': 'on'})
+
+    assert response.status_code == 200
+    assert [node_id for node_id, _, _ in sent] == [100]
+    report = {str(result['device_id']): result for result in response.get_json()['devices']}
+    assert report['9']['error'] == 'not_found'
+    assert not report['9']['success']
+
+
+@pytest.mark.parametrize('options', [
+    {'concurrency': 0},
+    {'concurrency': 'many'},
+    {'concurrency': 2.5},
+    {'deadline': -1},
+    {'deadline': 'soon'},
+])
+def test_invalid_limits_are_rejected(client, sent, tables, options):
+    _, groups = tables
+    group_id = groups.insert({'name': 'Kitchen', 'devices': []})
+
+    response = client.post(f'/api/groups/{group_id}/control', json={'command': 'on', **options})
+
+    assert response.status_code == 400
+    assert sent == []
+
+
+def test_slow_group_casts_are_cut_off_at_the_deadline(client, sent, tables, monkeypatch):
+    devices, groups = tables
+    cast_member = devices.insert({'name': 'Light', 'node_id': 100})
+    other = devices.insert({'name': 'Lamp', 'node_id': 101})
+    group_id = groups.insert({'name': 'Kitchen', 'matter_group_id': 7, 'devices': [cast_member]})
+    parent = groups.insert({'name': 'Downstairs', 'devices': [other], 'subgroups': [group_id]})
+
+    async def hanging_cast(group_id, command, params):
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(protocol_manager, 'group_command', hanging_cast)
+    started = time.monotonic()
+    response = client.post(f'/api/groups/{parent}/control', json={'command': 'on', 'deadline': 0.2})
+
+    assert time.monotonic() - started < 5
+    report = {result['node_id']: result for result in response.get_json()['devices']}
+    assert report[100]['via'] == 'group'
+    assert report[100]['error'] == 'Deadline exceeded'
+    assert report[101]['success']
+    assert [node_id for node_id, _, _ in sent] == [101]
@@ -0,0 +1,162 @@
+import json
+import shutil
+import time
+import pytest
+from backend.database.journal import JournalStorage
+from backend.database.storage import SharedTinyDB
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'db' / 'matter_maestro.json'
+
+
+def open_db(path, **options):
+    path.parent.mkdir(exist_ok=True)
+    return SharedTinyDB(path, storage=JournalStorage, **options)
+
+
+def crash_copy(path, target_dir):
+    """Copy the files as a crash would leave them, without closing the storage."""
+    target_dir.mkdir()
+    for source in path.parent.iterdir():
+        shutil.copy(source, target_dir / source.name)
+    return target_dir / path.name
+
+
+def documents(db, table_name):
+    return {doc.doc_id: dict(doc) for doc in db.table(table_name).all()}
+
+
+def test_mutations_append_to_the_journal(path):
+    db = open_db(path, compact_threshold=1 << 30)
+    db.table('devices').insert({'name': 'Lamp'})
+    db.table('devices').update({'name': 'Desk lamp'}, doc_ids=[1])
+    db.table('devices').remove(doc_ids=[1])
+
+    entries = [json.loads(line) for line in path.with_suffix('.journal').read_text().splitlines()]
+    db.close()
+
+    assert entries == [
+        {'t': 'devices', 'id': '1', 'doc': {'name': 'Lamp'}},
+        {'t': 'devices', 'id': '1', 'doc': {'name': 'Desk lamp'}},
+        {'t': 'devices', 'id': '1'},
+    ]
+
+
+def test_journal_is_replayed_after_a_crash(path, tmp_path):
+    db = open_db(path, compact_threshold=1 << 30)
+    db.table('devices').insert({'name': 'Lamp'})
+    db.table('devices').insert({'name': 'Switch'})
+    db.table('devices').update({'name': 'Wall switch'}, doc_ids=[2])
+    db.table('groups').insert({'name': 'Kitchen', 'devices': [1, 2]})
+    db.table('groups').truncate()
+    db.storage.flush()
+
+    recovered = open_db(crash_copy(path, tmp_path / 'crashed'))
+    try:
+        assert documents(recovered, 'devices') == {1: {'name': 'Lamp'}, 2: {'name': 'Wall switch'}}
+        assert documents(recovered, 'groups') == {}
+    finally:
+        recovered.close()
+        db.close()
+
+
+def test_torn_journal_tail_is_ignored(path, tmp_path):
+    db = open_db(path, compact_threshold=1 << 30)
+    db.table('devices').insert({'name': 'Lamp'})
+    db.storage.flush()
+    crashed = crash_copy(path, tmp_path / 'crashed')
+    with open(crashed.with_suffix('.journal'), 'a') as journal:
+        journal.write('{"t": "devices", "id": "2", "doc": {"na')
+
+    recovered = open_db(crashed)
+    try:
+        assert documents(recovered, 'devices') == {1: {'name': 'Lamp'}}
+    finally:
+        recovered.close()
+        db.close()
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(path):
+    db = open_db(path, compact_threshold=1 << 30)
+    for n in range(10):
+        db.table('devices').insert({'name': f'Light {n}'})
+    db.table('devices').remove(doc_ids=[3])
+    db.storage.compact()
+
+    assert path.with_suffix('.journal').stat().st_size == 0
+    assert not path.with_suffix('.journal.old').exists()
+    assert len(json.loads(path.read_text())['devices']) == 9
+
+    db.table('devices').insert({'name': 'Fan'})
+    db.close()
+    db = open_db(path)
+    try:
+        assert len(db.table('devices')) == 10
+        assert db.table('devices').get(doc_id=3) is None
+    finally:
+        db.close()
+
+
+def test_journal_is_compacted_once_it_grows(path):
+    db = open_db(path, fsync_interval=0.01, compact_threshold=512)
+    for n in range(50):
+        db.table('devices').insert({'name': f'Light {n}'})
+
+    deadline = time.monotonic() + 5
+    # The journal is rotated before the snapshot is written
+    while time.monotonic() < deadline and (
+        path.with_suffix('.journal').stat().st_size >= 512 or not path.exists()
+    ):
+        time.sleep(0.01)
+    try:
+        assert path.with_suffix('.journal').stat().st_size < 512
+        assert path.exists()
+    finally:
+        db.close()
+
+
+def test_interrupted_compaction_is_finished_on_open(path, tmp_path):
+    db = open_db(path, compact_threshold=1 << 30)
+    db.table('devices').insert({'name': 'Lamp'})
+    db.storage.flush()
+    crashed = crash_copy(path, tmp_path / 'crashed')
+    # The journal was rotated but the new snapshot never landed
+    crashed.with_suffix('.journal').rename(crashed.with_suffix('.journal.old'))
+
+    recovered = open_db(crashed)
+    try:
+        assert documents(recovered, 'devices') == {1: {'name': 'Lamp'}}
+        assert not crashed.with_suffix('.journal.old').exists()
+        assert json.loads(crashed.read_text())['devices'] == {'1': {'name': 'Lamp'}}
+    finally:
+        recovered.close()
+        db.close()
+
+
+def test_close_leaves_only_the_snapshot(path):
+    db = open_db(path)
+    db.table('devices').insert({'name': 'Lamp'})
+    db.close()
+
+    assert not path.with_suffix('.journal').exists()
+    assert json.loads(path.read_text()) == {'devices': {'1': {'name': 'Lamp'}}}
+
+
+def test_closing_a_handle_that_never_wrote_keeps_newer_data(path):
+    # Like the reloader's parent process, which opens the database but never writes
+    db = open_db(path)
+    db.table('devices').insert({'name': 'Lamp'})
+    db.close()
+    reader = open_db(path)
+    writer = open_db(path)
+    writer.table('devices').insert({'name': 'Switch'})
+    writer.close()
+
+    reader.close()
+
+    assert not path.with_suffix('.journal').exists()
+    assert json.loads(path.read_text()) == {
+        'devices': {'1': {'name': 'Lamp'}, '2': {'name': 'Switch'}}
+    }
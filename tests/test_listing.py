@@ -0,0 +1,74 @@
+import pytest
+from backend.devices import routes as device_routes
+from backend.groups import routes as group_routes
+
+
+@pytest.fixture
+def devices():
+    tables = device_routes.devices_table, group_routes.groups_table
+    for table in tables:
+        table.truncate()
+    for n in range(5):
+        device_routes.devices_table.insert({
+            'name': f'Light {n}',
+            'type': 'light' if n % 2 == 0 else 'switch',
+            'location': 'Kitchen' if n < 2 else 'Hall',
+        })
+    yield device_routes.devices_table
+    for table in tables:
+        table.truncate()
+
+
+def names(response):
+    return [device['name'] for device in response.get_json()]
+
+
+def test_without_paging_everything_is_returned(client, devices):
+    response = client.get('/api/devices')
+
+    assert names(response) == [f'Light {n}' for n in range(5)]
+    assert response.headers['X-Total-Count'] == '5'
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_pages_follow_the_cursor(client, devices):
+    pages = []
+    url = '/api/devices?limit=2&type=light'
+    while url:
+        response = client.get(url)
+        pages.append(names(response))
+        assert response.headers['X-Total-Count'] == '3'
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor:
+            assert response.headers['Link'] == f'</api/devices?limit=2&type=light&cursor={cursor}>; rel="next"'
+        url = f'/api/devices?limit=2&type=light&cursor={cursor}' if cursor else None
+
+    assert pages == [['Light 0', 'Light 2'], ['Light 4']]
+
+
+def test_filters_combine(client, devices):
+    response = client.get('/api/devices?type=light&location=Hall')
+
+    assert names(response) == ['Light 2', 'Light 4']
+    assert response.headers['X-Total-Count'] == '2'
+
+
+def test_fields_are_projected_with_the_id(client, devices):
+    response = client.get('/api/devices?fields=name&limit=1')
+
+    assert response.get_json() == [{'id': 1, 'name': 'Light 0'}]
+
+
+def test_group_filter_includes_nested_subgroups(client, devices):
+    groups = group_routes.groups_table
+    hall = groups.insert({'name': 'Hall', 'devices': [3]})
+    groups.insert({'name': 'House', 'devices': [1], 'subgroups': [hall]})
+
+    response = client.get('/api/devices?group=2&fields=id')
+
+    assert response.get_json() == [{'id': 1}, {'id': 3}]
+
+
+@pytest.mark.parametrize('query', ['cursor=next', 'limit=all', 'group=hall'])
+def test_malformed_paging_is_rejected(client, devices, query):
+    assert client.get(f'/api/devices?{query}').status_code == 400
@@ -0,0 +1,69 @@
+import pytest
+from backend.event_loop import background_loop
+from backend.matter.liveness import LivenessTracker
+
+
+@pytest.fixture
+def tracker():
+    tracker = LivenessTracker()
+    tracker.table.truncate()
+    tracker.load()
+    yield tracker
+    tracker.table.truncate()
+
+
+def flush(tracker):
+    background_loop.run(tracker.flush())
+
+
+def test_flush_upserts_by_node_id(tracker):
+    tracker.heard(5)
+    tracker.heard(6)
+    flush(tracker)
+    tracker.record_command(5, 12.0, success=True)
+    flush(tracker)
+    tracker.handle_event('node_removed', 6)
+    flush(tracker)
+
+    docs = tracker.table.all()
+    assert [doc['node_id'] for doc in docs] == ['5']
+    assert docs[0]['rtt_ms'] == 12.0
+
+
+def test_failed_flush_keeps_changes(tracker, monkeypatch):
+    tracker.heard(5)
+
+    def failing_write(snapshot):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(tracker, '_write', failing_write)
+    with pytest.raises(OSError):
+        flush(tracker)
+    monkeypatch.undo()
+    flush(tracker)
+
+    assert [doc['node_id'] for doc in tracker.table.all()] == ['5']
+
+
+def test_restart_restores_last_seen(tracker):
+    tracker.heard(5)
+    flush(tracker)
+
+    restarted = LivenessTracker()
+    restarted.load()
+
+    assert restarted.get(5)['last_seen'] == tracker.get(5)['last_seen']
+
+
+def test_version_only_moves_when_a_node_goes_online_or_offline(tracker):
+    tracker.set_available(5, True)
+    version = tracker.version
+
+    tracker.heard(5)
+    tracker.record_command(5, 10.0, success=True)
+    assert tracker.version == version
+
+    for _ in range(3):
+        tracker.record_command(5, None, success=False)
+    assert not tracker.is_online(5)
+    assert tracker.version == version + 1
@@ -0,0 +1,43 @@
+from backend.network import monitor
+from backend.network.monitor import NetworkMonitor, scan_thread_prefixes
+
+# /proc/net/ipv6_route: destination, prefix length, source, source length,
+# next hop, metric, reference count, use count, flags, interface
+IPV6_ROUTES = """\
+fd123456789a00010000000000000000 40 00000000000000000000000000000000 00 fe800000000000000000000000000001 00000400 00000001 00000000 00800003    wlan0
+fd000001000200030000000000000000 40 00000000000000000000000000000000 00 00000000000000000000000000000000 00000100 00000001 00000000 00080001    wlan0
+fdaa0000000000000000000000000000 30 00000000000000000000000000000000 00 fe800000000000000000000000000002 00000400 00000001 00000000 00800003    wlan0
+20010db8000000010000000000000000 40 00000000000000000000000000000000 00 fe800000000000000000000000000003 00000400 00000001 00000000 00800003    wlan0
+fe800000000000000000000000000000 40 00000000000000000000000000000000 00 00000000000000000000000000000000 00000100 00000001 00000000 00000001    wlan0
+"""
+
+
+def test_thread_prefixes_come_from_route_information_options(tmp_path):
+    routes = tmp_path / 'ipv6_route'
+    routes.write_text(IPV6_ROUTES)
+
+    # Prefix routes of the host's own addresses, other lengths and global prefixes are left out
+    assert scan_thread_prefixes(routes) == [
+        {'prefix': 'fd12:3456:789a:1::/64', 'router': 'fe80::1', 'interface': 'wlan0'}
+    ]
+
+
+def test_unreadable_routing_table_has_no_prefixes(tmp_path):
+    assert scan_thread_prefixes(tmp_path / 'missing') == []
+
+
+def test_listeners_are_told_about_readiness_changes(monkeypatch):
+    interfaces = {'eth0': {'ipv4': ['192.168.1.2'], 'ipv6': []}}
+    monkeypatch.setattr(monitor, 'scan_interfaces', lambda: interfaces)
+    monkeypatch.setattr(monitor, 'scan_thread_prefixes', lambda: [])
+    network = NetworkMonitor()
+    changes = []
+    network.add_listener(lambda status, changed: changes.append(changed))
+
+    assert not network.refresh()['ipv6']
+    network.refresh()
+    interfaces['eth0']['ipv6'] = [{'address': 'fe80::2', 'scope': 'link-local'}]
+    status = network.refresh()
+
+    assert status['ipv6'] and status['link_local']
+    assert changes == [{'ipv6': True, 'link_local': True}]
@@ -0,0 +1,51 @@
+import socket
+import time
+import pytest
+from backend.event_loop import background_loop
+from backend.matter.client import MatterServerUnavailable
+from backend.matter.protocol_manager import MatterProtocolManager, protocol_manager
+
+
+@pytest.fixture
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_initialize_fails_fast_while_server_is_down(closed_port):
+    manager = MatterProtocolManager(server_url=f'ws://127.0.0.1:{closed_port}/ws')
+    try:
+        with pytest.raises(MatterServerUnavailable, match='Matter server unavailable'):
+            background_loop.run(manager.initialize())
+
+        # The client keeps retrying in the background; callers do not wait for it
+        started = time.monotonic()
+        for _ in range(3):
+            with pytest.raises(MatterServerUnavailable):
+                background_loop.run(manager.initialize())
+        assert time.monotonic() - started < 1
+    finally:
+        background_loop.run(manager.shutdown())
+
+
+@pytest.fixture
+def connected(monkeypatch):
+    async def initialize():
+        return True
+
+    monkeypatch.setattr(protocol_manager, 'initialize', initialize)
+
+
+def test_control_of_an_unknown_node_is_not_found(client, connected):
+    response = client.post('/api/devices/4242/control', json={'command': 'on'})
+
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Node 4242 not found'}
+
+
+def test_unknown_nodes_fail_on_their_own_in_bulk_control(connected):
+    results = background_loop.run(protocol_manager.control_devices([('4242', 'on', {})]))
+
+    assert results[0]['success'] is False
+    assert results[0]['error'] == 'Node 4242 not found'
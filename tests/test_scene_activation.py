@@ -0,0 +1,91 @@
+import pytest
+from backend.matter.protocol_manager import protocol_manager
+from backend.scenes import routes as scene_routes
+
+
+@pytest.fixture
+def matter(monkeypatch):
+    """Record the commands sent instead of talking to a Matter server."""
+    sent = {'unicast': [], 'group': []}
+
+    async def initialize():
+        return True
+
+    async def control_devices(commands, concurrency, deadline):
+        sent['unicast'].extend(commands)
+        return [{'success': True, 'latency_ms': 1.0} for _ in commands]
+
+    async def group_command(group_id, command, params):
+        sent['group'].append((group_id, command, params))
+        return {'success': True, 'latency_ms': 1.0}
+
+    monkeypatch.setattr(protocol_manager, 'initialize', initialize)
+    monkeypatch.setattr(protocol_manager, 'control_devices', control_devices)
+    monkeypatch.setattr(protocol_manager, 'group_command', group_command)
+    return sent
+
+
+@pytest.fixture
+def tables():
+    devices = scene_routes.devices_table
+    scenes = scene_routes.scenes_table
+    groups = scene_routes.groups_table
+    for table in (devices, scenes, groups):
+        table.truncate()
+    yield devices, scenes, groups
+    for table in (devices, scenes, groups):
+        table.truncate()
+
+
+def test_activate_sends_to_node_ids(client, matter, tables):
+    devices, scenes, _ = tables
+    device_ids = [devices.insert({'name': f'Light {n}', 'node_id': 100 + n}) for n in range(3)]
+    on = {'on': True}
+    scene_id = scenes.insert({'name': 'Evening', 'devices': [
+        {'device_id': device_ids[0], 'state': on},
+        {'device_id': device_ids[1], 'state': on},
+    ]})
+
+    response = client.post(f'/api/scenes/{scene_id}/activate', json={})
+
+    assert response.status_code == 200
+    assert sorted(node for node, _, _ in matter['unicast']) == [100, 101]
+    assert [result['node_id'] for result in response.get_json()['devices']] == [100, 101]
+
+
+def test_activate_reports_devices_without_node(client, matter, tables):
+    devices, scenes, _ = tables
+    device_id = devices.insert({'name': 'Light', 'node_id': 100})
+    unpaired = devices.insert({'name': 'Unpaired'})
+    scene_id = scenes.insert({'name': 'Evening', 'devices': [
+        {'device_id': device_id, 'state': {'on': True}},
+        {'device_id': unpaired, 'state': {'on': True}},
+        {'device_id': 99, 'state': {'on': True}},
+    ]})
+
+    report = client.post(f'/api/scenes/{scene_id}/activate', json={}).get_json()
+
+    assert [node for node, _, _ in matter['unicast']] == [100]
+    assert report['succeeded'] == 1
+    assert report['failed'] == 2
+    assert [result['error'] for result in report['devices'][1:]] == ['not_found', 'not_found']
+
+
+def test_group_cast_matches_device_ids_and_falls_back_to_node_ids(client, matter, tables, monkeypatch):
+    devices, scenes, groups = tables
+    device_ids = [devices.insert({'name': f'Light {n}', 'node_id': 100 + n}) for n in range(3)]
+    groups.insert({'name': 'Kitchen', 'matter_group_id': 7, 'devices': device_ids[:2]})
+    scene_id = scenes.insert({'name': 'Evening', 'devices': [
+        {'device_id': device_id, 'state': {'on': True}} for device_id in device_ids
+    ]})
+
+    async def failing_cast(group_id, command, params):
+        matter['group'].append((group_id, command, params))
+        return {'success': False, 'latency_ms': 1.0}
+
+    monkeypatch.setattr(protocol_manager, 'group_command', failing_cast)
+    report = client.post(f'/api/scenes/{scene_id}/activate', json={}).get_json()
+
+    assert [group_id for group_id, _, _ in matter['group']] == [7]
+    assert sorted(node for node, _, _ in matter['unicast']) == [100, 101, 102]
+    assert report['failed'] == 0
@@ -0,0 +1,73 @@
+import json
+import os
+import pytest
+from backend.scenes.scene_manager import SceneManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    manager = SceneManager(save_delay=60)
+    yield manager
+    manager.flush()
+
+
+def on_disk(manager):
+    return json.loads(manager.scenes_file.read_text())
+
+
+def test_virtual_devices_are_indexed(manager):
+    scene_id = manager.create_scene('Evening', [{'device_id': 1, 'state': {'on': True}}])
+    device_id = manager.get_scene(scene_id)['virtual_device_id']
+
+    assert manager.get_virtual_device(device_id)['scene_id'] == scene_id
+    assert manager.get_scene_for_virtual_device(device_id)['name'] == 'Evening'
+    assert manager.delete_scene(scene_id)
+    assert manager.get_virtual_device(device_id) is None
+
+
+def test_edits_are_written_together_once_flushed(manager):
+    first = manager.create_scene('Evening', [])
+    second = manager.create_scene('Night', [])
+    manager.update_scene(first, 'Late evening', [])
+
+    assert on_disk(manager)['scenes'] == {}
+
+    manager.flush()
+    assert {scene['name'] for scene in on_disk(manager)['scenes'].values()} == {'Late evening', 'Night'}
+    assert not list(manager.scenes_dir.glob('*.tmp'))
+    assert second in on_disk(manager)['virtual_devices']
+
+
+def test_file_is_only_read_again_when_replaced(manager, monkeypatch):
+    manager.create_scene('Evening', [])
+    manager.flush()
+    manager.load_scenes()
+    reads = []
+    real_open = open
+
+    def counting_open(path, *args, **kwargs):
+        if str(path) == str(manager.scenes_file):
+            reads.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', counting_open)
+    for _ in range(3):
+        manager.get_all_scenes()
+    assert reads == []
+
+    replaced = on_disk(manager)
+    replaced['scenes'] = {}
+    tmp = manager.scenes_file.with_name('replacement.json')
+    tmp.write_text(json.dumps(replaced))
+    os.replace(tmp, manager.scenes_file)
+
+    assert manager.get_all_scenes() == []
+    assert len(reads) == 1
+
+
+def test_unsaved_edits_win_over_the_file(manager):
+    scene_id = manager.create_scene('Evening', [])
+    manager.scenes_file.write_text(json.dumps({'scenes': {}, 'virtual_devices': {}}))
+
+    assert manager.get_scene(scene_id)['name'] == 'Evening'
@@ -0,0 +1,30 @@
+import sqlite3
+import threading
+import pytest
+from backend.database.sqlite import SQLiteDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = SQLiteDatabase(tmp_path / 'test.sqlite3')
+    yield db
+    db.close()
+
+
+def test_failed_begin_releases_the_write_lock(db):
+    other = sqlite3.connect(db.path, isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    db.connection().execute('PRAGMA busy_timeout = 0')
+    with pytest.raises(sqlite3.OperationalError):
+        with db.write():
+            pass
+    other.execute('ROLLBACK')
+    other.close()
+
+    # Another thread must still get the lock
+    inserted = []
+    writer = threading.Thread(target=lambda: inserted.append(db.table('devices').insert({'name': 'Lamp'})), daemon=True)
+    writer.start()
+    writer.join(timeout=5)
+
+    assert inserted == [1]
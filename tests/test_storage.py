@@ -0,0 +1,231 @@
+import json
+import threading
+import pytest
+from tinydb import Query
+from tinydb.table import Document
+from backend.database.batch import apply_batch
+from backend.database.database import STORAGE_BACKENDS
+from backend.database.sqlite import SQLiteDatabase
+from backend.database.storage import SharedTinyDB
+
+
+def open_db(backend, directory):
+    if backend == 'sqlite':
+        return SQLiteDatabase(directory / 'matter_maestro.sqlite3')
+    return SharedTinyDB(directory / 'matter_maestro.json', storage=STORAGE_BACKENDS[backend])
+
+
+@pytest.fixture(params=sorted(STORAGE_BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def db(backend, tmp_path):
+    db = open_db(backend, tmp_path)
+    yield db
+    db.close()
+
+
+def test_insert_get_and_search(db):
+    table = db.table('devices')
+    first = table.insert({'name': 'Lamp', 'node_id': '5'})
+    second = table.insert({'name': 'Switch', 'node_id': '6'})
+
+    assert (first, second) == (1, 2)
+    assert table.get(doc_id=second)['name'] == 'Switch'
+    assert table.get(doc_id=99) is None
+    assert len(table) == 2
+    assert [doc.doc_id for doc in table.all()] == [1, 2]
+    assert [doc['name'] for doc in table.search(Query().node_id == '5')] == ['Lamp']
+    assert table.contains(doc_id=first)
+
+
+def test_update_upsert_and_remove(db):
+    table = db.table('devices')
+    doc_id = table.insert({'name': 'Lamp'})
+
+    assert table.update({'name': 'Desk lamp'}, doc_ids=[doc_id]) == [doc_id]
+    assert table.get(doc_id=doc_id)['name'] == 'Desk lamp'
+
+    table.upsert({'name': 'Desk lamp', 'room': 'Office'}, Query().name == 'Desk lamp')
+    table.upsert({'name': 'Fan'}, Query().name == 'Fan')
+    assert [(doc['name'], doc.get('room')) for doc in table.all()] == [('Desk lamp', 'Office'), ('Fan', None)]
+
+    assert table.remove(doc_ids=[doc_id]) == [doc_id]
+    assert [doc['name'] for doc in table.all()] == ['Fan']
+
+
+def test_insert_multiple_keeps_document_ids(db):
+    table = db.table('scenes')
+    table.insert_multiple([Document({'name': 'Evening'}, doc_id=7), Document({'name': 'Night'}, doc_id=3)])
+
+    assert sorted(doc.doc_id for doc in table.all()) == [3, 7]
+    assert table.insert({'name': 'Morning'}) == 8
+
+
+def test_truncate(db):
+    table = db.table('groups')
+    table.insert({'name': 'Kitchen'})
+    table.truncate()
+
+    assert table.all() == []
+    assert len(table) == 0
+
+
+def test_indexed_lookups(db):
+    devices = db.table('devices')
+    devices.insert({'name': 'Lamp', 'node_id': 5})
+    devices.insert({'name': 'Switch', 'node_id': '6'})
+    groups = db.table('groups')
+    groups.insert({'name': 'Kitchen', 'devices': [1, 2]})
+    scenes = db.table('scenes')
+    scenes.insert({'name': 'Evening', 'devices': [{'device_id': 2, 'state': {'on': True}}]})
+
+    assert [doc['name'] for doc in devices.find_by_node_id('5')] == ['Lamp']
+    assert [doc['name'] for doc in devices.find_by_node_id(6)] == ['Switch']
+    assert [doc['name'] for doc in groups.find_by_device(2)] == ['Kitchen']
+    assert [doc['name'] for doc in scenes.find_by_device('2')] == ['Evening']
+    assert scenes.find_by_device(1) == []
+
+
+def test_versions_count_changes(db):
+    table = db.table('devices')
+    changes = []
+    remove_listener = db.versions.add_listener(lambda name, doc_ids: changes.append((name, doc_ids)))
+
+    before = db.versions.table('devices')
+    first = table.insert({'name': 'Lamp'})
+    second = table.insert({'name': 'Switch'})
+    first_version = db.versions.document('devices', first)
+    table.update({'name': 'Desk switch'}, doc_ids=[second])
+
+    assert db.versions.table('devices') > before
+    assert db.versions.document('devices', first) == first_version
+    assert db.versions.document('devices', second) > first_version
+    assert changes == [('devices', [first]), ('devices', [second]), ('devices', [second])]
+
+    remove_listener()
+    table.truncate()
+    assert len(changes) == 3
+
+
+def test_transaction_counts_changes_at_commit(db):
+    table = db.table('devices')
+    changes = []
+    db.versions.add_listener(lambda name, doc_ids: changes.append(doc_ids))
+
+    with db.transaction():
+        table.insert({'name': 'Lamp'})
+        table.insert({'name': 'Switch'})
+
+    assert changes == [[1], [2]]
+    assert len(table) == 2
+
+
+def test_capture_is_not_affected_by_later_writes(db):
+    table = db.table('devices')
+    table.insert({'name': 'Lamp'})
+
+    with db.transaction():
+        snapshot = db.capture()
+    table.update({'name': 'Changed'}, doc_ids=[1])
+    table.insert({'name': 'Switch'})
+
+    try:
+        assert snapshot.tables() == ['devices']
+        assert snapshot.documents('devices') == [(1, {'name': 'Lamp'})]
+    finally:
+        snapshot.close()
+
+
+def test_data_survives_reopening(backend, tmp_path):
+    db = open_db(backend, tmp_path)
+    db.table('devices').insert({'name': 'Lamp', 'node_id': '5'})
+    db.table('devices').insert({'name': 'Switch'})
+    db.table('devices').remove(doc_ids=[2])
+    db.close()
+
+    db = open_db(backend, tmp_path)
+    try:
+        assert [(doc.doc_id, doc['name']) for doc in db.table('devices').all()] == [(1, 'Lamp')]
+        assert db.table('devices').insert({'name': 'Fan'}) == 2
+    finally:
+        db.close()
+
+
+def test_concurrent_flushes_leave_a_valid_current_file(tmp_path):
+    path = tmp_path / 'matter_maestro.json'
+    db = SharedTinyDB(path, storage=STORAGE_BACKENDS['json'], flush_interval=0)
+    table = db.table('devices')
+    errors = []
+
+    def write(worker):
+        try:
+            for i in range(50):
+                # Payloads shrink and grow, so an overlapping write would leave stray bytes
+                table.upsert(Document({'name': 'x' * ((i * 37 + worker) % 500)}, worker + 1))
+                db.flush()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    try:
+        assert errors == []
+        assert json.loads(path.read_text())['devices'] == {
+            str(doc.doc_id): dict(doc) for doc in table.all()
+        }
+    finally:
+        db.close()
+
+
+def test_savepoint_rolls_back_only_its_own_writes(db):
+    table = db.table('devices')
+
+    with db.transaction():
+        table.insert({'name': 'Lamp'})
+        with pytest.raises(RuntimeError):
+            with db.savepoint('devices'):
+                table.update({'name': 'Changed'}, doc_ids=[1])
+                table.insert({'name': 'Switch'})
+                raise RuntimeError('item failed')
+        table.insert({'name': 'Fan'})
+
+    assert [doc['name'] for doc in table.all()] == ['Lamp', 'Fan']
+    assert table.get(doc_id=1)['name'] == 'Lamp'
+
+
+class FailingTable:
+    """Table whose updates fail after writing, like an item failing half way."""
+
+    def __init__(self, table):
+        self._table = table
+        self.name = table.name
+
+    def __getattr__(self, name):
+        return getattr(self._table, name)
+
+    def update(self, fields, doc_ids):
+        self._table.update(fields, doc_ids=doc_ids)
+        if fields.get('fail'):
+            raise RuntimeError('item failed')
+
+
+def test_failed_batch_item_leaves_nothing_behind(db):
+    table = db.table('devices')
+    table.insert({'name': 'Lamp'})
+    table.insert({'name': 'Switch'})
+
+    results = apply_batch(db, FailingTable(table), [
+        {'op': 'update', 'id': 1, 'data': {'name': 'Ceiling lamp'}},
+        {'op': 'update', 'id': 2, 'data': {'name': 'Broken', 'fail': True}},
+        {'op': 'create', 'data': {'name': 'Fan'}},
+    ])
+
+    assert [result['status'] for result in results] == [200, 500, 201]
+    assert [doc['name'] for doc in table.all()] == ['Ceiling lamp', 'Switch', 'Fan']
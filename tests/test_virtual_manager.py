@@ -0,0 +1,79 @@
+import pytest
+from tinydb.table import Document
+from backend.virtual_circuits.virtual_manager import VirtualCircuitManager
+
+
+class RecordingPropagator:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, circuit_id, source_device_id, state):
+        self.submitted.append((circuit_id, source_device_id, state))
+
+
+@pytest.fixture
+def manager():
+    manager = VirtualCircuitManager()
+    manager.propagator = RecordingPropagator()
+    return manager
+
+
+def stored(doc_id, circuit_type, device_ids):
+    return Document(
+        {'type': circuit_type, 'devices': [{'device_id': device_id} for device_id in device_ids]},
+        doc_id=doc_id
+    )
+
+
+def test_stored_circuits_are_loaded_under_their_document_id(manager):
+    manager.load_circuits([stored(3, 'switch', [1, '2']), stored(4, 'dimmer', [2])])
+
+    assert manager.get_circuit(3)['name'] == 'Circuit 3'
+    # Device IDs are indexed as strings, however they were stored
+    assert manager.circuits_for_device(1) == [3]
+    assert manager.circuits_for_device('2') == [3, 4]
+
+
+def test_loading_replaces_every_circuit(manager):
+    manager.register_circuit({'id': 1, 'type': 'switch', 'devices': [{'device_id': 7}]})
+
+    manager.load_circuits([stored(2, 'switch', [8]), stored(5, 'bogus', [8])])
+
+    assert list(manager.circuits) == [2]
+    assert manager.circuits_for_device(7) == []
+    assert manager.circuits_for_device(8) == [2]
+
+
+def test_deleting_a_circuit_unmaps_its_devices(manager):
+    manager.load_circuits([stored(1, 'switch', [1, 2]), stored(2, 'switch', [2])])
+
+    manager.delete_circuit(1)
+
+    assert manager.device_mappings == {'2': [2]}
+    with pytest.raises(ValueError):
+        manager.delete_circuit(1)
+
+
+def test_device_triggers_only_circuits_of_its_type(manager):
+    manager.load_circuits([
+        stored(1, 'switch', [1, 2]), stored(2, 'dimmer', [1, 3]), stored(3, 'switch', [4])
+    ])
+
+    assert manager.trigger_by_device(1, {'on': True}) == [1]
+    assert manager.trigger_by_device('1', {'on': True, 'brightness': 40}) == [1, 2]
+    assert manager.trigger_by_device(5, {'on': True}) == []
+    assert manager.propagator.submitted == [
+        (1, 1, {'on': True}),
+        (1, '1', {'on': True, 'brightness': 40}),
+        (2, '1', {'on': True, 'brightness': 40}),
+    ]
+
+
+def test_invalid_state_is_rejected(manager):
+    manager.load_circuits([stored(1, 'color', [1])])
+
+    with pytest.raises(ValueError):
+        manager.trigger_circuit(1, {'device_id': 1, 'state': {'hue': 10}})
+    with pytest.raises(ValueError):
+        manager.trigger_circuit(2, {'device_id': 1, 'state': {'on': True}})
+    assert manager.propagator.submitted == []